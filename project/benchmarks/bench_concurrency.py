@@ -0,0 +1,81 @@
+"""Throughput of a shared CustomDatabase versus the number of threads.
+
+Each thread runs a mix of reads and updates on random records of one
+model. Every concurrency mode is measured at each thread count; the
+unlocked mode is only measured with one thread, as the baseline.
+
+Usage (from the project directory):
+    python -m benchmarks.bench_concurrency [seconds] [write_percent] [max_threads]
+"""
+import random
+import sys
+import threading
+import time
+from typing import Optional
+
+from db.database import CustomDatabase
+
+RECORDS = 10000
+
+def _run(mode: Optional[str], threads: int, seconds: float, write_percent: int) -> float:
+    """Hammer one database from several threads.
+
+    Args:
+        mode (str, optional): Concurrency mode of the database.
+        threads (int): Number of worker threads.
+        seconds (float): How long the workers run.
+        write_percent (int): Share of operations that are updates.
+
+    Returns:
+        float: Operations per second, over all threads.
+    """
+    database = CustomDatabase("bench", concurrency=mode)
+    database.create_many("user", [{"username": f"user{i}", "visits": 0} for i in range(RECORDS)])
+    stop = threading.Event()
+    counts = [0] * threads
+
+    def worker(slot: int) -> None:
+        rng = random.Random(slot)
+        done = 0
+        while not stop.is_set():
+            for _ in range(100):
+                obj_id = rng.randint(1, RECORDS)
+                if rng.randrange(100) < write_percent:
+                    database.update("user", obj_id, {"visits": done})
+                else:
+                    database.get("user", obj_id)
+            done += 100
+        counts[slot] = done
+
+    workers = [threading.Thread(target=worker, args=(slot,)) for slot in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in workers:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - start)
+
+def main(seconds: float = 1.0, write_percent: int = 10, max_threads: int = 8) -> None:
+    """Print operations per second for each mode and thread count.
+
+    Args:
+        seconds (float, optional): Run time of each measurement. Defaults to 1.0.
+        write_percent (int, optional): Share of updates. Defaults to 10.
+        max_threads (int, optional): Largest thread count, doubled from 1. Defaults to 8.
+    """
+    counts = [1]
+    while counts[-1] * 2 <= max_threads:
+        counts.append(counts[-1] * 2)
+    print(f"{RECORDS} records, {write_percent}% updates, {seconds:g}s per run")
+    print(f"{'mode':10}" + "".join(f"{f'{n} threads':>14}" for n in counts))
+    baseline = _run(None, 1, seconds, write_percent)
+    print(f"{'none':10}{baseline:14,.0f}")
+    for mode in ("model", "striped"):
+        row = [_run(mode, threads, seconds, write_percent) for threads in counts]
+        print(f"{mode:10}" + "".join(f"{ops:14,.0f}" for ops in row))
+
+if __name__ == "__main__":
+    args = sys.argv[1:4]
+    main(*(float(arg) if i == 0 else int(arg) for i, arg in enumerate(args)))
@@ -0,0 +1,55 @@
+"""Throughput of read requests in-process versus through ProcessDispatcher.
+
+Fills a temporary SQLite file with users, then serves the same batch of
+"/sql/users/get" requests with handle_request in this process and through
+worker pools of growing size.
+
+Usage (from the project directory):
+    python -m benchmarks.bench_process_pool [requests] [max_workers]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from controllers.user_controller import *  # noqa: F401,F403 - registers the routes
+from db.sqlite_adapter import SqliteDatabase
+from process_pool import ProcessDispatcher
+from routes_decorator import handle_request
+
+USERS = 1000
+
+def main(requests: int = 20000, max_workers: int = 0) -> None:
+    """Print requests per second for each configuration.
+
+    Args:
+        requests (int, optional): Requests per run. Defaults to 20000.
+        max_workers (int, optional): Largest pool, doubled from 1. Defaults to
+            the number of CPUs.
+    """
+    max_workers = max_workers or multiprocessing.cpu_count()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        SqliteDatabase(path).create_many("user", [{"username": f"user{i}"} for i in range(USERS)])
+        batch = [("/sql/users/get", {"user_id": i % USERS + 1}) for i in range(requests)]
+
+        from db.database import DatabaseRegistry
+        DatabaseRegistry.register("sqlite", SqliteDatabase(path))
+        start = time.perf_counter()
+        for request_path, kwargs in batch:
+            handle_request(request_path, **kwargs)
+        print(f"{'in-process':12}{requests / (time.perf_counter() - start):12,.0f} req/s")
+
+        workers = 1
+        while workers <= max_workers:
+            with ProcessDispatcher(workers=workers, sqlite_path=path) as dispatcher:
+                dispatcher.map(batch[:workers * 16])  # start the workers
+                start = time.perf_counter()
+                dispatcher.map(batch, chunksize=64)
+                elapsed = time.perf_counter() - start
+            print(f"{f'{workers} workers':12}{requests / elapsed:12,.0f} req/s")
+            workers *= 2
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
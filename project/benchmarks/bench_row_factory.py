@@ -0,0 +1,83 @@
+"""Per-row cost of turning SQLite rows into User instances.
+
+Compares the old path (column names from cursor.description, a dict per row,
+then cls(**record)) with each row_factory of SqliteDatabase.
+
+Usage (from the project directory):
+    python -m benchmarks.bench_row_factory [rows] [repeats]
+"""
+import sys
+import time
+from typing import Callable, List
+
+from db.sqlite_adapter import SqliteDatabase, ROW_FACTORIES
+from models.user import User
+
+def _fill(database: SqliteDatabase, rows: int) -> None:
+    """Insert test users into a database.
+
+    Args:
+        database (SqliteDatabase): Target database.
+        rows (int): Number of users.
+    """
+    database.create_many("user", [
+        {"username": f"user{i}", "email": f"user{i}@example.com", "created_at": "2024-01-01"}
+        for i in range(rows)
+    ])
+
+def _best(run: Callable[[], List[User]], repeats: int) -> float:
+    """Time a function and keep the fastest run.
+
+    Args:
+        run (Callable[[], List[User]]): Function to time.
+        repeats (int): Number of runs.
+
+    Returns:
+        float: Seconds taken by the fastest run.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(rows: int = 50000, repeats: int = 5) -> None:
+    """Print the per-row decode cost of each strategy.
+
+    Args:
+        rows (int, optional): Number of rows to read. Defaults to 50000.
+        repeats (int, optional): Runs per strategy. Defaults to 5.
+    """
+    results = {}
+
+    database = SqliteDatabase(":memory:")
+    _fill(database, rows)
+
+    def legacy() -> List[User]:
+        with database.pool.connection() as connection:
+            cursor = connection.execute("SELECT * FROM user")
+            columns = [description[0] for description in cursor.description]
+            return [User(**dict(zip(columns, row))) for row in cursor.fetchall()]
+
+    def raw() -> list:
+        with database.pool.connection() as connection:
+            return connection.execute("SELECT * FROM user").fetchall()
+
+    fetch = _best(raw, repeats)
+    results["before: description + dict + cls(**record)"] = _best(legacy, repeats)
+
+    for row_factory in ROW_FACTORIES:
+        database = SqliteDatabase(":memory:", row_factory=row_factory)
+        _fill(database, rows)
+        results[f"row_factory={row_factory!r}"] = _best(
+            lambda: [User._from_record(record) for record in database.find("user", {})], repeats
+        )
+
+    print(f"{rows} rows, best of {repeats}; plain fetchall() takes {fetch / rows * 1e9:.0f} ns/row")
+    for name, seconds in results.items():
+        decode = (seconds - fetch) / rows * 1e9
+        print(f"{name:48} {seconds / rows * 1e9:8.0f} ns/row total {decode:8.0f} ns/row decode")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,46 @@
+"""Insert throughput of SqliteDatabase with and without write-behind buffering.
+
+Creates records one at a time, as the ingest routes do, straight into a
+temporary SQLite file and through WriteBehindDatabase with a few batch sizes.
+The buffered time includes the final flush.
+
+Usage (from the project directory):
+    python -m benchmarks.bench_write_behind [records]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from db.sqlite_adapter import SqliteDatabase
+from db.write_behind import WriteBehindDatabase
+from models.user import User  # noqa: F401 - defines the user table
+
+def main(records: int = 20000) -> None:
+    """Print inserts per second for each configuration.
+
+    Args:
+        records (int, optional): Records created per run. Defaults to 20000.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        database = SqliteDatabase(os.path.join(directory, "direct.db"))
+        start = time.perf_counter()
+        for i in range(records):
+            database.create("user", {"username": f"user{i}"})
+        print(f"{'direct':16}{records / (time.perf_counter() - start):12,.0f} inserts/s")
+
+        for max_batch in (100, 1000, 5000):
+            backend = SqliteDatabase(os.path.join(directory, f"buffered_{max_batch}.db"))
+            database = WriteBehindDatabase(backend, max_batch=max_batch)
+            start = time.perf_counter()
+            for i in range(records):
+                database.create("user", {"username": f"user{i}"})
+            acknowledged = time.perf_counter() - start
+            database.close()
+            elapsed = time.perf_counter() - start
+            print(f"{f'batch {max_batch}':16}{records / elapsed:12,.0f} inserts/s"
+                  f"  (acknowledged in {acknowledged:.2f}s, "
+                  f"{database.stats()['batches']} batches)")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,401 @@
+"""Benchmark suite with a stored baseline and a regression check.
+
+Measures, in operations per second:
+
+* dispatch/...  handle_request overhead on a no-op literal and templated route
+* model/...     BaseModel construction, from_row and to_dict
+* crud/...      create, get, update and delete on CustomDatabase and on
+                SqliteDatabase (temporary file and ":memory:"), per table size
+* threads/...   a 90% get / 10% update mix shared by several threads
+* startup/...   importing the controllers in a fresh interpreter, in imports
+                per second; --compare fails if the best time is over
+                STARTUP_BUDGET
+
+Each measurement runs for --duration seconds, --repeat times, and the best
+rate is kept, which is the least disturbed by other processes.
+
+Usage (from the project directory):
+    python -m benchmarks.suite                               # quick run, 1k rows
+    python -m benchmarks.suite --rows 1000,100000,1000000 --threads 1,2,4,8
+    python -m benchmarks.suite --save benchmarks/baseline.json
+    python -m benchmarks.suite --compare benchmarks/baseline.json --tolerance 0.25
+
+With --compare, the exit status is 1 if any result is more than --tolerance
+below the baseline. Baselines only compare well on the machine that wrote
+them, so save a new one when the hardware changes.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from db.database import CustomDatabase
+from db.sqlite_adapter import SqliteDatabase
+from models.user import User
+from routes_decorator import handle_request, route, unroute
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+BACKENDS = ("custom", "sqlite_file", "sqlite_memory")
+
+PROJECT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Longest acceptable time, in seconds, to import the controllers
+STARTUP_BUDGET = 0.15
+
+STARTUP_CODE = (
+    "import time; start = time.perf_counter()\n"
+    "import controllers.user_controller, controllers.product_controller, controllers.database_controller\n"
+    "print(time.perf_counter() - start)"
+)
+
+# Operations are timed in chunks, so the clock is read once per chunk
+CHUNK = 100
+
+def _rate(operation: Callable[[int], Any], duration: float, repeat: int) -> float:
+    """Measure how often an operation runs per second.
+
+    Args:
+        operation (Callable[[int], Any]): Called with a running index. May raise
+            StopIteration when it has nothing left to do.
+        duration (float): Seconds per run.
+        repeat (int): Number of runs, after a short warm-up run.
+
+    Returns:
+        float: The best rate over the runs, in operations per second.
+    """
+    best = 0.0
+    index = 0
+    # Like timeit, keep the garbage collector from firing inside the timings
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for run in range(repeat + 1):
+            done = 0
+            start = time.perf_counter()
+            deadline = start + (duration if run else duration / 10)
+            try:
+                while time.perf_counter() < deadline:
+                    for _ in range(CHUNK):
+                        operation(index)
+                        index += 1
+                        done += 1
+            except StopIteration:
+                pass
+            elapsed = time.perf_counter() - start
+            if run and done:  # The first, short run only warms up
+                best = max(best, done / elapsed)
+            gc.collect()
+    finally:
+        if enabled:
+            gc.enable()
+    return best
+
+def _threaded_rate(operation: Callable[[random.Random], Any], threads: int, duration: float,
+                   repeat: int) -> float:
+    """Measure the combined rate of an operation run by several threads.
+
+    Args:
+        operation (Callable[[random.Random], Any]): Called with the thread's
+            random generator.
+        threads (int): Number of threads.
+        duration (float): Seconds per run.
+        repeat (int): Number of runs.
+
+    Returns:
+        float: The best rate over the runs, in operations per second.
+    """
+    best = 0.0
+    for _ in range(repeat):
+        stop = threading.Event()
+        counts = [0] * threads
+
+        def worker(slot: int) -> None:
+            rng = random.Random(slot)
+            done = 0
+            while not stop.is_set():
+                for _ in range(CHUNK):
+                    operation(rng)
+                done += CHUNK
+            counts[slot] = done
+
+        workers = [threading.Thread(target=worker, args=(slot,)) for slot in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in workers:
+            thread.join()
+        best = max(best, sum(counts) / (time.perf_counter() - start))
+    return best
+
+def _open(backend: str, directory: str, rows: int, threaded: bool = False) -> Any:
+    """Create an empty database of a backend.
+
+    Args:
+        backend (str): One of BACKENDS.
+        directory (str): Directory for database files.
+        rows (int): Table size, used to name the file.
+        threaded (bool, optional): Whether several threads will share it.
+
+    Returns:
+        Any: The database.
+    """
+    if backend == "custom":
+        return CustomDatabase("bench", concurrency="model" if threaded else None)
+    if backend == "sqlite_memory":
+        return SqliteDatabase(":memory:")
+    suffix = "_threads" if threaded else ""
+    return SqliteDatabase(os.path.join(directory, f"bench_{rows}{suffix}.db"))
+
+def _fill(database: Any, rows: int) -> None:
+    """Store rows users in a database.
+
+    Args:
+        database (Any): The database.
+        rows (int): Number of users.
+    """
+    for start in range(0, rows, 10000):
+        database.create_many("user", [
+            {"username": f"user{i}", "email": f"user{i}@example.com"}
+            for i in range(start, min(rows, start + 10000))
+        ])
+
+def _dispatch(duration: float, repeat: int) -> Iterator[Tuple[str, float]]:
+    """Measure routing overhead with handlers that do nothing."""
+    route("/bench/noop")(lambda: None)
+    route("/bench/{value}/noop")(lambda value: None)
+    try:
+        yield "dispatch/literal", _rate(lambda i: handle_request("/bench/noop"), duration, repeat)
+        yield "dispatch/template", _rate(lambda i: handle_request("/bench/1/noop"), duration, repeat)
+        yield "dispatch/not_found", _rate(lambda i: handle_request("/bench/missing/x/y"), duration, repeat)
+    finally:
+        unroute("/bench/noop")
+        unroute("/bench/{value}/noop")
+
+def _models(duration: float, repeat: int) -> Iterator[Tuple[str, float]]:
+    """Measure building models and converting them back to dicts."""
+    row = {"id": 1, "username": "user1", "email": "user1@example.com", "created_at": None}
+    user = User(**row)
+    yield "model/construct", _rate(lambda i: User(id=i, username="user", email="user@example.com"),
+                                   duration, repeat)
+    yield "model/from_row", _rate(lambda i: User.from_row(row), duration, repeat)
+    yield "model/to_dict", _rate(lambda i: user.to_dict(), duration, repeat)
+
+def _crud(backend: str, rows: int, directory: str, duration: float,
+          repeat: int) -> Iterator[Tuple[str, float]]:
+    """Measure single-record operations on a table of the given size."""
+    database = _open(backend, directory, rows)
+    _fill(database, rows)
+    created: List[Any] = []
+    rng = random.Random(rows)
+    prefix = f"crud/{backend}/rows={rows}"
+
+    def create(i: int) -> None:
+        created.append(database.create("user", {"username": f"new{i}", "email": f"new{i}@example.com"})["id"])
+
+    def delete(i: int) -> None:
+        if not created:
+            raise StopIteration
+        database.delete("user", created.pop())
+
+    yield f"{prefix}/create", _rate(create, duration, repeat)
+    yield f"{prefix}/get", _rate(lambda i: database.get("user", rng.randint(1, rows)), duration, repeat)
+    yield f"{prefix}/update", _rate(
+        lambda i: database.update("user", rng.randint(1, rows), {"email": f"changed{i}@example.com"}),
+        duration, repeat)
+    yield f"{prefix}/delete", _rate(delete, duration, repeat)
+
+def _threads(backend: str, rows: int, threads: Sequence[int], directory: str, duration: float,
+             repeat: int) -> Iterator[Tuple[str, float]]:
+    """Measure a shared read-mostly workload per number of threads."""
+    database = _open(backend, directory, rows, threaded=True)
+    _fill(database, rows)
+
+    def mixed(rng: random.Random) -> None:
+        obj_id = rng.randint(1, rows)
+        if rng.randrange(10):
+            database.get("user", obj_id)
+        else:
+            database.update("user", obj_id, {"email": f"changed{obj_id}@example.com"})
+
+    for count in threads:
+        yield f"threads/{backend}/rows={rows}/threads={count}", _threaded_rate(mixed, count, duration, repeat)
+
+def startup_time(repeat: int = 5, directory: Optional[str] = None) -> float:
+    """Measure how long importing the controllers takes in a fresh interpreter.
+
+    Args:
+        repeat (int, optional): Interpreters started. Defaults to 5.
+        directory (str, optional): Working directory of the interpreters.
+            Defaults to the current one.
+
+    Returns:
+        float: The best time, in seconds.
+    """
+    environment = dict(os.environ, PYTHONPATH=PROJECT, PYTHONDONTWRITEBYTECODE="1")
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", STARTUP_CODE], cwd=directory, env=environment,
+                                capture_output=True, text=True, check=True).stdout
+        times.append(float(output.split()[-1]))
+    return min(times)
+
+def _startup(repeat: int) -> Iterator[Tuple[str, float]]:
+    """Measure the import time of the controllers, as imports per second."""
+    best = startup_time(repeat)
+    if best > STARTUP_BUDGET:
+        print(f"Importing the controllers took {best * 1000:.0f} ms, "
+              f"over the {STARTUP_BUDGET * 1000:.0f} ms budget")
+    yield "startup/import_controllers", 1 / best
+
+def run(rows: Sequence[int] = (1000,), threads: Sequence[int] = (1, 4),
+        backends: Sequence[str] = BACKENDS, duration: float = 0.2, repeat: int = 5,
+        only: Optional[Sequence[str]] = None) -> Dict[str, float]:
+    """Run the benchmarks.
+
+    Args:
+        rows (Sequence[int], optional): Table sizes. Defaults to (1000,).
+        threads (Sequence[int], optional): Thread counts. Defaults to (1, 4).
+        backends (Sequence[str], optional): Databases to measure. Defaults to BACKENDS.
+        duration (float, optional): Seconds per run. Defaults to 0.2.
+        repeat (int, optional): Runs per measurement. Defaults to 5.
+        only (Sequence[str], optional): Name prefixes to run, e.g. ["crud/custom"].
+            Defaults to all.
+
+    Returns:
+        Dict[str, float]: Operations per second by benchmark name.
+    """
+    def wanted(prefix: str) -> bool:
+        return only is None or any(name.startswith(prefix) or prefix.startswith(name) for name in only)
+
+    results: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        groups: List[Callable[[], Iterator[Tuple[str, float]]]] = []
+        if wanted("dispatch/"):
+            groups.append(lambda: _dispatch(duration, repeat))
+        if wanted("model/"):
+            groups.append(lambda: _models(duration, repeat))
+        if wanted("startup/"):
+            groups.append(lambda: _startup(repeat))
+        for count in rows:
+            for backend in backends:
+                if wanted(f"crud/{backend}/rows={count}/"):
+                    groups.append(lambda b=backend, c=count: _crud(b, c, directory, duration, repeat))
+                if wanted(f"threads/{backend}/rows={count}/"):
+                    groups.append(lambda b=backend, c=count: _threads(b, c, threads, directory, duration, repeat))
+        for group in groups:
+            for name, rate in group():
+                if only is None or any(name.startswith(prefix) for prefix in only):
+                    results[name] = rate
+                    print(f"{name:48}{rate:14,.0f} ops/s", flush=True)
+    return results
+
+def compare(results: Dict[str, float], baseline: Dict[str, float],
+            tolerance: float = 0.25) -> List[str]:
+    """Find the results that fell behind the baseline.
+
+    Args:
+        results (Dict[str, float]): Current operations per second by name.
+        baseline (Dict[str, float]): Baseline operations per second by name.
+        tolerance (float, optional): Allowed slowdown, as a share of the
+            baseline. Defaults to 0.25.
+
+    Returns:
+        List[str]: Names of the regressed benchmarks. Benchmarks missing on
+            either side are not compared.
+    """
+    regressions = []
+    for name in sorted(results.keys() & baseline.keys()):
+        change = results[name] / baseline[name] - 1 if baseline[name] else 0.0
+        regressed = change < -tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"{name:48}{baseline[name]:14,.0f}{results[name]:14,.0f}{change:+9.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+def save(results: Dict[str, float], path: str) -> None:
+    """Write results as a baseline file.
+
+    Args:
+        results (Dict[str, float]): Operations per second by name.
+        path (str): File to write.
+    """
+    document = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "processor": platform.processor(), "cpus": os.cpu_count()},
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": {name: round(rate, 1) for name, rate in sorted(results.items())},
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(document, file, indent=2)
+        file.write("\n")
+
+def load(path: str) -> Dict[str, float]:
+    """Read the results of a baseline file.
+
+    Args:
+        path (str): File written by save().
+
+    Returns:
+        Dict[str, float]: Operations per second by name.
+    """
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)["results"]
+
+def _numbers(text: str) -> List[int]:
+    """Parse a comma-separated list of integers."""
+    return [int(part) for part in text.split(",") if part]
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the suite from the command line.
+
+    Args:
+        argv (Sequence[str], optional): Arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: 1 if a regression was found or startup is over STARTUP_BUDGET
+            when comparing, 0 otherwise.
+    """
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("--rows", type=_numbers, default=[1000], help="table sizes, e.g. 1000,100000,1000000")
+    parser.add_argument("--threads", type=_numbers, default=[1, 4], help="thread counts, e.g. 1,2,4,8")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="databases to measure")
+    parser.add_argument("--duration", type=float, default=0.2, help="seconds per run")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement; the best is kept")
+    parser.add_argument("--only", help="comma-separated benchmark name prefixes")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", nargs="?", const=BASELINE,
+                        help=f"compare with a baseline (default {BASELINE})")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, e.g. 0.25 for 25%%")
+    args = parser.parse_args(argv)
+
+    results = run(rows=args.rows, threads=args.threads, backends=args.backends.split(","),
+                  duration=args.duration, repeat=args.repeat,
+                  only=args.only.split(",") if args.only else None)
+    if args.save:
+        save(results, args.save)
+    if args.compare:
+        print(f"\n{'benchmark':48}{'baseline':>14}{'current':>14}{'change':>9}")
+        regressions = compare(results, load(args.compare), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) more than {args.tolerance:.0%} slower than the baseline")
+            return 1
+        startup = results.get("startup/import_controllers")
+        if startup and 1 / startup > STARTUP_BUDGET:
+            print(f"\nImporting the controllers is over the {STARTUP_BUDGET * 1000:.0f} ms budget")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
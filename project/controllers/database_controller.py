@@ -49,12 +49,15 @@ def get_database_info(db_name: str) -> Dict[str, Any]:
         Dict[str, Any]: Database information or error message.
     """
     from db.database import DatabaseRegistry
+    from db.cache import CachedDatabase
     db = DatabaseRegistry.get(db_name)
     if db:
         info = {
             "name": db_name,
             "type": db.__class__.__name__,
         }
+        if isinstance(db, CachedDatabase):
+            info["cache"] = db.stats()
         return {"info": info}
     return {"error": f"Database '{db_name}' not found"}
 
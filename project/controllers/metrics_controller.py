@@ -0,0 +1,32 @@
+from typing import Any, Dict
+import metrics
+from routes_decorator import route
+
+@route('/metrics')
+def get_metrics() -> str:
+    """Get the recorded route and database metrics.
+
+    Returns:
+        str: Metrics in the Prometheus text format.
+    """
+    return metrics.render_prometheus()
+
+@route('/metrics/enable')
+def enable_metrics() -> Dict[str, Any]:
+    """Start recording route and database metrics.
+
+    Returns:
+        Dict[str, Any]: Success message.
+    """
+    metrics.enable()
+    return {"message": "Metrics enabled."}
+
+@route('/metrics/disable')
+def disable_metrics() -> Dict[str, Any]:
+    """Stop recording metrics; what was recorded stays available.
+
+    Returns:
+        Dict[str, Any]: Success message.
+    """
+    metrics.disable()
+    return {"message": "Metrics disabled."}
@@ -1,27 +1,85 @@
-from typing import Dict, Any
+from contextlib import nullcontext
+from typing import Dict, Any, Optional, List
+from db.registry import DatabaseRegistry
 from models.product import Product
 from routes_decorator import route
 
-@route('/sql/products/create')
-def sql_create_product(data: Dict[str, Any], model_name: str = "product") -> Dict[str, Any]:
-    """Create a new product in SQL database.
+def _unknown_backend(backend: str) -> Optional[Dict[str, Any]]:
+    """Check the database named in a /{backend}/... path.
+    
+    Args:
+        backend (str): Name of the database.
+        
+    Returns:
+        Optional[Dict[str, Any]]: Error response if no such database is
+            registered, None otherwise.
+    """
+    if DatabaseRegistry.get(backend) is None:
+        return {"error": f"Database '{backend}' not found"}
+    return None
+
+def _bulk(operation: str, payload: Any, backend: Optional[str] = None,
+          model_name: Optional[str] = None) -> Dict[str, Any]:
+    """Run one of the Product.bulk_* operations and build the route response.
+    
+    Args:
+        operation (str): "create", "get", "update" or "delete".
+        payload (Any): Product data or product IDs, as taken by the operation.
+        backend (str, optional): Name of the registered database to run on.
+            Defaults to the model's current database.
+        model_name (str, optional): Model name. Defaults to the model's own.
+        
+    Returns:
+        Dict[str, Any]: Data of the products, the IDs of the deleted ones,
+            or an error message.
+    """
+    if backend is not None:
+        error = _unknown_backend(backend)
+        if error:
+            return error
+    args = (payload,) if model_name is None else (payload, model_name)
+    with Product.using(backend) if backend is not None else nullcontext():
+        products = getattr(Product, f"bulk_{operation}")(*args)
+    if operation == "delete":
+        return {"status": "success", "deleted": [product.id for product in products]}
+    if operation == "create" and not products:
+        return {"status": "error", "message": "Products creation failed"}
+    return {"status": "success", "products": [product.to_dict() for product in products]}
+
+@route('/{backend}/products/create')
+def backend_create_product(backend: str, data: Dict[str, Any], model_name: str = "product") -> Dict[str, Any]:
+    """Create a new product in any registered database.
     
     Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
         data (Dict[str, Any]): Product data.
         model_name (str, optional): Model name. Defaults to "product".
         
     Returns:
         Dict[str, Any]: Creation result with product data.
     """
-    Product.use_db("sqlite")
-    
-    product = Product.create(model_name, **data)
+    error = _unknown_backend(backend)
+    if error:
+        return error
+    with Product.using(backend):
+        product = Product.create(model_name, **data)
     if not product:
-        Product.use_db("default")
         return {"status": "error", "message": "Product creation failed"}
-    Product.use_db("default")
     return {"status": "success", "product": product.to_dict()}
 
+@route('/sql/products/create')
+def sql_create_product(data: Dict[str, Any], model_name: str = "product") -> Dict[str, Any]:
+    """Create a new product in SQL database.
+    
+    Args:
+        data (Dict[str, Any]): Product data.
+        model_name (str, optional): Model name. Defaults to "product".
+        
+    Returns:
+        Dict[str, Any]: Creation result with product data.
+    """
+    return backend_create_product("sqlite", data, model_name)
+
 @route('/products/create')
 def create_product(data: Dict[str, Any]) -> Dict[str, Any]:
     """Create a new product.
@@ -37,26 +95,41 @@ def create_product(data: Dict[str, Any]) -> Dict[str, Any]:
         return {"status": "error", "message": "Product creation failed"}
     return {"status": "success", "product": product.to_dict()}
 
-@route('/sql/products/get')
-def sql_get_product(product_id: str, model_name: str = "product") -> Dict[str, Any]:
-    """Retrieve a product by ID from SQL database.
+@route('/{backend}/products/get')
+def backend_get_product(backend: str, product_id: str, model_name: str = "product") -> Dict[str, Any]:
+    """Retrieve a product by ID from any registered database.
     
     Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
         product_id (str): Product ID.
         model_name (str, optional): Model name. Defaults to "product".
         
     Returns:
         Dict[str, Any]: Product data or error message.
     """
-    Product.use_db("sqlite")
-    product = Product.get(model_name, product_id)
+    error = _unknown_backend(backend)
+    if error:
+        return error
+    with Product.using(backend):
+        product = Product.get(model_name, product_id)
     if product:
-        Product.use_db("default")
         return {"status": "success", "product": product.to_dict()}
         
-    Product.use_db("default")    
     return {"status": "error", "message": "Product not found"}
 
+@route('/sql/products/get')
+def sql_get_product(product_id: str, model_name: str = "product") -> Dict[str, Any]:
+    """Retrieve a product by ID from SQL database.
+    
+    Args:
+        product_id (str): Product ID.
+        model_name (str, optional): Model name. Defaults to "product".
+        
+    Returns:
+        Dict[str, Any]: Product data or error message.
+    """
+    return backend_get_product("sqlite", product_id, model_name)
+
 @route('/products/get')
 def get_product(product_id: str) -> Dict[str, Any]:
     """Retrieve a product by ID.
@@ -73,11 +146,12 @@ def get_product(product_id: str) -> Dict[str, Any]:
     
     return {"status": "error", "message": "Product not found"}
 
-@route('/sql/products/update')
-def sql_update_product(product_id: str, data: Dict[str, Any], model_name: str = "product") -> Dict[str, Any]:
-    """Update product data in SQL database.
+@route('/{backend}/products/update')
+def backend_update_product(backend: str, product_id: str, data: Dict[str, Any], model_name: str = "product") -> Dict[str, Any]:
+    """Update product data in any registered database.
     
     Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
         product_id (str): Product ID.
         data (Dict[str, Any]): New product data.
         model_name (str, optional): Model name. Defaults to "product".
@@ -85,14 +159,29 @@ def sql_update_product(product_id: str, data: Dict[str, Any], model_name: str =
     Returns:
         Dict[str, Any]: Update result with product data or error message.
     """
-    Product.use_db("sqlite")
-    product = Product.update(model_name, product_id, **data)
+    error = _unknown_backend(backend)
+    if error:
+        return error
+    with Product.using(backend):
+        product = Product.update(model_name, product_id, **data)
     if product:
-        Product.use_db("default")
         return {"status": "success", "product": product.to_dict()}
-    Product.use_db("default")
     return {"status": "error", "message": "Product not found"}
 
+@route('/sql/products/update')
+def sql_update_product(product_id: str, data: Dict[str, Any], model_name: str = "product") -> Dict[str, Any]:
+    """Update product data in SQL database.
+    
+    Args:
+        product_id (str): Product ID.
+        data (Dict[str, Any]): New product data.
+        model_name (str, optional): Model name. Defaults to "product".
+        
+    Returns:
+        Dict[str, Any]: Update result with product data or error message.
+    """
+    return backend_update_product("sqlite", product_id, data, model_name)
+
 @route('/products/update')
 def update_product(product_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
     """Update product data.
@@ -109,25 +198,40 @@ def update_product(product_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
         return {"status": "success", "product": product.to_dict()}
     return {"status": "error", "message": "Product not found"}
 
-@route('/sql/products/delete')
-def sql_delete_product(product_id: str, model_name: str = "product") -> Dict[str, Any]:
-    """Delete a product by ID from SQL database.
+@route('/{backend}/products/delete')
+def backend_delete_product(backend: str, product_id: str, model_name: str = "product") -> Dict[str, Any]:
+    """Delete a product by ID from any registered database.
     
     Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
         product_id (str): Product ID.
         model_name (str, optional): Model name. Defaults to "product".
         
     Returns:
         Dict[str, Any]: Delete result or error message.
     """
-    Product.use_db("sqlite")
-    result = Product.delete(model_name, product_id)
+    error = _unknown_backend(backend)
+    if error:
+        return error
+    with Product.using(backend):
+        result = Product.delete(model_name, product_id)
     if result:
-        Product.use_db("default")
         return {"status": "success", "message": "Product deleted"}
-    Product.use_db("default")
     return {"status": "error", "message": "Product not found"}
 
+@route('/sql/products/delete')
+def sql_delete_product(product_id: str, model_name: str = "product") -> Dict[str, Any]:
+    """Delete a product by ID from SQL database.
+    
+    Args:
+        product_id (str): Product ID.
+        model_name (str, optional): Model name. Defaults to "product".
+        
+    Returns:
+        Dict[str, Any]: Delete result or error message.
+    """
+    return backend_delete_product("sqlite", product_id, model_name)
+
 @route('/products/delete')
 def delete_product(product_id: str) -> Dict[str, Any]:
     """Delete a product by ID.
@@ -141,4 +245,221 @@ def delete_product(product_id: str) -> Dict[str, Any]:
     result = Product.delete(product_id)
     if result:
         return {"status": "success", "message": "Product deleted"}
-    return {"status": "error", "message": "Product not found"}
\ No newline at end of file
+    return {"status": "error", "message": "Product not found"}
+
+@route('/{backend}/products/bulk_create')
+def backend_bulk_create_products(backend: str, data: List[Dict[str, Any]], model_name: str = "product") -> Dict[str, Any]:
+    """Create several products in any registered database in one transaction.
+    
+    Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
+        data (List[Dict[str, Any]]): Product data for each new product.
+        model_name (str, optional): Model name. Defaults to "product".
+        
+    Returns:
+        Dict[str, Any]: Creation result with products data.
+    """
+    return _bulk("create", data, backend, model_name)
+
+@route('/sql/products/bulk_create')
+def sql_bulk_create_products(data: List[Dict[str, Any]], model_name: str = "product") -> Dict[str, Any]:
+    """Create several products in SQL database in one transaction.
+    
+    Args:
+        data (List[Dict[str, Any]]): Product data for each new product.
+        model_name (str, optional): Model name. Defaults to "product".
+        
+    Returns:
+        Dict[str, Any]: Creation result with products data.
+    """
+    return backend_bulk_create_products("sqlite", data, model_name)
+
+@route('/products/bulk_create')
+def bulk_create_products(data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Create several products.
+    
+    Args:
+        data (List[Dict[str, Any]]): Product data for each new product.
+        
+    Returns:
+        Dict[str, Any]: Creation result with products data.
+    """
+    return _bulk("create", data)
+
+@route('/{backend}/products/bulk_get')
+def backend_bulk_get_products(backend: str, product_ids: List[str], model_name: str = "product") -> Dict[str, Any]:
+    """Retrieve several products by ID from any registered database.
+    
+    Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
+        product_ids (List[str]): Product IDs.
+        model_name (str, optional): Model name. Defaults to "product".
+        
+    Returns:
+        Dict[str, Any]: Data of the products that were found.
+    """
+    return _bulk("get", product_ids, backend, model_name)
+
+@route('/sql/products/bulk_get')
+def sql_bulk_get_products(product_ids: List[str], model_name: str = "product") -> Dict[str, Any]:
+    """Retrieve several products by ID from SQL database.
+    
+    Args:
+        product_ids (List[str]): Product IDs.
+        model_name (str, optional): Model name. Defaults to "product".
+        
+    Returns:
+        Dict[str, Any]: Data of the products that were found.
+    """
+    return backend_bulk_get_products("sqlite", product_ids, model_name)
+
+@route('/products/bulk_get')
+def bulk_get_products(product_ids: List[str]) -> Dict[str, Any]:
+    """Retrieve several products by ID.
+    
+    Args:
+        product_ids (List[str]): Product IDs.
+        
+    Returns:
+        Dict[str, Any]: Data of the products that were found.
+    """
+    return _bulk("get", product_ids)
+
+@route('/{backend}/products/bulk_update')
+def backend_bulk_update_products(backend: str, data: Dict[str, Dict[str, Any]], model_name: str = "product") -> Dict[str, Any]:
+    """Update several products in any registered database in one transaction.
+    
+    Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
+        data (Dict[str, Dict[str, Any]]): Mapping of product ID to new product data.
+        model_name (str, optional): Model name. Defaults to "product".
+        
+    Returns:
+        Dict[str, Any]: Update result with data of the updated products.
+    """
+    return _bulk("update", data, backend, model_name)
+
+@route('/sql/products/bulk_update')
+def sql_bulk_update_products(data: Dict[str, Dict[str, Any]], model_name: str = "product") -> Dict[str, Any]:
+    """Update several products in SQL database in one transaction.
+    
+    Args:
+        data (Dict[str, Dict[str, Any]]): Mapping of product ID to new product data.
+        model_name (str, optional): Model name. Defaults to "product".
+        
+    Returns:
+        Dict[str, Any]: Update result with data of the updated products.
+    """
+    return backend_bulk_update_products("sqlite", data, model_name)
+
+@route('/products/bulk_update')
+def bulk_update_products(data: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Update several products.
+    
+    Args:
+        data (Dict[str, Dict[str, Any]]): Mapping of product ID to new product data.
+        
+    Returns:
+        Dict[str, Any]: Update result with data of the updated products.
+    """
+    return _bulk("update", data)
+
+@route('/{backend}/products/bulk_delete')
+def backend_bulk_delete_products(backend: str, product_ids: List[str], model_name: str = "product") -> Dict[str, Any]:
+    """Delete several products by ID from any registered database in one transaction.
+    
+    Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
+        product_ids (List[str]): Product IDs.
+        model_name (str, optional): Model name. Defaults to "product".
+        
+    Returns:
+        Dict[str, Any]: Delete result with the IDs of the deleted products.
+    """
+    return _bulk("delete", product_ids, backend, model_name)
+
+@route('/sql/products/bulk_delete')
+def sql_bulk_delete_products(product_ids: List[str], model_name: str = "product") -> Dict[str, Any]:
+    """Delete several products by ID from SQL database in one transaction.
+    
+    Args:
+        product_ids (List[str]): Product IDs.
+        model_name (str, optional): Model name. Defaults to "product".
+        
+    Returns:
+        Dict[str, Any]: Delete result with the IDs of the deleted products.
+    """
+    return backend_bulk_delete_products("sqlite", product_ids, model_name)
+
+@route('/products/bulk_delete')
+def bulk_delete_products(product_ids: List[str]) -> Dict[str, Any]:
+    """Delete several products by ID.
+    
+    Args:
+        product_ids (List[str]): Product IDs.
+        
+    Returns:
+        Dict[str, Any]: Delete result with the IDs of the deleted products.
+    """
+    return _bulk("delete", product_ids)
+
+@route('/{backend}/products/list')
+def backend_list_products(backend: str, limit: int = 50, after: Optional[str] = None, model_name: str = "product") -> Dict[str, Any]:
+    """List products page by page from any registered database.
+    
+    Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
+        limit (int, optional): Maximum number of products per page. Defaults to 50.
+        after (str, optional): The "next" token of the previous page.
+        model_name (str, optional): Model name. Defaults to "product".
+        
+    Returns:
+        Dict[str, Any]: One page of products and the token of the next page, or
+            an error if the token is malformed or limit is less than 1.
+    """
+    error = _unknown_backend(backend)
+    if error:
+        return error
+    try:
+        with Product.using(backend):
+            products, token = Product.page(limit, after, model_name)
+    except ValueError as e:
+        return {"error": str(e)}
+    return {"status": "success", "products": [product.to_dict() for product in products], "next": token}
+
+@route('/sql/products/list')
+def sql_list_products(limit: int = 50, after: Optional[str] = None, model_name: str = "product") -> Dict[str, Any]:
+    """List products page by page from SQL database.
+    
+    Args:
+        limit (int, optional): Maximum number of products per page. Defaults to 50.
+        after (str, optional): The "next" token of the previous page.
+        model_name (str, optional): Model name. Defaults to "product".
+        
+    Returns:
+        Dict[str, Any]: One page of products and the token of the next page, or
+            an error if the token is malformed or limit is less than 1.
+    """
+    return backend_list_products("sqlite", limit, after, model_name)
+
+@route('/products/list')
+def list_products(limit: int = 50, after: Optional[str] = None) -> Dict[str, Any]:
+    """List products page by page.
+    
+    Deep pages cost the same as the first one: the token records where the
+    previous page ended instead of an offset.
+    
+    Args:
+        limit (int, optional): Maximum number of products per page. Defaults to 50.
+        after (str, optional): The "next" token of the previous page.
+        
+    Returns:
+        Dict[str, Any]: One page of products and the token of the next page,
+            which is None on the last page, or an error if the token is
+            malformed or limit is less than 1.
+    """
+    try:
+        products, token = Product.page(limit, after)
+    except ValueError as e:
+        return {"error": str(e)}
+    return {"status": "success", "products": [product.to_dict() for product in products], "next": token}
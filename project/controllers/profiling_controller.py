@@ -0,0 +1,64 @@
+from typing import Any, Dict, List, Optional
+import profiling
+from routes_decorator import route
+
+@route('/profiling/start')
+def start_profiling(every: int = 100, cpu: bool = True, memory: bool = False,
+                    routes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Start profiling one in every N requests of each route.
+
+    Args:
+        every (int, optional): Profile every Nth request. Defaults to 100.
+        cpu (bool, optional): Collect cProfile statistics. Defaults to True.
+        memory (bool, optional): Trace memory allocations. Defaults to False.
+        routes (List[str], optional): Route paths to sample. Defaults to all.
+
+    Returns:
+        Dict[str, Any]: Success message or error information.
+    """
+    try:
+        profiling.start_sampling(every, cpu=cpu, memory=memory, routes=routes)
+    except ValueError as e:
+        return {"error": str(e)}
+    return {"message": f"Profiling 1 in {every} requests."}
+
+@route('/profiling/stop')
+def stop_profiling() -> Dict[str, Any]:
+    """Stop profiling requests; collected profiles are kept.
+
+    Returns:
+        Dict[str, Any]: Success message.
+    """
+    profiling.stop_sampling()
+    return {"message": "Profiling stopped."}
+
+@route('/profiling/report')
+def get_profile(route_path: str, limit: int = 20) -> Dict[str, Any]:
+    """Get the collected profile of a route.
+
+    Args:
+        route_path (str): Route path as registered, e.g. "/{backend}/users/get".
+        limit (int, optional): Functions and allocation lines listed. Defaults to 20.
+
+    Returns:
+        Dict[str, Any]: The profile as text or error information.
+    """
+    profile = profiling.PROFILES.get(route_path)
+    if profile is None:
+        return {"error": f"No profile for route '{route_path}'"}
+    return {"route": route_path, "samples": profile.samples, "report": profile.report(limit)}
+
+@route('/profiling/dump')
+def dump_profiling() -> Dict[str, Any]:
+    """Write the collected profile of each route to profiling.PROFILE_DIRECTORY.
+
+    Requests cannot choose the directory, so they cannot write files anywhere
+    else.
+
+    Returns:
+        Dict[str, Any]: Paths of the written files or error information.
+    """
+    try:
+        return {"files": profiling.dump_profiles()}
+    except OSError as e:
+        return {"error": str(e)}
@@ -1,28 +1,85 @@
-from typing import Dict, Any, Optional
+from contextlib import nullcontext
+from typing import Dict, Any, Optional, List
+from db.registry import DatabaseRegistry
 from models.user import User
 from routes_decorator import route
 
-@route('/sql/users/create')
-def sql_create_user(data: Dict[str, Any], model_name: str = "user") -> Dict[str, Any]:
-    """Create a new user in SQL database.
+def _unknown_backend(backend: str) -> Optional[Dict[str, Any]]:
+    """Check the database named in a /{backend}/... path.
+    
+    Args:
+        backend (str): Name of the database.
+        
+    Returns:
+        Optional[Dict[str, Any]]: Error response if no such database is
+            registered, None otherwise.
+    """
+    if DatabaseRegistry.get(backend) is None:
+        return {"error": f"Database '{backend}' not found"}
+    return None
+
+def _bulk(operation: str, payload: Any, backend: Optional[str] = None,
+          model_name: Optional[str] = None) -> Dict[str, Any]:
+    """Run one of the User.bulk_* operations and build the route response.
+    
+    Args:
+        operation (str): "create", "get", "update" or "delete".
+        payload (Any): User data or user IDs, as taken by the operation.
+        backend (str, optional): Name of the registered database to run on.
+            Defaults to the model's current database.
+        model_name (str, optional): Model name. Defaults to the model's own.
+        
+    Returns:
+        Dict[str, Any]: Data of the users, the IDs of the deleted ones,
+            or an error message.
+    """
+    if backend is not None:
+        error = _unknown_backend(backend)
+        if error:
+            return error
+    args = (payload,) if model_name is None else (payload, model_name)
+    with User.using(backend) if backend is not None else nullcontext():
+        users = getattr(User, f"bulk_{operation}")(*args)
+    if operation == "delete":
+        return {"status": "success", "deleted": [user.id for user in users]}
+    if operation == "create" and not users:
+        return {"status": "error", "message": "Users creation failed"}
+    return {"status": "success", "users": [user.to_dict() for user in users]}
+
+@route('/{backend}/users/create')
+def backend_create_user(backend: str, data: Dict[str, Any], model_name: str = "user") -> Dict[str, Any]:
+    """Create a new user in any registered database.
     
     Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
         data (Dict[str, Any]): User data.
         model_name (str, optional): Model name. Defaults to "user".
         
     Returns:
         Dict[str, Any]: Creation result with user data.
     """
-    User.use_db("sqlite")
-    
-    user = User.create(model_name, **data)
+    error = _unknown_backend(backend)
+    if error:
+        return error
+    with User.using(backend):
+        user = User.create(model_name, **data)
     if not user:
-        User.use_db("default")
         return {"status": "error", "message": "User creation failed"}
-         
-    User.use_db("default")
     return {"status": "success", "user": user.to_dict()}
 
+@route('/sql/users/create')
+def sql_create_user(data: Dict[str, Any], model_name: str = "user") -> Dict[str, Any]:
+    """Create a new user in SQL database.
+    
+    Args:
+        data (Dict[str, Any]): User data.
+        model_name (str, optional): Model name. Defaults to "user".
+        
+    Returns:
+        Dict[str, Any]: Creation result with user data.
+    """
+    return backend_create_user("sqlite", data, model_name)
+
 @route('/users/create')
 def create_user(data: Dict[str, Any]) -> Dict[str, Any]:
     """Create a new user.
@@ -38,26 +95,41 @@ def create_user(data: Dict[str, Any]) -> Dict[str, Any]:
         return {"status": "error", "message": "User creation failed"}
     return {"status": "success", "user": user.to_dict()}
 
-@route('/sql/users/get')
-def sql_get_user(user_id: str, model_name: str = "user") -> Dict[str, Any]:
-    """Retrieve a user by ID from SQL database.
+@route('/{backend}/users/get')
+def backend_get_user(backend: str, user_id: str, model_name: str = "user") -> Dict[str, Any]:
+    """Retrieve a user by ID from any registered database.
     
     Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
         user_id (str): User ID.
         model_name (str, optional): Model name. Defaults to "user".
         
     Returns:
         Dict[str, Any]: User data or error message.
     """
-    User.use_db("sqlite")
-    user = User.get(model_name, user_id)
+    error = _unknown_backend(backend)
+    if error:
+        return error
+    with User.using(backend):
+        user = User.get(model_name, user_id)
     if user:
-        User.use_db("default")
         return {"status": "success", "user": user.to_dict()}
         
-    User.use_db("default")    
     return {"status": "error", "message": "User not found"}
 
+@route('/sql/users/get')
+def sql_get_user(user_id: str, model_name: str = "user") -> Dict[str, Any]:
+    """Retrieve a user by ID from SQL database.
+    
+    Args:
+        user_id (str): User ID.
+        model_name (str, optional): Model name. Defaults to "user".
+        
+    Returns:
+        Dict[str, Any]: User data or error message.
+    """
+    return backend_get_user("sqlite", user_id, model_name)
+
 @route('/users/get')
 def get_user(user_id: str) -> Dict[str, Any]:
     """Retrieve a user by ID.
@@ -74,11 +146,12 @@ def get_user(user_id: str) -> Dict[str, Any]:
     
     return {"status": "error", "message": "User not found"}
 
-@route('/sql/users/update')
-def sql_update_user(user_id: str, data: Dict[str, Any], model_name: str = "user") -> Dict[str, Any]:
-    """Update user data in SQL database.
+@route('/{backend}/users/update')
+def backend_update_user(backend: str, user_id: str, data: Dict[str, Any], model_name: str = "user") -> Dict[str, Any]:
+    """Update user data in any registered database.
     
     Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
         user_id (str): User ID.
         data (Dict[str, Any]): New user data.
         model_name (str, optional): Model name. Defaults to "user".
@@ -86,14 +159,29 @@ def sql_update_user(user_id: str, data: Dict[str, Any], model_name: str = "user"
     Returns:
         Dict[str, Any]: Update result with user data or error message.
     """
-    User.use_db("sqlite")
-    user = User.update(model_name, user_id, **data)
+    error = _unknown_backend(backend)
+    if error:
+        return error
+    with User.using(backend):
+        user = User.update(model_name, user_id, **data)
     if user:
-        User.use_db("default")
         return {"status": "success", "user": user.to_dict()}
-    User.use_db("default")
     return {"status": "error", "message": "User not found"}
 
+@route('/sql/users/update')
+def sql_update_user(user_id: str, data: Dict[str, Any], model_name: str = "user") -> Dict[str, Any]:
+    """Update user data in SQL database.
+    
+    Args:
+        user_id (str): User ID.
+        data (Dict[str, Any]): New user data.
+        model_name (str, optional): Model name. Defaults to "user".
+        
+    Returns:
+        Dict[str, Any]: Update result with user data or error message.
+    """
+    return backend_update_user("sqlite", user_id, data, model_name)
+
 @route('/users/update')
 def update_user(user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
     """Update user data.
@@ -110,25 +198,40 @@ def update_user(user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
         return {"status": "success", "user": user.to_dict()}
     return {"status": "error", "message": "User not found"}
 
-@route('/sql/users/delete')
-def sql_delete_user(user_id: str, model_name: str = "user") -> Dict[str, Any]:
-    """Delete a user by ID from SQL database.
+@route('/{backend}/users/delete')
+def backend_delete_user(backend: str, user_id: str, model_name: str = "user") -> Dict[str, Any]:
+    """Delete a user by ID from any registered database.
     
     Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
         user_id (str): User ID.
         model_name (str, optional): Model name. Defaults to "user".
         
     Returns:
         Dict[str, Any]: Delete result or error message.
     """
-    User.use_db("sqlite")
-    result = User.delete(model_name, user_id)
+    error = _unknown_backend(backend)
+    if error:
+        return error
+    with User.using(backend):
+        result = User.delete(model_name, user_id)
     if result:
-        User.use_db("default")
         return {"status": "success", "message": "User deleted"}
-    User.use_db("default")
     return {"status": "error", "message": "User not found"}
 
+@route('/sql/users/delete')
+def sql_delete_user(user_id: str, model_name: str = "user") -> Dict[str, Any]:
+    """Delete a user by ID from SQL database.
+    
+    Args:
+        user_id (str): User ID.
+        model_name (str, optional): Model name. Defaults to "user".
+        
+    Returns:
+        Dict[str, Any]: Delete result or error message.
+    """
+    return backend_delete_user("sqlite", user_id, model_name)
+
 @route('/users/delete')
 def delete_user(user_id: str) -> Dict[str, Any]:
     """Delete a user by ID.
@@ -144,4 +247,219 @@ def delete_user(user_id: str) -> Dict[str, Any]:
         return {"status": "success", "message": "User deleted"}
     return {"status": "error", "message": "User not found"}
 
+@route('/{backend}/users/bulk_create')
+def backend_bulk_create_users(backend: str, data: List[Dict[str, Any]], model_name: str = "user") -> Dict[str, Any]:
+    """Create several users in any registered database in one transaction.
+    
+    Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
+        data (List[Dict[str, Any]]): User data for each new user.
+        model_name (str, optional): Model name. Defaults to "user".
+        
+    Returns:
+        Dict[str, Any]: Creation result with users data.
+    """
+    return _bulk("create", data, backend, model_name)
+
+@route('/sql/users/bulk_create')
+def sql_bulk_create_users(data: List[Dict[str, Any]], model_name: str = "user") -> Dict[str, Any]:
+    """Create several users in SQL database in one transaction.
+    
+    Args:
+        data (List[Dict[str, Any]]): User data for each new user.
+        model_name (str, optional): Model name. Defaults to "user".
+        
+    Returns:
+        Dict[str, Any]: Creation result with users data.
+    """
+    return backend_bulk_create_users("sqlite", data, model_name)
 
+@route('/users/bulk_create')
+def bulk_create_users(data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Create several users.
+    
+    Args:
+        data (List[Dict[str, Any]]): User data for each new user.
+        
+    Returns:
+        Dict[str, Any]: Creation result with users data.
+    """
+    return _bulk("create", data)
+
+@route('/{backend}/users/bulk_get')
+def backend_bulk_get_users(backend: str, user_ids: List[str], model_name: str = "user") -> Dict[str, Any]:
+    """Retrieve several users by ID from any registered database.
+    
+    Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
+        user_ids (List[str]): User IDs.
+        model_name (str, optional): Model name. Defaults to "user".
+        
+    Returns:
+        Dict[str, Any]: Data of the users that were found.
+    """
+    return _bulk("get", user_ids, backend, model_name)
+
+@route('/sql/users/bulk_get')
+def sql_bulk_get_users(user_ids: List[str], model_name: str = "user") -> Dict[str, Any]:
+    """Retrieve several users by ID from SQL database.
+    
+    Args:
+        user_ids (List[str]): User IDs.
+        model_name (str, optional): Model name. Defaults to "user".
+        
+    Returns:
+        Dict[str, Any]: Data of the users that were found.
+    """
+    return backend_bulk_get_users("sqlite", user_ids, model_name)
+
+@route('/users/bulk_get')
+def bulk_get_users(user_ids: List[str]) -> Dict[str, Any]:
+    """Retrieve several users by ID.
+    
+    Args:
+        user_ids (List[str]): User IDs.
+        
+    Returns:
+        Dict[str, Any]: Data of the users that were found.
+    """
+    return _bulk("get", user_ids)
+
+@route('/{backend}/users/bulk_update')
+def backend_bulk_update_users(backend: str, data: Dict[str, Dict[str, Any]], model_name: str = "user") -> Dict[str, Any]:
+    """Update several users in any registered database in one transaction.
+    
+    Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
+        data (Dict[str, Dict[str, Any]]): Mapping of user ID to new user data.
+        model_name (str, optional): Model name. Defaults to "user".
+        
+    Returns:
+        Dict[str, Any]: Update result with data of the updated users.
+    """
+    return _bulk("update", data, backend, model_name)
+
+@route('/sql/users/bulk_update')
+def sql_bulk_update_users(data: Dict[str, Dict[str, Any]], model_name: str = "user") -> Dict[str, Any]:
+    """Update several users in SQL database in one transaction.
+    
+    Args:
+        data (Dict[str, Dict[str, Any]]): Mapping of user ID to new user data.
+        model_name (str, optional): Model name. Defaults to "user".
+        
+    Returns:
+        Dict[str, Any]: Update result with data of the updated users.
+    """
+    return backend_bulk_update_users("sqlite", data, model_name)
+
+@route('/users/bulk_update')
+def bulk_update_users(data: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Update several users.
+    
+    Args:
+        data (Dict[str, Dict[str, Any]]): Mapping of user ID to new user data.
+        
+    Returns:
+        Dict[str, Any]: Update result with data of the updated users.
+    """
+    return _bulk("update", data)
+
+@route('/{backend}/users/bulk_delete')
+def backend_bulk_delete_users(backend: str, user_ids: List[str], model_name: str = "user") -> Dict[str, Any]:
+    """Delete several users by ID from any registered database in one transaction.
+    
+    Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
+        user_ids (List[str]): User IDs.
+        model_name (str, optional): Model name. Defaults to "user".
+        
+    Returns:
+        Dict[str, Any]: Delete result with the IDs of the deleted users.
+    """
+    return _bulk("delete", user_ids, backend, model_name)
+
+@route('/sql/users/bulk_delete')
+def sql_bulk_delete_users(user_ids: List[str], model_name: str = "user") -> Dict[str, Any]:
+    """Delete several users by ID from SQL database in one transaction.
+    
+    Args:
+        user_ids (List[str]): User IDs.
+        model_name (str, optional): Model name. Defaults to "user".
+        
+    Returns:
+        Dict[str, Any]: Delete result with the IDs of the deleted users.
+    """
+    return backend_bulk_delete_users("sqlite", user_ids, model_name)
+
+@route('/users/bulk_delete')
+def bulk_delete_users(user_ids: List[str]) -> Dict[str, Any]:
+    """Delete several users by ID.
+    
+    Args:
+        user_ids (List[str]): User IDs.
+        
+    Returns:
+        Dict[str, Any]: Delete result with the IDs of the deleted users.
+    """
+    return _bulk("delete", user_ids)
+
+@route('/{backend}/users/list')
+def backend_list_users(backend: str, limit: int = 50, after: Optional[str] = None, model_name: str = "user") -> Dict[str, Any]:
+    """List users page by page from any registered database.
+    
+    Args:
+        backend (str): Name of the registered database, e.g. "sqlite" or "test".
+        limit (int, optional): Maximum number of users per page. Defaults to 50.
+        after (str, optional): The "next" token of the previous page.
+        model_name (str, optional): Model name. Defaults to "user".
+        
+    Returns:
+        Dict[str, Any]: One page of users and the token of the next page, or
+            an error if the token is malformed or limit is less than 1.
+    """
+    error = _unknown_backend(backend)
+    if error:
+        return error
+    try:
+        with User.using(backend):
+            users, token = User.page(limit, after, model_name)
+    except ValueError as e:
+        return {"error": str(e)}
+    return {"status": "success", "users": [user.to_dict() for user in users], "next": token}
+
+@route('/sql/users/list')
+def sql_list_users(limit: int = 50, after: Optional[str] = None, model_name: str = "user") -> Dict[str, Any]:
+    """List users page by page from SQL database.
+    
+    Args:
+        limit (int, optional): Maximum number of users per page. Defaults to 50.
+        after (str, optional): The "next" token of the previous page.
+        model_name (str, optional): Model name. Defaults to "user".
+        
+    Returns:
+        Dict[str, Any]: One page of users and the token of the next page, or
+            an error if the token is malformed or limit is less than 1.
+    """
+    return backend_list_users("sqlite", limit, after, model_name)
+
+@route('/users/list')
+def list_users(limit: int = 50, after: Optional[str] = None) -> Dict[str, Any]:
+    """List users page by page.
+    
+    Deep pages cost the same as the first one: the token records where the
+    previous page ended instead of an offset.
+    
+    Args:
+        limit (int, optional): Maximum number of users per page. Defaults to 50.
+        after (str, optional): The "next" token of the previous page.
+        
+    Returns:
+        Dict[str, Any]: One page of users and the token of the next page,
+            which is None on the last page, or an error if the token is
+            malformed or limit is less than 1.
+    """
+    try:
+        users, token = User.page(limit, after)
+    except ValueError as e:
+        return {"error": str(e)}
+    return {"status": "success", "users": [user.to_dict() for user in users], "next": token}
@@ -0,0 +1,89 @@
+from typing import Any, Dict, Optional, Union
+
+def require_dict_records(database: Any, wrapper: str) -> None:
+    """Check that a database returns its records as plain dicts.
+
+    The databases wrapping others (caching, replication, write-behind,
+    sharding) copy, merge and rebuild records as dicts, which sqlite3.Row
+    objects and model instances do not fully support.
+
+    Args:
+        database (Any): The wrapped database.
+        wrapper (str): Name of the wrapper, for the error message.
+
+    Raises:
+        ValueError: If the database was set up with another row factory.
+    """
+    row_factory = getattr(database, "row_factory", "dict")
+    if row_factory != "dict":
+        raise ValueError(f"{wrapper} needs a database returning dict records, "
+                         f"got one with row_factory='{row_factory}'")
+
+
+class Database:
+    """Base class of the databases.
+
+    Defines the single-record operations every database provides; see
+    CustomDatabase for the full interface.
+
+    Attributes:
+        name (str): Name of the database.
+    """
+
+    def __init__(self, name: str) -> None:
+        """Initialize a database.
+
+        Args:
+            name (str): The name of the database.
+        """
+        self.name = name
+
+    def create(self, model_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new record.
+
+        Args:
+            model_name (str): The model/collection name.
+            data (Dict[str, Any]): Data to store.
+
+        Returns:
+            Dict[str, Any]: The created record with its ID.
+        """
+        raise NotImplementedError
+
+    def get(self, model_name: str, obj_id: Union[str, int]) -> Optional[Dict[str, Any]]:
+        """Get a record by ID.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Union[str, int]): ID of the record to retrieve.
+
+        Returns:
+            Optional[Dict[str, Any]]: The record if found, None otherwise.
+        """
+        raise NotImplementedError
+
+    def update(self, model_name: str, obj_id: Union[str, int],
+               data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update a record.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Union[str, int]): ID of the record to update.
+            data (Dict[str, Any]): New data to apply to the record.
+
+        Returns:
+            Optional[Dict[str, Any]]: The updated record if found, None otherwise.
+        """
+        raise NotImplementedError
+
+    def delete(self, model_name: str, obj_id: Union[str, int]) -> Optional[Dict[str, Any]]:
+        """Delete a record.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Union[str, int]): ID of the record to delete.
+
+        Returns:
+            Optional[Dict[str, Any]]: The deleted record if found, None otherwise.
+        """
+        raise NotImplementedError
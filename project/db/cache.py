@@ -0,0 +1,326 @@
+import copy
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from .base import require_dict_records
+
+def _copy(record: Any) -> Any:
+    """Copy a record, so the cache and its callers never share one.
+
+    Args:
+        record (Any): A dict, sqlite3.Row or model instance.
+
+    Returns:
+        Any: A shallow copy, or the record itself if it is immutable.
+    """
+    if type(record) is dict:
+        return dict(record)
+    if isinstance(record, sqlite3.Row):
+        return record
+    return copy.copy(record)
+
+
+class CachedDatabase:
+    """Read-through cache in front of another database.
+
+    Records read with get() and get_many() are kept in a bounded LRU cache,
+    optionally for a limited time. Writes go to the wrapped database first and
+    then refresh (create, update) or drop (delete) the cached copy, so reads
+    through this wrapper never see older data than it wrote. Anything else,
+    e.g. find() or page(), is passed through uncached.
+
+    Writes made to the wrapped database directly, bypassing this wrapper,
+    are not seen until the cached entry expires. Records are copied when
+    they are cached and when they are handed out, so changing a returned
+    record does not change the cache.
+
+    Usage:
+        DatabaseRegistry.register("sqlite_cached", CachedDatabase(sqlite_db, capacity=10000, ttl=60))
+
+    Attributes:
+        backend (Any): The wrapped database.
+        capacity (int): Maximum number of cached records.
+        ttl (float, optional): Seconds a cached record stays valid, or None
+            to keep it until it is evicted.
+        hits (int): Reads answered from the cache.
+        misses (int): Reads passed to the wrapped database.
+        evictions (int): Records dropped to make room.
+        expirations (int): Records dropped because their TTL ran out.
+    """
+
+    def __init__(self, backend: Any, capacity: int = 10000, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Wrap a database with a cache.
+
+        Args:
+            backend (Any): Database to cache.
+            capacity (int, optional): Maximum number of cached records. Defaults to 10000.
+            ttl (float, optional): Seconds a cached record stays valid. Defaults to no limit.
+            clock (Callable[[], float], optional): Time source for the TTL.
+                Defaults to time.monotonic.
+
+        Raises:
+            ValueError: If capacity is less than 1, or the database does not
+                return dict records.
+        """
+        if capacity < 1:
+            raise ValueError("Cache capacity must be at least 1")
+        require_dict_records(backend, "CachedDatabase")
+        self.backend = backend
+        self.capacity = capacity
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every write, so a read that raced with one does not
+        # store a record that may already be outdated
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.backend, name)
+
+    def _lookup(self, key: Tuple[str, str]) -> Optional[Any]:
+        """Get a fresh cached record and count the hit or miss.
+
+        Must be called with the lock held.
+
+        Args:
+            key (Tuple[str, str]): Model name and record ID.
+
+        Returns:
+            Optional[Any]: The cached record, or None.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            record, expires = entry
+            if expires is None or expires > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy(record)
+            del self._entries[key]
+            self.expirations += 1
+        self.misses += 1
+        return None
+
+    def _store(self, model_name: str, record: Any, writes: Optional[int] = None) -> None:
+        """Cache a record, evicting the least recently used ones if full.
+
+        Args:
+            model_name (str): The model/collection name.
+            record (Any): Record with an "id" field.
+            writes (int, optional): Write counter seen before the record was
+                read; the record is dropped if a write happened since.
+        """
+        key = (model_name, str(record["id"]))
+        expires = None if self.ttl is None else self._clock() + self.ttl
+        with self._lock:
+            if writes is not None and writes != self._writes:
+                return
+            self._entries[key] = (_copy(record), expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _invalidate(self, model_name: str, obj_ids: List[Union[str, int]]) -> None:
+        """Drop cached records and mark that a write happened.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_ids (List[Union[str, int]]): IDs of the records to drop.
+        """
+        with self._lock:
+            self._writes += 1
+            for obj_id in obj_ids:
+                self._entries.pop((model_name, str(obj_id)), None)
+
+    def get(self, model_name: str, obj_id: Union[str, int]) -> Optional[Any]:
+        """Get a record, from the cache if possible.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Union[str, int]): ID of the record to retrieve.
+
+        Returns:
+            Optional[Any]: The record if found, None otherwise.
+        """
+        with self._lock:
+            record = self._lookup((model_name, str(obj_id)))
+            writes = self._writes
+        if record is not None:
+            return record
+        record = self.backend.get(model_name, obj_id)
+        if record is not None:
+            self._store(model_name, record, writes)
+        return record
+
+    def get_many(self, model_name: str, obj_ids: List[Union[str, int]]) -> List[Any]:
+        """Get several records; only the uncached ones are read from the database.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_ids (List[Union[str, int]]): IDs of the records to retrieve.
+
+        Returns:
+            List[Any]: The records that were found, in the order of the requested IDs.
+        """
+        found: Dict[str, Any] = {}
+        missing = []
+        with self._lock:
+            for obj_id in obj_ids:
+                record = self._lookup((model_name, str(obj_id)))
+                if record is None:
+                    missing.append(obj_id)
+                else:
+                    found[str(obj_id)] = record
+            writes = self._writes
+        if missing:
+            for record in self.backend.get_many(model_name, missing):
+                found[str(record["id"])] = record
+                self._store(model_name, record, writes)
+        return [found[str(obj_id)] for obj_id in obj_ids if str(obj_id) in found]
+
+    def create(self, model_name: str, data: Dict[str, Any]) -> Optional[Any]:
+        """Create a record and cache it.
+
+        Args:
+            model_name (str): The model/collection name.
+            data (Dict[str, Any]): Data to store.
+
+        Returns:
+            Optional[Any]: The created record, or None if the database rejected it.
+        """
+        record = self.backend.create(model_name, data)
+        if record is not None:
+            self._invalidate(model_name, [record["id"]])
+            self._store(model_name, record)
+        return record
+
+    def update(self, model_name: str, obj_id: Union[str, int],
+               data: Dict[str, Any]) -> Optional[Any]:
+        """Update a record and refresh its cached copy.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Union[str, int]): ID of the record to update.
+            data (Dict[str, Any]): New data to apply to the record.
+
+        Returns:
+            Optional[Any]: The updated record if found, None otherwise.
+        """
+        self._invalidate(model_name, [obj_id])
+        record = self.backend.update(model_name, obj_id, data)
+        if record is not None:
+            self._store(model_name, record)
+        return record
+
+    def delete(self, model_name: str, obj_id: Union[str, int]) -> Optional[Any]:
+        """Delete a record and drop its cached copy.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Union[str, int]): ID of the record to delete.
+
+        Returns:
+            Optional[Any]: The deleted record if found, None otherwise.
+        """
+        self._invalidate(model_name, [obj_id])
+        return self.backend.delete(model_name, obj_id)
+
+    def create_many(self, model_name: str, records: List[Dict[str, Any]]) -> Optional[List[Any]]:
+        """Create several records and cache them.
+
+        Args:
+            model_name (str): The model/collection name.
+            records (List[Dict[str, Any]]): Data for each record to store.
+
+        Returns:
+            Optional[List[Any]]: The created records, or None if the batch failed.
+        """
+        created = self.backend.create_many(model_name, records)
+        if created:
+            self._invalidate(model_name, [record["id"] for record in created])
+            for record in created:
+                self._store(model_name, record)
+        return created
+
+    def update_many(self, model_name: str,
+                    updates: Dict[Union[str, int], Dict[str, Any]]) -> Optional[List[Any]]:
+        """Update several records and refresh their cached copies.
+
+        Args:
+            model_name (str): The model/collection name.
+            updates (Dict[Union[str, int], Dict[str, Any]]): Mapping of record ID
+                to the data to apply to that record.
+
+        Returns:
+            Optional[List[Any]]: The updated records, or None if the batch failed.
+        """
+        self._invalidate(model_name, list(updates))
+        updated = self.backend.update_many(model_name, updates)
+        for record in updated or []:
+            self._store(model_name, record)
+        return updated
+
+    def delete_many(self, model_name: str, obj_ids: List[Union[str, int]]) -> Optional[List[Any]]:
+        """Delete several records and drop their cached copies.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_ids (List[Union[str, int]]): IDs of the records to delete.
+
+        Returns:
+            Optional[List[Any]]: The deleted records, or None if the batch failed.
+        """
+        self._invalidate(model_name, obj_ids)
+        return self.backend.delete_many(model_name, obj_ids)
+
+    @contextmanager
+    def transaction(self) -> Iterator['CachedDatabase']:
+        """Run a transaction on the wrapped database.
+
+        Cached copies of records written inside the block cannot be told
+        apart from older ones, so a rollback empties the whole cache.
+
+        Yields:
+            CachedDatabase: This cache.
+        """
+        try:
+            with self.backend.transaction():
+                yield self
+        except BaseException:
+            self.clear()
+            raise
+
+    def clear(self) -> None:
+        """Drop every cached record."""
+        with self._lock:
+            self._writes += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the cache counters.
+
+        Returns:
+            Dict[str, Any]: Hits, misses, evictions, expirations, current size,
+                capacity and hit ratio.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries),
+                "capacity": self.capacity,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -1,91 +1,482 @@
-import sys
-from typing import Dict, Any, Optional, List, Union
-from .sqlite_adapter import SqliteDatabase
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Union, Tuple, Iterator
+from .base import Database
+from .ids import IdAllocator, allocator_factory
+from .indexes import InsertionOrder, build_index
+from .locks import DatabaseLocks
+from .persistence import Operation, WriteAheadLog
+from .snapshot import SnapshotFile, SnapshotTable, open_snapshot, write_snapshot
+from .query import Predicate, check_cursor, parse_conditions, parse_order, apply_options, matches
+from .registry import DatabaseRegistry  # noqa: F401 - imported from here by most callers
 
-sys.path.append('D:\\Code\\labs\\python_labs')
 
-from lab4.minidb.minidb.database import Database
-
-
-class DatabaseRegistry:
-    """Global database registry.
+class CustomDatabase(Database):
+    """Custom database implementation extending base Database class.
+    
+    This class provides in-memory data storage with basic CRUD operations,
+    and queries that can use secondary hash and sorted indexes.
     
-    A singleton class that provides a central registry for database instances,
-    allowing different parts of the application to access databases by name.
+    Given a path, the database is also kept on disk: every change is written
+    to a write-ahead log (see db.persistence) before it is applied, and a
+    snapshot of all records is taken every snapshot_every logged changes,
+    after which the log segments it covers are deleted. On start the latest
+    snapshot is mapped into memory and only the log entries after it are
+    replayed. Changes made inside a transaction are logged together when it
+    commits.
+    
+    Snapshots are columnar binary files (see db.snapshot). Records of a model
+    are served from the mapped file one by one as they are looked up, and
+    the whole model is only decoded once it is scanned, e.g. by find(),
+    page() or create_index().
+    
+    Each model gets its own ID allocator (see db.ids), so IDs are never
+    reused after a delete. The default strategy hands out increasing
+    integers, which are stored as they are; numeric strings given by
+    callers are converted to them.
+    
+    By default the database is meant for one thread at a time. With a
+    concurrency mode (see db.locks.DatabaseLocks) it can be shared: reads
+    of a model run in parallel, writes lock the model, or in "striped" mode
+    only the record they change.
+    
+    Usage:
+        db = CustomDatabase("default", path="data/default", fsync="interval")
     
     Attributes:
-        _databases (dict): Internal storage for database instances.
+        name (str): The name of the database.
+        data (dict): In-memory storage for database records.
+        indexes (dict): Secondary indexes keyed by model name, then field name.
+        order (dict): Insertion order of each model's records, used to walk
+            and page through them.
+        path (str, optional): Directory holding the log and snapshot, or None
+            to keep the data in memory only.
+        snapshot_every (int, optional): Number of logged changes after which
+            a snapshot is taken, or None to only take them with snapshot().
+        _undo_log (list, optional): Previous versions of the records changed
+            inside the current transaction, or None outside a transaction.
+        _pending (list, optional): Operations to log when the current
+            transaction commits, or None outside a transaction.
+        _cold (dict): Snapshot records of each model not decoded yet.
+        _allocators (dict): ID allocator of each model.
     """
-    _databases: Dict[str, Any] = {}
+    def __init__(self, name: str, path: Optional[str] = None, fsync: str = "always",
+                 sync_interval: float = 1.0, snapshot_every: Optional[int] = 100000,
+                 id_strategy: Any = "sequence", concurrency: Optional[str] = None,
+                 lock_stripes: int = 64) -> None:
+        """Initialize a custom database instance.
+        
+        Args:
+            name (str): The name of the database.
+            path (str, optional): Directory to persist the data in; it is
+                recovered from there if it already holds data. Defaults to
+                keeping the data in memory only.
+            fsync (str, optional): "always", "interval" or "never"; see
+                WriteAheadLog. Defaults to "always".
+            sync_interval (float, optional): Seconds between syncs for the
+                "interval" policy. Defaults to 1.0.
+            snapshot_every (int, optional): Logged changes between automatic
+                snapshots. Defaults to 100000.
+            id_strategy (Any, optional): "sequence", "snowflake" or "ulid", or
+                a callable returning a new IdAllocator for each model.
+                Defaults to "sequence".
+            concurrency (str, optional): None, "model" or "striped"; see
+                DatabaseLocks. Defaults to None.
+            lock_stripes (int, optional): Record lock stripes for the
+                "striped" mode. Defaults to 64.
+                
+        Raises:
+            ValueError: If the fsync policy, the ID strategy or the
+                concurrency mode is unknown.
+        """
+        super().__init__(name)
+        self.data: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+        self.indexes: Dict[str, Dict[str, Any]] = {}
+        self.order: Dict[str, InsertionOrder] = {}
+        self._undo_log: Optional[List[Tuple[str, Any, Optional[Dict[str, Any]]]]] = None
+        self._pending: Optional[List[Operation]] = None
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self._wal: Optional[WriteAheadLog] = None
+        self._snapshot_file: Optional[SnapshotFile] = None
+        self._cold: Dict[str, SnapshotTable] = {}
+        self._id_factory = allocator_factory(id_strategy)
+        self._allocators: Dict[str, IdAllocator] = {}
+        self._allocators_lock = threading.Lock()
+        self._locks = DatabaseLocks(concurrency, lock_stripes)
+        self._snapshot_lock = threading.Lock()
+        # Orders log writes with the changes they describe, and snapshots with both
+        self._wal_lock = threading.RLock()
+        self._logged = 0
+        if path is not None:
+            self._recover(fsync, sync_interval)
+
+    @property
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.path, "snapshot.bin")
 
-    @classmethod
-    def register(cls, name: str, db_instance: Any) -> None:
-        """Register a database instance with a name.
+    def _recover(self, fsync: str, sync_interval: float) -> None:
+        """Map the latest snapshot and replay the log written after it.
         
         Args:
-            name (str): Unique name for the database instance.
-            db_instance (Any): Database instance to register.
+            fsync (str): Fsync policy of the log.
+            sync_interval (float): Seconds between syncs for the "interval" policy.
         """
-        cls._databases[name] = db_instance
+        os.makedirs(self.path, exist_ok=True)
+        lsn = 0
+        snapshot = open_snapshot(self._snapshot_path)
+        if snapshot is not None:
+            self._snapshot_file = snapshot
+            self._cold = dict(snapshot.tables)
+            lsn = snapshot.lsn
+
+        def replay(operations: List[Operation]) -> None:
+            for operation in operations:
+                self._apply(operation)
+            self._logged += len(operations)
+
+        self._wal = WriteAheadLog.open(os.path.join(self.path, "wal"), replay, lsn, fsync, sync_interval)
 
-    @classmethod
-    def get(cls, name: str) -> Optional[Any]:
-        """Retrieve a database instance by name.
+    def _apply(self, operation: Operation) -> None:
+        """Apply a logged operation to the in-memory data.
+        
+        Operations carry absolute values, so applying one again is harmless.
+        
+        Args:
+            operation (Operation): ("put", model, id, record),
+                ("patch", model, id, data) or ("delete", model, id).
+        """
+        kind, model_name = operation[0], operation[1]
+        allocator = self._allocator(model_name)
+        obj_id = allocator.key(operation[2])
+        table = self.data.setdefault(model_name, {})
+        old = table.get(obj_id)
+        if old is None and self._cold:
+            old = self._fault(model_name, obj_id)
+        if kind == "put":
+            allocator.observe(obj_id)
+            new = operation[3]
+        elif kind == "patch":
+            if old is None:
+                return
+            new = {**old, **operation[3]}
+        else:
+            if old is None:
+                return
+            new = None
+        self._reindex(model_name, obj_id, old, new)
+        if new is None:
+            del table[obj_id]
+        else:
+            table[obj_id] = new
+
+    def _fault(self, model_name: str, obj_id: Any) -> Optional[Dict[str, Any]]:
+        """Decode a record from the snapshot and keep it in memory.
         
         Args:
-            name (str): Name of the database to retrieve.
+            model_name (str): The model/collection name.
+            obj_id (Any): ID of the record.
             
         Returns:
-            Optional[Any]: The database instance if found, None otherwise.
+            Optional[Dict[str, Any]]: The record, or None if the snapshot does
+                not hold it, or it was decoded before.
         """
-        return cls._databases.get(name)
+        cold = self._cold.get(model_name)
+        if cold is None:
+            return None
+        record = cold.take(obj_id)
+        if record is not None:
+            self.data.setdefault(model_name, {})[obj_id] = record
+        return record
 
-    @classmethod
-    def list(cls) -> List[str]:
-        """List all registered database names.
+    def _materialize(self, model_name: str) -> None:
+        """Decode the snapshot records of a model that are still undecoded.
+        
+        Records from the snapshot come first in the insertion order, followed
+        by the ones created since.
         
+        Args:
+            model_name (str): The model/collection name.
+        """
+        if model_name not in self._cold:
+            return
+        # Seed the allocator while it can still see the snapshot's last ID
+        self._allocator(model_name)
+        cold = self._cold.pop(model_name)
+        table = self.data.setdefault(model_name, {})
+        order = InsertionOrder()
+        for obj_id, record in cold.take_all():
+            if record is not None:
+                table[obj_id] = record
+            if obj_id in table:
+                order.add(obj_id)
+        created = self.order.get(model_name)
+        if created is not None:
+            for _, obj_id in created.after():
+                if obj_id not in order:
+                    order.add(obj_id)
+        self.order[model_name] = order
+        if not self._cold:
+            self._snapshot_file.close()
+            self._snapshot_file = None
+
+    def _allocator(self, model_name: str) -> IdAllocator:
+        """Get the ID allocator of a model, creating it on first use.
+        
+        A new allocator continues after the IDs in the snapshot.
+        
+        Args:
+            model_name (str): The model/collection name.
+            
         Returns:
-            List[str]: List of registered database names.
+            IdAllocator: The allocator.
         """
-        return list(cls._databases.keys())
-    
-class CustomDatabase(Database):
-    """Custom database implementation extending base Database class.
-    
-    This class provides in-memory data storage with basic CRUD operations.
-    
-    Attributes:
-        name (str): The name of the database.
-        data (dict): In-memory storage for database records.
-    """
-    def __init__(self, name: str) -> None:
-        """Initialize a custom database instance.
+        allocator = self._allocators.get(model_name)
+        if allocator is None:
+            with self._allocators_lock:
+                allocator = self._allocators.get(model_name)
+                if allocator is None:
+                    allocator = self._id_factory()
+                    cold = self._cold.get(model_name)
+                    if cold is not None:
+                        allocator.observe(cold.last_id())
+                    self._allocators[model_name] = allocator
+        return allocator
+
+    @contextmanager
+    def _logging(self, operation: Operation) -> Iterator[None]:
+        """Log a change before the block applies it.
+        
+        Inside a transaction the operation is only queued until it commits.
+        Otherwise it is written to the log and applied while holding the log
+        lock, so a snapshot never sees one without the other, and the block
+        exits once the log entry is durable.
         
         Args:
-            name (str): The name of the database.
+            operation (Operation): The change the block applies.
         """
-        super().__init__(name)
-        self.data: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        if self._wal is None:
+            yield
+            return
+        if self._pending is not None:
+            self._pending.append(operation)
+            yield
+            return
+        with self._wal_lock:
+            lsn = self._wal.write([operation])
+            self._logged += 1
+            yield
+        self._wal.sync(lsn)
+
+    def _snapshot_if_due(self) -> None:
+        """Take a snapshot once enough changes have been logged since the last one.
+        
+        Called by writes once they released their locks. If another thread is
+        already taking the snapshot, this one does not wait for it.
+        """
+        if (self.snapshot_every is None or self._logged < self.snapshot_every
+                or self._undo_log is not None):
+            return
+        if not self._snapshot_lock.acquire(blocking=False):
+            return
+        try:
+            if self._logged >= self.snapshot_every:
+                self.snapshot()
+        finally:
+            self._snapshot_lock.release()
+
+    def snapshot(self) -> None:
+        """Write all records to the snapshot and delete the log it covers.
+        
+        Writers only wait while the records are copied, not while the
+        snapshot is written to disk. With a concurrency mode, the snapshot
+        waits for transactions of other threads to end.
+        
+        Raises:
+            RuntimeError: If the database is not persistent or a transaction is open.
+        """
+        if self._wal is None:
+            raise RuntimeError(f"Database '{self.name}' is not persistent")
+        with self._locks.transaction():
+            if self._undo_log is not None:
+                raise RuntimeError("Cannot take a snapshot inside a transaction")
+            for model_name in list(self._cold):
+                with self._locks.write(model_name):
+                    self._materialize(model_name)
+            with self._wal_lock:
+                lsn = self._wal.rotate()
+                data = {
+                    model_name: [dict(table[obj_id]) for _, obj_id in self.order[model_name].after()]
+                    for model_name, table in self.data.items() if table
+                }
+                self._logged = 0
+        write_snapshot(self._snapshot_path, lsn, data)
+        self._wal.drop_before(lsn)
+
+    def close(self) -> None:
+        """Force the log to disk and close it."""
+        if self._wal is not None:
+            self._wal.close()
+
+    def _remember(self, model_name: str, obj_id: Any) -> None:
+        """Save the current version of a record before it is changed.
+        
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Any): ID of the record about to change.
+        """
+        if self._undo_log is not None:
+            previous = self.data.get(model_name, {}).get(obj_id)
+            self._undo_log.append((model_name, obj_id, dict(previous) if previous is not None else None))
+
+    def _reindex(self, model_name: str, obj_id: Any,
+                 old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        """Replace a record's entries in the secondary indexes of its model.
+        
+        Also appends new records to, and removes deleted records from, the
+        model's insertion order.
+        
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Any): ID of the record.
+            old (Dict[str, Any], optional): Version currently indexed, if any.
+            new (Dict[str, Any], optional): Version to index, if any.
+        """
+        if old is None and new is not None:
+            self.order.setdefault(model_name, InsertionOrder()).add(obj_id)
+        elif old is not None and new is None:
+            order = self.order.get(model_name)
+            if order is not None:
+                order.remove(obj_id)
+        for index in self.indexes.get(model_name, {}).values():
+            if old is not None:
+                index.remove(obj_id, old)
+            if new is not None:
+                index.add(obj_id, new)
+
+    def create_index(self, model_name: str, field: str, kind: str = "hash") -> None:
+        """Declare a secondary index on a field.
+        
+        The index is built from the existing records once and then kept up to
+        date by every create, update and delete. Declaring an index that
+        already exists does nothing.
+        
+        Args:
+            model_name (str): The model/collection name.
+            field (str): Name of the field to index.
+            kind (str, optional): "hash" for equality lookups in O(1), or
+                "sorted" for equality and range lookups in O(log n).
+                Defaults to "hash".
+                
+        Raises:
+            ValueError: If the index kind is unknown.
+        """
+        # BaseModel.filter() declares its indexes on every call: skip the
+        # exclusive model lock when there is nothing to build
+        if field in self.indexes.get(model_name, {}):
+            return
+        with self._locks.write(model_name):
+            model_indexes = self.indexes.setdefault(model_name, {})
+            if field not in model_indexes:
+                self._materialize(model_name)
+                records = self.data.get(model_name, {}).items()
+                model_indexes[field] = build_index(field, kind, records)
+
+    @contextmanager
+    def transaction(self) -> Iterator['CustomDatabase']:
+        """Group several operations so they are undone together on failure.
+        
+        Changes are applied immediately; if an exception escapes the block,
+        every record changed inside it is restored. Blocks can be nested, and
+        an exception in an inner block only undoes the work of that block.
         
+        With a concurrency mode, other threads cannot write until the
+        outermost block ends.
+        
+        Yields:
+            CustomDatabase: This database instance.
+            
+        Raises:
+            Exception: Any exception raised inside the block, after rollback.
+        """
+        with self._locks.transaction():
+            outermost = self._undo_log is None
+            if outermost:
+                self._undo_log = []
+                self._pending = [] if self._wal is not None else None
+            savepoint = len(self._undo_log)
+            logged = len(self._pending) if self._pending is not None else 0
+            try:
+                yield self
+                if outermost and self._pending:
+                    self._commit_pending()
+            except BaseException:
+                for model_name, obj_id, previous in reversed(self._undo_log[savepoint:]):
+                    with self._locks.write(model_name):
+                        table = self.data.setdefault(model_name, {})
+                        self._reindex(model_name, obj_id, table.get(obj_id), previous)
+                        if previous is None:
+                            table.pop(obj_id, None)
+                        else:
+                            table[obj_id] = previous
+                del self._undo_log[savepoint:]
+                if self._pending is not None:
+                    del self._pending[logged:]
+                raise
+            finally:
+                if outermost:
+                    self._undo_log = None
+                    self._pending = None
+        if outermost:
+            self._snapshot_if_due()
+
+    def _commit_pending(self) -> None:
+        """Log the operations of a committing transaction as one entry."""
+        operations = self._pending
+        with self._wal_lock:
+            lsn = self._wal.write(operations)
+            self._logged += len(operations)
+        self._wal.sync(lsn)
+        self._pending = None
+
     def create(self, model_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a record in the database.
         
+        An ID given in the data is kept, e.g. one assigned by ShardedDatabase;
+        otherwise the model's allocator hands out a new one.
+        
         Args:
             model_name (str): The model/collection name.
             data (Dict[str, Any]): Data to store.
             
         Returns:
             Dict[str, Any]: The created record with generated ID.
+            
+        Raises:
+            ValueError: If a record with the given ID already exists.
         """
-        if model_name not in self.data:
-            self.data[model_name] = {}
-        
-        # Simple ID generation
-        obj_id = str(len(self.data[model_name]) + 1)
+        allocator = self._allocator(model_name)
+        obj_id = data.get("id")
+        if obj_id is None:
+            obj_id = allocator.next()
+        else:
+            obj_id = allocator.key(obj_id)
+            allocator.observe(obj_id)
         record = dict(data)  # Create a copy of the data
         record['id'] = obj_id
         
-        self.data[model_name][obj_id] = record
+        with self._locks.write(model_name):
+            if self._cold:
+                self._fault(model_name, obj_id)
+            table = self.data.setdefault(model_name, {})
+            if obj_id in table:
+                raise ValueError(f"Record '{obj_id}' already exists in '{model_name}'")
+            with self._logging(("put", model_name, obj_id, record)):
+                self._remember(model_name, obj_id)
+                self._reindex(model_name, obj_id, None, record)
+                table[obj_id] = record
+        self._snapshot_if_due()
         return record
     
     def get(self, model_name: str, obj_id: Union[str, int]) -> Optional[Dict[str, Any]]:
@@ -98,8 +489,16 @@ class CustomDatabase(Database):
         Returns:
             Optional[Dict[str, Any]]: The record if found, None otherwise.
         """
-        obj_id = str(obj_id)
-        return self.data.get(model_name, {}).get(obj_id)
+        if type(obj_id) is not int:
+            obj_id = self._allocator(model_name).key(obj_id)
+        with self._locks.lookup(model_name, obj_id):
+            record = self.data.get(model_name, {}).get(obj_id)
+        if record is None and self._cold:
+            with self._locks.write(model_name):
+                record = self.data.get(model_name, {}).get(obj_id)
+                if record is None:
+                    record = self._fault(model_name, obj_id)
+        return record
     
     def update(self, model_name: str, obj_id: Union[str, int], 
                data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -114,11 +513,45 @@ class CustomDatabase(Database):
             Optional[Dict[str, Any]]: The updated record if found and updated,
                 None otherwise.
         """
-        obj_id = str(obj_id)
-        if model_name in self.data and obj_id in self.data[model_name]:
-            self.data[model_name][obj_id].update(data)
-            return self.data[model_name][obj_id]
-        return None
+        if type(obj_id) is not int:
+            obj_id = self._allocator(model_name).key(obj_id)
+        if self._cold:
+            with self._locks.write(model_name):
+                self._fault(model_name, obj_id)
+        while True:
+            # Changing an indexed field changes the index shared by the model
+            reindex = self._touches_index(model_name, data)
+            lock = self._locks.write(model_name) if reindex else self._locks.record(model_name, obj_id)
+            with lock:
+                if not reindex and self._touches_index(model_name, data):
+                    continue  # An index was created meanwhile
+                record = self.data.get(model_name, {}).get(obj_id)
+                if record is None:
+                    return None
+                with self._logging(("patch", model_name, obj_id, dict(data))):
+                    self._remember(model_name, obj_id)
+                    indexes = self.indexes.get(model_name)
+                    touched = [index for field, index in indexes.items() if field in data] if indexes else []
+                    for index in touched:
+                        index.remove(obj_id, record)
+                    record.update(data)
+                    for index in touched:
+                        index.add(obj_id, record)
+            self._snapshot_if_due()
+            return record
+
+    def _touches_index(self, model_name: str, data: Dict[str, Any]) -> bool:
+        """Check whether an update changes an indexed field.
+        
+        Args:
+            model_name (str): The model/collection name.
+            data (Dict[str, Any]): Data the update applies.
+            
+        Returns:
+            bool: True if one of the fields is indexed.
+        """
+        indexes = self.indexes.get(model_name)
+        return bool(indexes) and any(field in indexes for field in data)
     
     def delete(self, model_name: str, obj_id: Union[str, int]) -> Optional[Dict[str, Any]]:
         """Delete a record.
@@ -131,11 +564,227 @@ class CustomDatabase(Database):
             Optional[Dict[str, Any]]: The deleted record if found,
                 None otherwise.
         """
-        obj_id = str(obj_id)
-        if model_name in self.data and obj_id in self.data[model_name]:
-            deleted = self.data[model_name].pop(obj_id)
-            return deleted
-        return None   
+        if type(obj_id) is not int:
+            obj_id = self._allocator(model_name).key(obj_id)
+        with self._locks.write(model_name):
+            if self._cold:
+                self._fault(model_name, obj_id)
+            table = self.data.get(model_name)
+            if table is None or obj_id not in table:
+                return None
+            with self._logging(("delete", model_name, obj_id)):
+                self._remember(model_name, obj_id)
+                deleted = table.pop(obj_id)
+                self._reindex(model_name, obj_id, deleted, None)
+        self._snapshot_if_due()
+        return deleted
+
+    def create_many(self, model_name: str,
+                    records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create several records in one call.
+        
+        Args:
+            model_name (str): The model/collection name.
+            records (List[Dict[str, Any]]): Data for each record to store.
+            
+        Returns:
+            List[Dict[str, Any]]: The created records with generated IDs,
+                in the same order as the input.
+        """
+        with self.transaction():
+            return [self.create(model_name, data) for data in records]
+
+    def get_many(self, model_name: str,
+                 obj_ids: List[Union[str, int]]) -> List[Dict[str, Any]]:
+        """Get several records by ID.
+        
+        Args:
+            model_name (str): The model/collection name.
+            obj_ids (List[Union[str, int]]): IDs of the records to retrieve.
+            
+        Returns:
+            List[Dict[str, Any]]: The records that were found, in the order
+                of the requested IDs. Missing IDs are skipped.
+        """
+        if self._cold or self._locks.enabled:
+            return [record for record in map(lambda obj_id: self.get(model_name, obj_id), obj_ids)
+                    if record is not None]
+        table = self.data.get(model_name, {})
+        key = self._allocator(model_name).key
+        records = (table.get(obj_id if type(obj_id) is int else key(obj_id)) for obj_id in obj_ids)
+        return [record for record in records if record is not None]
+
+    def update_many(self, model_name: str,
+                    updates: Dict[Union[str, int], Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Update several records.
+        
+        Args:
+            model_name (str): The model/collection name.
+            updates (Dict[Union[str, int], Dict[str, Any]]): Mapping of record
+                ID to the data to apply to that record.
+                
+        Returns:
+            List[Dict[str, Any]]: The records that were found and updated.
+        """
+        with self.transaction():
+            updated = [self.update(model_name, obj_id, data) for obj_id, data in updates.items()]
+        return [record for record in updated if record is not None]
+
+    def delete_many(self, model_name: str,
+                    obj_ids: List[Union[str, int]]) -> List[Dict[str, Any]]:
+        """Delete several records.
+        
+        Args:
+            model_name (str): The model/collection name.
+            obj_ids (List[Union[str, int]]): IDs of the records to delete.
+            
+        Returns:
+            List[Dict[str, Any]]: The records that were found and deleted.
+        """
+        with self.transaction():
+            deleted = [self.delete(model_name, obj_id) for obj_id in obj_ids]
+        return [record for record in deleted if record is not None]
+
+    def find(self, model_name: str, where: Dict[str, Any],
+             order_by: Optional[Union[str, List[str]]] = None, limit: Optional[int] = None,
+             offset: Optional[int] = None, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Find the records matching some conditions.
+        
+        Conditions use field names with an optional operator suffix, e.g.
+        ``{"email": "a@example.com"}`` or ``{"price__gte": 10, "price__lt": 20}``.
+        If one of the fields has a secondary index, only the records it selects
+        are checked; otherwise every record of the model is scanned.
+        
+        Args:
+            model_name (str): The model/collection name.
+            where (Dict[str, Any]): Conditions every returned record must meet.
+            order_by (Union[str, List[str]], optional): Field(s) to sort by; a
+                leading "-" sorts descending.
+            limit (int, optional): Maximum number of records to return.
+            offset (int, optional): Number of matching records to skip.
+            fields (List[str], optional): Fields to return. Defaults to whole records.
+            
+        Returns:
+            List[Dict[str, Any]]: The matching records.
+            
+        Raises:
+            ValueError: If a condition uses an unsupported operator.
+        """
+        predicates = parse_conditions(where)
+        if self._cold:
+            with self._locks.write(model_name):
+                self._materialize(model_name)
+        with self._locks.read(model_name):
+            table = self.data.get(model_name, {})
+            candidates = self._plan(model_name, predicates)
+            if candidates is None:
+                records = table.values()
+            else:
+                records = (table[obj_id] for obj_id in candidates if obj_id in table)
+            found = [record for record in records if matches(record, predicates)]
+        order = parse_order(order_by)
+        if order or limit is not None or offset or fields:
+            found = apply_options(found, order, limit, offset, fields)
+        return found
+
+    def iter_records(self, model_name: str, batch_size: int = 500,
+                     after: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Walk the records of a model lazily, in insertion order.
+        
+        Records are yielded one by one without copying the table, so memory
+        use does not depend on its size. Records created while walking may
+        or may not be included.
+        
+        With a concurrency mode, records are read a page at a time, so the
+        model is not locked while the caller handles them.
+        
+        Args:
+            model_name (str): The model/collection name.
+            batch_size (int, optional): Records per page with a concurrency
+                mode; unused otherwise. Defaults to 500.
+            after (int, optional): Position returned by page() to resume after.
+            
+        Yields:
+            Dict[str, Any]: Each record.
+        """
+        if self._locks.enabled:
+            while True:
+                records, after = self.page(model_name, batch_size, after)
+                yield from records
+                if after is None:
+                    return
+        self._materialize(model_name)
+        order = self.order.get(model_name)
+        if order is None:
+            return
+        table = self.data[model_name]
+        for _, obj_id in order.after(after):
+            record = table.get(obj_id)
+            if record is not None:
+                yield record
+
+    def page(self, model_name: str, limit: int = 50,
+             after: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Get one page of records, in insertion order.
+        
+        The position of the last record is returned as the cursor for the
+        next page. Finding that position again is a binary search, so deep
+        pages cost the same as the first page.
+        
+        Args:
+            model_name (str): The model/collection name.
+            limit (int, optional): Maximum number of records. Defaults to 50.
+            after (int, optional): Cursor of the previous page. Defaults to the start.
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[int]]: The records and the cursor
+                of the next page, or None if there are no more records.
+        
+        Raises:
+            ValueError: If the cursor is not an int.
+        """
+        check_cursor(after, int)
+        if self._cold:
+            with self._locks.write(model_name):
+                self._materialize(model_name)
+        with self._locks.read(model_name):
+            order = self.order.get(model_name)
+            if order is None:
+                return [], None
+            table = self.data[model_name]
+            records: List[Dict[str, Any]] = []
+            cursor = None
+            for seq, obj_id in order.after(after):
+                if len(records) == limit:
+                    return records, cursor
+                records.append(table[obj_id])
+                cursor = seq
+            return records, None
+
+    def _plan(self, model_name: str, predicates: List[Predicate]) -> Optional[List[Any]]:
+        """Pick the index that narrows a query the most.
+        
+        Args:
+            model_name (str): The model/collection name.
+            predicates (List[Predicate]): Conditions of the query.
+            
+        Returns:
+            Optional[List[Any]]: IDs of the candidate records, or None if no
+                index applies and the model has to be scanned.
+        """
+        indexes = self.indexes.get(model_name)
+        if not indexes:
+            return None
+        by_field: Dict[str, List[Predicate]] = {}
+        for predicate in predicates:
+            if predicate.field in indexes:
+                by_field.setdefault(predicate.field, []).append(predicate)
+        best = None
+        for field, field_predicates in by_field.items():
+            candidates = indexes[field].lookup(field_predicates)
+            if candidates is not None and (best is None or len(candidates) < len(best)):
+                best = candidates
+        return best
 
     def custom_method(self) -> str:
         """Custom method example.
@@ -144,16 +793,3 @@ class CustomDatabase(Database):
             str: A message showing this method was called.
         """
         return f"Custom method called from {self.name}"
-    
-      
-default_db = CustomDatabase("default")
-test_db = CustomDatabase("test")
-sqlite_db = SqliteDatabase("database.db")
-
-# Register databases
-DatabaseRegistry.register("default", default_db)
-DatabaseRegistry.register("test", test_db)
-DatabaseRegistry.register("sqlite", sqlite_db)
-
-databases = DatabaseRegistry.list()
-print(f"Available databases: {databases}")
\ No newline at end of file
@@ -0,0 +1,327 @@
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Crockford base32 alphabet used by ULIDs
+_ULID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+class IdAllocator:
+    """Hands out record IDs for one model.
+
+    IDs are never handed out twice by the same allocator, even after the
+    records they were given to are deleted.
+    """
+
+    def next(self) -> Any:
+        """Get a new ID.
+
+        Returns:
+            Any: The ID.
+        """
+        raise NotImplementedError
+
+    def observe(self, obj_id: Any) -> None:
+        """Take note of an ID that was handed out elsewhere, e.g. before a
+        restart, so it is never handed out again.
+
+        Args:
+            obj_id (Any): An existing ID.
+        """
+
+    def key(self, obj_id: Any) -> Any:
+        """Convert an ID given by a caller, e.g. from a URL, to the stored type.
+
+        Args:
+            obj_id (Any): The ID as given.
+
+        Returns:
+            Any: The ID as stored.
+        """
+        return obj_id
+
+
+class _IntKeys(IdAllocator):
+    """Allocator of integer IDs; numeric strings are accepted as keys."""
+
+    def key(self, obj_id: Any) -> Any:
+        if type(obj_id) is str and obj_id.isdigit():
+            return int(obj_id)
+        return obj_id
+
+
+class SequenceAllocator(_IntKeys):
+    """Increasing integers: 1, 2, 3, ...
+
+    next() and observe() share one lock, so concurrent callers always get
+    distinct IDs, even while the sequence is moved past an existing ID.
+    """
+
+    def __init__(self, start: int = 1) -> None:
+        """Start a sequence.
+
+        Args:
+            start (int, optional): First ID. Defaults to 1.
+        """
+        self._next = start
+        self._lock = threading.Lock()
+
+    def next(self) -> int:
+        with self._lock:
+            obj_id = self._next
+            self._next = obj_id + 1
+            return obj_id
+
+    def observe(self, obj_id: Any) -> None:
+        """Continue the sequence after an existing ID, if it is not past it already.
+
+        The sequence never moves backwards.
+
+        Args:
+            obj_id (Any): An existing ID; anything but an int is ignored.
+        """
+        # The sequence only grows, so an ID below it needs no lock
+        if type(obj_id) is not int or obj_id < self._next:
+            return
+        with self._lock:
+            if obj_id >= self._next:
+                self._next = obj_id + 1
+
+
+class BlockAllocator(_IntKeys):
+    """Increasing integers taken from blocks reserved in a shared source.
+
+    Processes sharing the source each reserve a whole block at a time and
+    hand out its IDs locally, so the source is only touched once per block.
+    IDs are unique across the processes and increase within each of them.
+    """
+
+    def __init__(self, reserve: Callable[[int], int], block_size: int = 1000) -> None:
+        """Use a block source.
+
+        Args:
+            reserve (Callable[[int], int]): Reserves that many IDs and returns
+                the first one, e.g. a FileBlockSource.
+            block_size (int, optional): IDs reserved at a time. Defaults to 1000.
+
+        Raises:
+            ValueError: If block_size is not positive.
+        """
+        if block_size < 1:
+            raise ValueError("block_size must be positive")
+        self._reserve = reserve
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+
+    def next(self) -> int:
+        with self._lock:
+            if self._next >= self._end:
+                self._next = self._reserve(self.block_size)
+                self._end = self._next + self.block_size
+            obj_id = self._next
+            self._next += 1
+            return obj_id
+
+
+class FileBlockSource:
+    """Counter file from which processes reserve blocks of IDs.
+
+    The file holds the next free ID and is locked while a block is taken
+    out, so processes on the same machine never get overlapping blocks.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Use a counter file; it is created on the first reservation.
+
+        Args:
+            path (str): Counter file path.
+        """
+        self.path = path
+
+    def __call__(self, count: int) -> int:
+        """Reserve consecutive IDs.
+
+        Args:
+            count (int): Number of IDs.
+
+        Returns:
+            int: The first reserved ID.
+        """
+        descriptor = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            _lock_file(descriptor)
+            text = os.read(descriptor, 32).strip()
+            start = int(text) if text else 1
+            os.lseek(descriptor, 0, os.SEEK_SET)
+            os.ftruncate(descriptor, 0)
+            os.write(descriptor, str(start + count).encode())
+            os.fsync(descriptor)
+            return start
+        finally:
+            os.close(descriptor)
+
+
+class SnowflakeAllocator(_IntKeys):
+    """Time-ordered 63-bit integers, unique per worker number.
+
+    An ID packs the milliseconds since epoch (41 bits), a worker number
+    (10 bits) and a per-millisecond sequence (12 bits). Processes given
+    different worker numbers never produce the same ID; processes sharing
+    one can.
+
+    Without an explicit worker number, the SNOWFLAKE_WORKER environment
+    variable is used, or else the process ID modulo 1024. That keeps
+    processes on one machine apart unless their process IDs differ by a
+    multiple of 1024; give every process its own number when that is not
+    enough, e.g. across machines.
+    """
+
+    WORKER_BITS = 10
+    SEQUENCE_BITS = 12
+
+    def __init__(self, worker: Optional[int] = None, epoch: float = 1577836800.0,
+                 clock: Callable[[], float] = time.time) -> None:
+        """Set up a worker.
+
+        Args:
+            worker (int, optional): Worker number, 0 to 1023. Defaults to
+                SNOWFLAKE_WORKER, or the process ID modulo 1024.
+            epoch (float, optional): Unix time the timestamps count from.
+                Defaults to 2020-01-01.
+            clock (Callable[[], float], optional): Returns the current Unix time.
+
+        Raises:
+            ValueError: If the worker number is out of range.
+        """
+        if worker is None:
+            worker = int(os.environ.get("SNOWFLAKE_WORKER", os.getpid() % (1 << self.WORKER_BITS)))
+        if not 0 <= worker < 1 << self.WORKER_BITS:
+            raise ValueError(f"worker must be between 0 and {(1 << self.WORKER_BITS) - 1}")
+        self.worker = worker
+        self._epoch_ms = int(epoch * 1000)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def next(self) -> int:
+        with self._lock:
+            now = max(int(self._clock() * 1000) - self._epoch_ms, self._last_ms)
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & ((1 << self.SEQUENCE_BITS) - 1)
+                if self._sequence == 0:
+                    # Sequence used up for this millisecond: move on to the next one
+                    now += 1
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return ((now << (self.WORKER_BITS + self.SEQUENCE_BITS))
+                    | (self.worker << self.SEQUENCE_BITS) | self._sequence)
+
+    def observe(self, obj_id: Any) -> None:
+        """Never go back to a millisecond before an existing ID of this worker.
+
+        Args:
+            obj_id (Any): An existing ID; anything but an int is ignored.
+        """
+        if type(obj_id) is not int:
+            return
+        if (obj_id >> self.SEQUENCE_BITS) & ((1 << self.WORKER_BITS) - 1) != self.worker:
+            return
+        with self._lock:
+            last_ms = obj_id >> (self.WORKER_BITS + self.SEQUENCE_BITS)
+            sequence = obj_id & ((1 << self.SEQUENCE_BITS) - 1)
+            if (last_ms, sequence) > (self._last_ms, self._sequence):
+                self._last_ms, self._sequence = last_ms, sequence
+
+
+class UlidAllocator(IdAllocator):
+    """26-character ULID strings: a millisecond timestamp and 80 random bits.
+
+    IDs sort by creation time. Within one millisecond the random part is
+    incremented, so IDs from one allocator also sort in creation order.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time,
+                 random_bits: Callable[[int], int] = random.getrandbits) -> None:
+        """Set up the allocator.
+
+        Args:
+            clock (Callable[[], float], optional): Returns the current Unix time.
+            random_bits (Callable[[int], int], optional): Returns that many random bits.
+        """
+        self._clock = clock
+        self._random_bits = random_bits
+        self._lock = threading.Lock()
+        self._last = 0
+
+    def next(self) -> str:
+        with self._lock:
+            now = int(self._clock() * 1000) << 80
+            value = max(now | self._random_bits(80), self._last + 1)
+            self._last = value
+        return "".join(_ULID_ALPHABET[(value >> shift) & 31] for shift in range(125, -1, -5))
+
+    def observe(self, obj_id: Any) -> None:
+        """Keep later IDs above an existing ULID.
+
+        Args:
+            obj_id (Any): An existing ID; anything but a ULID string is ignored.
+        """
+        if type(obj_id) is not str or len(obj_id) != 26:
+            return
+        try:
+            value = 0
+            for char in obj_id.upper():
+                value = value << 5 | _ULID_ALPHABET.index(char)
+        except ValueError:
+            return
+        with self._lock:
+            self._last = max(self._last, value)
+
+    def key(self, obj_id: Any) -> Any:
+        return str(obj_id)
+
+
+# ID strategies CustomDatabase accepts by name; each builds one model's allocator
+ID_STRATEGIES: Dict[str, Callable[[], IdAllocator]] = {
+    "sequence": SequenceAllocator,
+    "snowflake": SnowflakeAllocator,
+    "ulid": UlidAllocator,
+}
+
+def allocator_factory(strategy: Any) -> Callable[[], IdAllocator]:
+    """Resolve an ID strategy.
+
+    Args:
+        strategy (Any): A name from ID_STRATEGIES, or a callable that returns
+            a new IdAllocator.
+
+    Returns:
+        Callable[[], IdAllocator]: Builds the allocator of one model.
+
+    Raises:
+        ValueError: If the strategy name is unknown.
+    """
+    if callable(strategy):
+        return strategy
+    if strategy not in ID_STRATEGIES:
+        raise ValueError(f"Unknown ID strategy '{strategy}', expected one of {list(ID_STRATEGIES)}")
+    return ID_STRATEGIES[strategy]
+
+def _lock_file(descriptor: int) -> None:
+    """Lock an open file until it is closed.
+
+    Args:
+        descriptor (int): File descriptor.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+        msvcrt.locking(descriptor, msvcrt.LK_LOCK, 32)
+        return
+    fcntl.flock(descriptor, fcntl.LOCK_EX)
@@ -0,0 +1,314 @@
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from .query import Predicate, RANGE_OPERATORS
+
+class HashIndex:
+    """Secondary index answering equality lookups on one field in O(1).
+
+    Records whose value is unhashable are left out; they can never equal a
+    value used in a lookup anyway.
+
+    Attributes:
+        field (str): Indexed field name.
+        _buckets (dict): Record IDs keyed by field value. Each bucket is a
+            dict used as an insertion-ordered set.
+    """
+    kind = "hash"
+
+    def __init__(self, field: str) -> None:
+        """Create an empty index.
+
+        Args:
+            field (str): Name of the field to index.
+        """
+        self.field = field
+        self._buckets: Dict[Any, Dict[Hashable, None]] = {}
+
+    def add(self, obj_id: Hashable, record: Dict[str, Any]) -> None:
+        """Index a record.
+
+        Args:
+            obj_id (Hashable): ID of the record.
+            record (Dict[str, Any]): The record.
+        """
+        try:
+            self._buckets.setdefault(record.get(self.field), {})[obj_id] = None
+        except TypeError:
+            pass
+
+    def remove(self, obj_id: Hashable, record: Dict[str, Any]) -> None:
+        """Remove a record from the index.
+
+        Args:
+            obj_id (Hashable): ID of the record.
+            record (Dict[str, Any]): The record as it was when indexed.
+        """
+        value = record.get(self.field)
+        try:
+            bucket = self._buckets.get(value)
+        except TypeError:
+            return
+        if bucket is not None:
+            bucket.pop(obj_id, None)
+            if not bucket:
+                del self._buckets[value]
+
+    def lookup(self, predicates: List[Predicate]) -> Optional[List[Hashable]]:
+        """Find candidate IDs for the predicates on this field.
+
+        Args:
+            predicates (List[Predicate]): Predicates on the indexed field.
+
+        Returns:
+            Optional[List[Hashable]]: IDs of the candidate records, or None if
+                no predicate can use this index.
+        """
+        for _, op, value in predicates:
+            if op == "eq":
+                try:
+                    return list(self._buckets.get(value, ()))
+                except TypeError:
+                    return []
+            if op == "in":
+                ids: List[Hashable] = []
+                for item in value:
+                    try:
+                        ids.extend(self._buckets.get(item, ()))
+                    except TypeError:
+                        pass
+                return ids
+        return None
+
+
+class SortedIndex:
+    """Secondary index answering equality and range lookups with binary searches.
+
+    Entries are kept in two parallel lists sorted by value, so a range is
+    found with two binary searches, in O(log n). Adding or removing a record
+    also shifts the entries after it in the lists, which is O(n) but a
+    single memmove.
+
+    Records whose value is None are kept apart, for equality lookups of
+    None. Values that cannot be ordered against the others are left out;
+    lookups for such a value return None, so the caller scans instead.
+
+    Attributes:
+        field (str): Indexed field name.
+        _values (list): Sorted field values.
+        _ids (list): Record IDs, in the same order as _values.
+        _nulls (dict): IDs of the records whose value is None, as an
+            insertion-ordered set.
+    """
+    kind = "sorted"
+
+    def __init__(self, field: str) -> None:
+        """Create an empty index.
+
+        Args:
+            field (str): Name of the field to index.
+        """
+        self.field = field
+        self._values: List[Any] = []
+        self._ids: List[Hashable] = []
+        self._nulls: Dict[Hashable, None] = {}
+
+    def add(self, obj_id: Hashable, record: Dict[str, Any]) -> None:
+        """Index a record.
+
+        Args:
+            obj_id (Hashable): ID of the record.
+            record (Dict[str, Any]): The record.
+        """
+        value = record.get(self.field)
+        if value is None:
+            self._nulls[obj_id] = None
+            return
+        try:
+            position = bisect_right(self._values, value)
+        except TypeError:
+            return
+        self._values.insert(position, value)
+        self._ids.insert(position, obj_id)
+
+    def remove(self, obj_id: Hashable, record: Dict[str, Any]) -> None:
+        """Remove a record from the index.
+
+        Args:
+            obj_id (Hashable): ID of the record.
+            record (Dict[str, Any]): The record as it was when indexed.
+        """
+        value = record.get(self.field)
+        if value is None:
+            self._nulls.pop(obj_id, None)
+            return
+        try:
+            start = bisect_left(self._values, value)
+            end = bisect_right(self._values, value, start)
+        except TypeError:
+            return
+        for position in range(start, end):
+            if self._ids[position] == obj_id:
+                del self._values[position]
+                del self._ids[position]
+                return
+
+    def lookup(self, predicates: List[Predicate]) -> Optional[List[Hashable]]:
+        """Find candidate IDs for the predicates on this field.
+
+        Every equality and range predicate narrows the same slice of the index.
+
+        Args:
+            predicates (List[Predicate]): Predicates on the indexed field.
+
+        Returns:
+            Optional[List[Hashable]]: IDs of the candidate records in value
+                order, or None if no predicate can use this index.
+        """
+        start, end = 0, len(self._values)
+        used = False
+        try:
+            for _, op, value in predicates:
+                if op == "eq" and value is None:
+                    # The other predicates are checked on the candidates
+                    return list(self._nulls)
+                if op == "eq":
+                    start = max(start, bisect_left(self._values, value))
+                    end = min(end, bisect_right(self._values, value))
+                elif op in RANGE_OPERATORS:
+                    if op == "gt":
+                        start = max(start, bisect_right(self._values, value))
+                    elif op == "gte":
+                        start = max(start, bisect_left(self._values, value))
+                    elif op == "lt":
+                        end = min(end, bisect_left(self._values, value))
+                    else:
+                        end = min(end, bisect_right(self._values, value))
+                else:
+                    continue
+                used = True
+        except TypeError:
+            return None
+        if not used:
+            return None
+        return self._ids[start:end] if start < end else []
+
+
+class InsertionOrder:
+    """Insertion order of a model's records, with O(log n) seek by position.
+
+    Every added record gets the next sequence number. Removed records are only
+    forgotten in _positions and skipped when walking; the lists are compacted
+    once most of their entries are stale. Sequence numbers never change, so
+    they can be handed out as stable pagination cursors.
+
+    Attributes:
+        _seqs (list): Sequence numbers in increasing order.
+        _ids (list): Record IDs, in the same order as _seqs.
+        _positions (dict): Current sequence number of each live record.
+    """
+
+    # Compact only when there are at least this many stale entries
+    COMPACT_MIN_STALE = 1024
+
+    def __init__(self) -> None:
+        self._seqs: List[int] = []
+        self._ids: List[Hashable] = []
+        self._positions: Dict[Hashable, int] = {}
+        self._next_seq = 0
+        self._stale = 0
+
+    def __contains__(self, obj_id: Hashable) -> bool:
+        return obj_id in self._positions
+
+    def add(self, obj_id: Hashable) -> None:
+        """Append a record at the end of the order.
+
+        Args:
+            obj_id (Hashable): ID of the record.
+        """
+        if obj_id in self._positions:
+            self._stale += 1
+        seq = self._next_seq
+        self._next_seq += 1
+        self._seqs.append(seq)
+        self._ids.append(obj_id)
+        self._positions[obj_id] = seq
+
+    def remove(self, obj_id: Hashable) -> None:
+        """Forget a record.
+
+        Args:
+            obj_id (Hashable): ID of the record.
+        """
+        if self._positions.pop(obj_id, None) is None:
+            return
+        self._stale += 1
+        if self._stale >= self.COMPACT_MIN_STALE and self._stale * 2 > len(self._seqs):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Drop stale entries.
+
+        New lists are built instead of editing the old ones in place, so a
+        walk that is already running keeps a consistent view.
+        """
+        positions = self._positions
+        live = [(seq, obj_id) for seq, obj_id in zip(self._seqs, self._ids)
+                if positions.get(obj_id) == seq]
+        self._seqs = [seq for seq, _ in live]
+        self._ids = [obj_id for _, obj_id in live]
+        self._stale = 0
+
+    def after(self, cursor: Optional[int] = None) -> Iterator[Tuple[int, Hashable]]:
+        """Walk the live records that come after a position.
+
+        Args:
+            cursor (int, optional): Sequence number to start after. Defaults
+                to the beginning.
+
+        Yields:
+            Tuple[int, Hashable]: Sequence number and ID of each live record.
+        """
+        seqs, ids, positions = self._seqs, self._ids, self._positions
+        start = 0 if cursor is None else bisect_right(seqs, cursor)
+        for index in range(start, len(seqs)):
+            obj_id = ids[index]
+            if positions.get(obj_id) == seqs[index]:
+                yield seqs[index], obj_id
+
+
+INDEX_TYPES = {"hash": HashIndex, "sorted": SortedIndex}
+
+def make_index(field: str, kind: str = "hash") -> Any:
+    """Create an empty index of the given kind.
+
+    Args:
+        field (str): Name of the field to index.
+        kind (str, optional): "hash" or "sorted". Defaults to "hash".
+
+    Returns:
+        Any: The new index.
+
+    Raises:
+        ValueError: If the index kind is unknown.
+    """
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{kind}', expected one of {list(INDEX_TYPES)}")
+    return INDEX_TYPES[kind](field)
+
+def build_index(field: str, kind: str, records: Iterable) -> Any:
+    """Create an index and fill it from existing records.
+
+    Args:
+        field (str): Name of the field to index.
+        kind (str): "hash" or "sorted".
+        records (Iterable): Pairs of record ID and record.
+
+    Returns:
+        Any: The filled index.
+    """
+    index = make_index(field, kind)
+    for obj_id, record in records:
+        index.add(obj_id, record)
+    return index
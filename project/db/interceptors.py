@@ -0,0 +1,102 @@
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+from .registry import DatabaseRegistry
+
+# Database methods interceptors can wrap
+OPERATIONS = ("create", "get", "update", "delete",
+              "create_many", "get_many", "update_many", "delete_many", "find")
+
+# Called with the registered database name, the operation and the method,
+# returns the method to call instead (or the same method to leave it alone)
+Interceptor = Callable[[str, str, Callable], Callable]
+
+_interceptors: List[Interceptor] = []
+_lock = threading.RLock()
+# Databases with wrapped methods, by id: (database, registered name, wrapped operations)
+_wrapped: Dict[int, Tuple[Any, str, List[str]]] = {}
+
+def _wrap_database(name: str, db: Any) -> None:
+    """Wrap the methods of a database with every interceptor.
+
+    The wrappers are set on the instance, so removing them restores the
+    class methods. A database registered under several names is wrapped
+    once, under the first.
+
+    Args:
+        name (str): Name the database is registered under.
+        db (Any): The database.
+    """
+    with _lock:
+        if id(db) in _wrapped or not _interceptors:
+            return
+        operations = []
+        for operation in OPERATIONS:
+            method = getattr(db, operation, None)
+            if method is None:
+                continue
+            wrapper = method
+            for interceptor in _interceptors:
+                wrapper = interceptor(name, operation, wrapper)
+            if wrapper is not method:
+                setattr(db, operation, wrapper)
+                operations.append(operation)
+        _wrapped[id(db)] = (db, name, operations)
+
+def _unwrap_all() -> None:
+    """Restore the methods of every wrapped database."""
+    with _lock:
+        for db, _, operations in _wrapped.values():
+            for operation in operations:
+                db.__dict__.pop(operation, None)
+        _wrapped.clear()
+
+def _rewrap() -> None:
+    """Wrap every registered database again with the current interceptors."""
+    with _lock:
+        _unwrap_all()
+        for name, db in DatabaseRegistry.instances().items():
+            _wrap_database(name, db)
+
+def add_interceptor(interceptor: Interceptor) -> None:
+    """Wrap the operations of every registered and future database.
+
+    Databases registered lazily are wrapped when they are opened.
+
+    Usage:
+        def log_calls(name, operation, method):
+            def logged(*args, **kwargs):
+                print(name, operation, args)
+                return method(*args, **kwargs)
+            return logged
+
+        add_interceptor(log_calls)
+
+    Args:
+        interceptor (Interceptor): Function taking the database name, the
+            operation and the method, returning the method to call instead.
+            The last interceptor added is the outermost.
+    """
+    with _lock:
+        if interceptor in _interceptors:
+            return
+        if not _interceptors:
+            DatabaseRegistry.subscribe(_wrap_database)
+        _interceptors.append(interceptor)
+        _rewrap()
+
+def remove_interceptor(interceptor: Interceptor) -> None:
+    """Stop wrapping database operations with an interceptor.
+
+    Once the last interceptor is removed, databases are called directly again.
+
+    Args:
+        interceptor (Interceptor): An interceptor added with add_interceptor().
+    """
+    with _lock:
+        if interceptor not in _interceptors:
+            return
+        _interceptors.remove(interceptor)
+        if not _interceptors:
+            DatabaseRegistry.unsubscribe(_wrap_database)
+        _rewrap()
@@ -0,0 +1,288 @@
+import threading
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, List, Optional
+
+# Locking modes of CustomDatabase: None (single thread), "model" or "striped"
+CONCURRENCY_MODES = (None, "model", "striped")
+
+# Reused by every lock request when no locking is needed
+_NO_LOCK = nullcontext()
+
+class RWLock:
+    """Reader-writer lock: many readers at once, or a single writer.
+
+    Waiting writers go first, so a steady stream of readers cannot starve
+    them. The lock is reentrant: a thread holding it may acquire it again for
+    reading or writing, except that a reader cannot become a writer.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer: Optional[int] = None
+        self._depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+        self.reading = _Guard(self.acquire_read, self.release_read)
+        self.writing = _Guard(self.acquire_write, self.release_write)
+
+    def acquire_read(self) -> None:
+        """Wait until no writer holds or waits for the lock, then hold it for reading."""
+        me = threading.get_ident()
+        if self._writer == me:
+            self._depth += 1
+            return
+        held = getattr(self._local, "reads", 0)
+        if held:
+            self._local.reads = held + 1
+            return
+        with self._cond:
+            while self._writer is not None or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        self._local.reads = 1
+
+    def release_read(self) -> None:
+        """Release a read acquired by the current thread."""
+        if self._writer == threading.get_ident():
+            self._depth -= 1
+            return
+        held = self._local.reads - 1
+        self._local.reads = held
+        if held:
+            return
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        """Wait until the lock is free, then hold it alone.
+
+        Raises:
+            RuntimeError: If the current thread holds the lock for reading.
+        """
+        me = threading.get_ident()
+        if self._writer == me:
+            self._depth += 1
+            return
+        if getattr(self._local, "reads", 0):
+            raise RuntimeError("Cannot upgrade a read lock to a write lock")
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._depth = 1
+
+    def release_write(self) -> None:
+        """Release a write acquired by the current thread."""
+        self._depth -= 1
+        if self._depth:
+            return
+        with self._cond:
+            self._writer = None
+            self._cond.notify_all()
+
+    def read(self) -> ContextManager[None]:
+        """Hold the lock for reading inside a with block."""
+        return self.reading
+
+    def write(self) -> ContextManager[None]:
+        """Hold the lock for writing inside a with block."""
+        return self.writing
+
+
+class _Guard:
+    """Reusable context manager calling an acquire and a release function."""
+    __slots__ = ("_acquire", "_release")
+
+    def __init__(self, acquire: Callable[[], Any], release: Callable[[], Any]) -> None:
+        self._acquire = acquire
+        self._release = release
+
+    def __enter__(self) -> None:
+        self._acquire()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._release()
+
+
+class StripedLock:
+    """Fixed set of locks shared by many keys.
+
+    A key always maps to the same stripe, so operations on one key are
+    serialized while operations on keys of different stripes run in
+    parallel, without keeping a lock per key.
+
+    Attributes:
+        stripes (int): Number of locks.
+    """
+
+    def __init__(self, stripes: int = 64) -> None:
+        """Create the locks.
+
+        Args:
+            stripes (int, optional): Number of locks. Defaults to 64.
+
+        Raises:
+            ValueError: If stripes is less than 1.
+        """
+        if stripes < 1:
+            raise ValueError("stripes must be at least 1")
+        self.stripes = stripes
+        self._locks: List[threading.RLock] = [threading.RLock() for _ in range(stripes)]
+
+    def __call__(self, key: Any) -> threading.RLock:
+        """Get the lock of a key.
+
+        Args:
+            key (Any): Hashable key.
+
+        Returns:
+            threading.RLock: The stripe the key maps to.
+        """
+        return self._locks[hash(key) % self.stripes]
+
+
+class _ModelLocks:
+    """Lock guards of one model, built once and reused by every operation."""
+    __slots__ = ("lock", "reading", "writing", "_gate")
+
+    def __init__(self, gate: RWLock) -> None:
+        self.lock = RWLock()
+        self._gate = gate
+        self.reading = self.lock.reading
+        self.writing = _Guard(self._acquire_write, self._release_write)
+
+    def _acquire_write(self) -> None:
+        self._gate.acquire_read()
+        try:
+            self.lock.acquire_write()
+        except BaseException:
+            self._gate.release_read()
+            raise
+
+    def _release_write(self) -> None:
+        self.lock.release_write()
+        self._gate.release_read()
+
+
+class _RecordGuard:
+    """Holds the database gate and the model for reading, and a record's stripe."""
+    __slots__ = ("_gate", "_model", "_stripe")
+
+    def __init__(self, gate: Optional[RWLock], model: RWLock, stripe: threading.RLock) -> None:
+        self._gate = gate
+        self._model = model
+        self._stripe = stripe
+
+    def __enter__(self) -> None:
+        if self._gate is not None:
+            self._gate.acquire_read()
+        self._model.acquire_read()
+        self._stripe.acquire()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stripe.release()
+        self._model.release_read()
+        if self._gate is not None:
+            self._gate.release_read()
+
+
+class DatabaseLocks:
+    """Locks CustomDatabase takes in a given concurrency mode.
+
+    * None: no locking; the database must only be used by one thread at a time.
+    * "model": a reader-writer lock per model. Reads of a model run in
+      parallel, and a write waits until it has the model to itself.
+    * "striped": the same per-model locks, plus striped per-record locks.
+      Lookups and updates that touch no index only hold the model for
+      reading and the record's stripe, so updates of different records run
+      in parallel with each other and with reads.
+
+    In both locking modes writes also share a database-wide gate that a
+    transaction holds alone until it ends, so other threads' writes neither
+    interleave with it nor get undone by its rollback. Reads are not held
+    back and may see changes of a transaction still in progress.
+    """
+
+    def __init__(self, mode: Optional[str] = None, stripes: int = 64) -> None:
+        """Set up the locks of a mode.
+
+        Args:
+            mode (str, optional): One of CONCURRENCY_MODES. Defaults to None.
+            stripes (int, optional): Record lock stripes for the "striped"
+                mode. Defaults to 64.
+
+        Raises:
+            ValueError: If the mode is unknown.
+        """
+        if mode not in CONCURRENCY_MODES:
+            raise ValueError(f"Unknown concurrency mode '{mode}', expected one of {list(CONCURRENCY_MODES)}")
+        self.mode = mode
+        self.enabled = mode is not None
+        self._models: Dict[str, _ModelLocks] = {}
+        self._models_lock = threading.Lock()
+        self._gate = RWLock()
+        self._stripes = StripedLock(stripes) if mode == "striped" else None
+
+    def _model(self, model_name: str) -> _ModelLocks:
+        locks = self._models.get(model_name)
+        if locks is None:
+            with self._models_lock:
+                locks = self._models.get(model_name)
+                if locks is None:
+                    locks = self._models[model_name] = _ModelLocks(self._gate)
+        return locks
+
+    def read(self, model_name: str) -> ContextManager[None]:
+        """Lock a model for reading.
+
+        Args:
+            model_name (str): The model/collection name.
+        """
+        if not self.enabled:
+            return _NO_LOCK
+        return self._model(model_name).reading
+
+    def write(self, model_name: str) -> ContextManager[None]:
+        """Lock a model for a change to its records, order or indexes.
+
+        Args:
+            model_name (str): The model/collection name.
+        """
+        if not self.enabled:
+            return _NO_LOCK
+        return self._model(model_name).writing
+
+    def record(self, model_name: str, key: Any) -> ContextManager[None]:
+        """Lock one record for a change that leaves the rest of its model alone.
+
+        Args:
+            model_name (str): The model/collection name.
+            key (Any): ID of the record.
+        """
+        if self._stripes is None:
+            return self.write(model_name)
+        return _RecordGuard(self._gate, self._model(model_name).lock, self._stripes((model_name, key)))
+
+    def lookup(self, model_name: str, key: Any) -> ContextManager[None]:
+        """Lock one record for reading.
+
+        Args:
+            model_name (str): The model/collection name.
+            key (Any): ID of the record.
+        """
+        if self._stripes is None:
+            return self.read(model_name)
+        return _RecordGuard(None, self._model(model_name).lock, self._stripes((model_name, key)))
+
+    def transaction(self) -> ContextManager[None]:
+        """Keep other threads from writing until the block ends."""
+        if not self.enabled:
+            return _NO_LOCK
+        return self._gate.writing
@@ -0,0 +1,299 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Iterator, List, Tuple
+
+# When WriteAheadLog.sync() forces written entries to disk
+FSYNC_POLICIES = ("always", "interval", "never")
+
+# A logged change: ("put", model, id, record), ("patch", model, id, data)
+# or ("delete", model, id)
+Operation = Tuple[Any, ...]
+
+class WriteAheadLog:
+    """Append-only log of record changes.
+
+    Each write() appends one JSON line holding a log sequence number (LSN)
+    and a batch of operations, so a transaction is logged, and recovered,
+    as a whole. A line cut short by a crash is ignored on recovery.
+
+    The log is split into segment files named after the last LSN before
+    them. rotate() starts a new segment, so the older ones can be deleted
+    with drop_before() once a snapshot covers them, while writes go on.
+
+    Durability follows the fsync policy:
+
+    * "always": sync() returns once the entry is on disk. Concurrent callers
+      share fsync calls (group commit): one thread syncs everything written
+      so far while the others wait for it.
+    * "interval": a background thread forces the log to disk every interval
+      seconds, and sync() does so itself when the last sync is older than
+      that, so a crash loses about interval seconds of acknowledged work.
+    * "never": flushing to disk is left to the operating system.
+
+    Attributes:
+        directory (str): Directory holding the segment files.
+        fsync (str): One of FSYNC_POLICIES.
+        interval (float): Seconds between syncs for the "interval" policy.
+        lsn (int): Sequence number of the last written entry.
+    """
+
+    def __init__(self, directory: str, fsync: str = "always", interval: float = 1.0,
+                 lsn: int = 0) -> None:
+        """Start a new log segment after the existing ones.
+
+        Use open() to recover the existing entries first.
+
+        Args:
+            directory (str): Directory holding the segment files.
+            fsync (str, optional): Fsync policy. Defaults to "always".
+            interval (float, optional): Seconds between syncs for the
+                "interval" policy. Defaults to 1.0.
+            lsn (int, optional): Last sequence number already used.
+                Defaults to 0.
+
+        Raises:
+            ValueError: If the fsync policy is unknown.
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}', expected one of {list(FSYNC_POLICIES)}")
+        self.directory = directory
+        self.fsync = fsync
+        self.interval = interval
+        self.lsn = lsn
+        self._lock = threading.Lock()
+        self._sync_cond = threading.Condition()
+        self._written = lsn
+        self._synced = lsn
+        self._syncing = False
+        self._last_sync = time.monotonic()
+        self._file = open(self._segment_path(lsn), "ab")
+        self._closed = threading.Event()
+        if fsync == "interval":
+            threading.Thread(target=self._sync_periodically, name="wal-sync", daemon=True).start()
+
+    @classmethod
+    def open(cls, directory: str, apply: Callable[[List[Operation]], None], after: int = 0,
+             fsync: str = "always", interval: float = 1.0) -> 'WriteAheadLog':
+        """Replay the entries of an existing log, then open it for writing.
+
+        Args:
+            directory (str): Directory holding the segment files; created if missing.
+            apply (Callable[[List[Operation]], None]): Called with the operations
+                of every entry that comes after the given sequence number.
+            after (int, optional): Sequence number already covered, e.g. by a
+                snapshot. Defaults to 0.
+            fsync (str, optional): Fsync policy. Defaults to "always".
+            interval (float, optional): Seconds between syncs for the
+                "interval" policy. Defaults to 1.0.
+
+        Returns:
+            WriteAheadLog: The log, continuing after the last complete entry.
+        """
+        os.makedirs(directory, exist_ok=True)
+        lsn = after
+        for path in _segments(directory):
+            end = 0
+            for entry_lsn, operations, end in _entries(path):
+                if entry_lsn > after:
+                    apply(operations)
+                lsn = max(lsn, entry_lsn)
+            if os.path.getsize(path) > end:
+                # Drop a line cut short by a crash, so new entries follow a complete one
+                with open(path, "r+b") as file:
+                    file.truncate(end)
+        return cls(directory, fsync, interval, lsn)
+
+    def _segment_path(self, base: int) -> str:
+        """Get the file of the segment whose entries come after an LSN.
+
+        Args:
+            base (int): Last sequence number before the segment.
+
+        Returns:
+            str: Segment file path.
+        """
+        return os.path.join(self.directory, f"wal-{base:020d}.log")
+
+    def write(self, operations: List[Operation]) -> int:
+        """Append a batch of operations, without waiting for the disk.
+
+        Args:
+            operations (List[Operation]): Changes to log together.
+
+        Returns:
+            int: Sequence number of the entry, to pass to sync().
+
+        Raises:
+            TypeError: If a record holds a value JSON cannot store.
+        """
+        with self._lock:
+            lsn = self.lsn + 1
+            line = json.dumps({"lsn": lsn, "ops": operations}, separators=(",", ":")) + "\n"
+            self._file.write(line.encode())
+            self._file.flush()
+            self.lsn = self._written = lsn
+        return lsn
+
+    def sync(self, lsn: int) -> None:
+        """Make an entry durable according to the fsync policy.
+
+        Args:
+            lsn (int): Sequence number returned by write().
+        """
+        if self.fsync == "never":
+            return
+        if self.fsync == "interval" and time.monotonic() - self._last_sync < self.interval:
+            return
+        self._sync_to(lsn)
+
+    def _sync_to(self, lsn: int) -> None:
+        """Force the log to disk up to an entry, sharing the fsync with concurrent callers.
+
+        Args:
+            lsn (int): Sequence number returned by write().
+        """
+        while True:
+            with self._sync_cond:
+                while self._syncing and self._synced < lsn:
+                    self._sync_cond.wait()
+                if self._synced >= lsn or self._file.closed:
+                    return
+                # Become the leader: one fsync covers every entry written so far
+                self._syncing = True
+                target = self._written
+                file = self._file
+            synced = False
+            try:
+                os.fsync(file.fileno())
+                synced = True
+            finally:
+                with self._sync_cond:
+                    self._syncing = False
+                    if synced:
+                        self._synced = max(self._synced, target)
+                        self._last_sync = time.monotonic()
+                    self._sync_cond.notify_all()
+
+    def _sync_periodically(self) -> None:
+        """Sync what was written every interval seconds until the log is closed."""
+        while not self._closed.wait(self.interval):
+            self._sync_to(self._written)
+
+    def append(self, operations: List[Operation]) -> int:
+        """Append a batch of operations and make it durable.
+
+        Args:
+            operations (List[Operation]): Changes to log together.
+
+        Returns:
+            int: Sequence number of the entry.
+        """
+        lsn = self.write(operations)
+        self.sync(lsn)
+        return lsn
+
+    def rotate(self) -> int:
+        """Close the current segment and start a new one.
+
+        Returns:
+            int: Sequence number of the last entry in the closed segment.
+        """
+        with self._lock, self._sync_cond:
+            while self._syncing:
+                self._sync_cond.wait()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._synced = self._written
+            self._file.close()
+            self._file = open(self._segment_path(self.lsn), "ab")
+            return self.lsn
+
+    def drop_before(self, lsn: int) -> None:
+        """Delete the segments that only hold entries up to an LSN.
+
+        Args:
+            lsn (int): Sequence number covered elsewhere, e.g. by a snapshot.
+        """
+        segments = _segments(self.directory)
+        for path, following in zip(segments, segments[1:]):
+            if _segment_base(following) <= lsn:
+                os.remove(path)
+
+    def close(self) -> None:
+        """Force the log to disk and close it."""
+        self._closed.set()
+        with self._lock, self._sync_cond:
+            if self._file.closed:
+                return
+            while self._syncing:
+                self._sync_cond.wait()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._synced = self._written
+            self._file.close()
+
+
+def _segment_base(path: str) -> int:
+    """Get the last sequence number before a segment from its file name.
+
+    Args:
+        path (str): Segment file path.
+
+    Returns:
+        int: The sequence number.
+    """
+    return int(os.path.basename(path)[4:-4])
+
+def _segments(directory: str) -> List[str]:
+    """List the segment files of a log in order.
+
+    Args:
+        directory (str): Directory holding the segment files.
+
+    Returns:
+        List[str]: Segment file paths, oldest first.
+    """
+    names = [name for name in os.listdir(directory) if name.startswith("wal-") and name.endswith(".log")]
+    return [os.path.join(directory, name) for name in sorted(names)]
+
+def _entries(path: str) -> Iterator[Tuple[int, List[Operation], int]]:
+    """Read the complete entries of a segment.
+
+    Args:
+        path (str): Segment file path.
+
+    Yields:
+        Tuple[int, List[Operation], int]: Sequence number, operations and the
+            file offset where the entry ends.
+    """
+    offset = 0
+    with open(path, "rb") as file:
+        for line in file:
+            if not line.endswith(b"\n"):
+                return
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                return
+            offset += len(line)
+            yield entry["lsn"], entry["ops"], offset
+
+
+def sync_directory(path: str) -> None:
+    """Make a rename inside a directory durable, where the platform allows it.
+
+    Args:
+        path (str): Directory path.
+    """
+    try:
+        descriptor = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
@@ -0,0 +1,124 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """Raised when no pooled connection becomes free in time."""
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared between threads.
+
+    Connections are opened lazily up to ``size`` and handed out one caller at a
+    time, so each connection is only ever used by a single thread at once.
+    File databases are switched to WAL mode, which lets readers run in
+    parallel with each other and with a single writer.
+
+    An in-memory database only exists inside the connection that created it,
+    so ``":memory:"`` pools are limited to one connection.
+
+    Attributes:
+        db_name (str): Name of the SQLite database file.
+        size (int): Maximum number of open connections.
+        timeout (float): Seconds to wait for a free connection, and for SQLite
+            locks held by other connections.
+    """
+
+    def __init__(self, db_name: str, size: int = 5, timeout: float = 30.0) -> None:
+        """Initialize an empty pool.
+
+        Args:
+            db_name (str): Database file name, or ":memory:".
+            size (int, optional): Maximum number of open connections. Defaults to 5.
+            timeout (float, optional): Seconds to wait for a free connection. Defaults to 30.0.
+
+        Raises:
+            ValueError: If size is less than 1.
+        """
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.db_name = db_name
+        self.size = 1 if db_name == ":memory:" else size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection in autocommit mode.
+
+        Returns:
+            sqlite3.Connection: The new connection.
+        """
+        connection = sqlite3.connect(
+            self.db_name,
+            isolation_level=None,
+            check_same_thread=False,
+            timeout=self.timeout,
+        )
+        if self.db_name != ":memory:":
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def acquire(self) -> sqlite3.Connection:
+        """Take a connection out of the pool, opening one if allowed.
+
+        Returns:
+            sqlite3.Connection: A connection owned by the caller until release().
+
+        Raises:
+            PoolTimeoutError: If every connection stays busy for longer than timeout.
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all) < self.size:
+                connection = self._connect()
+                self._all.append(connection)
+                return connection
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeoutError(f"No free connection to '{self.db_name}' after {self.timeout}s")
+
+    def release(self, connection: sqlite3.Connection) -> None:
+        """Return a connection to the pool.
+
+        A transaction still open on it, e.g. after a failed COMMIT, is rolled
+        back first, so the next caller does not silently run inside it.
+
+        Args:
+            connection (sqlite3.Connection): Connection obtained from acquire().
+        """
+        if connection.in_transaction:
+            try:
+                connection.execute("ROLLBACK")
+            except sqlite3.Error as e:
+                print(f"Error rolling back a released connection: {str(e)}")
+        self._idle.put(connection)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection for the duration of a with block.
+
+        Yields:
+            sqlite3.Connection: A connection owned by the caller inside the block.
+        """
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self) -> None:
+        """Close every connection opened by the pool."""
+        with self._lock:
+            for connection in self._all:
+                connection.close()
+            self._all.clear()
+            self._idle = queue.LifoQueue()
@@ -0,0 +1,278 @@
+import base64
+import json
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+# Lookup suffixes accepted in filter conditions, e.g. price__gte=10
+OPERATORS = ("eq", "ne", "lt", "lte", "gt", "gte", "in")
+
+# Operators that select a contiguous range of a sorted index
+RANGE_OPERATORS = ("lt", "lte", "gt", "gte")
+
+# SQL for each operator; eq/ne against None are rewritten to IS NULL/IS NOT NULL.
+# "ne" uses IS NOT so NULL fields count as different, as they do in Python.
+SQL_OPERATORS = {"eq": "=", "ne": "IS NOT", "lt": "<", "lte": "<=", "gt": ">", "gte": ">="}
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+class Predicate(NamedTuple):
+    """Single condition of a query.
+
+    Attributes:
+        field (str): Name of the record field to test.
+        op (str): One of OPERATORS.
+        value (Any): Value to compare the field with.
+    """
+    field: str
+    op: str
+    value: Any
+
+def parse_conditions(conditions: Dict[str, Any]) -> List[Predicate]:
+    """Turn keyword-style conditions into predicates.
+
+    A plain field name means equality; a ``__op`` suffix selects another
+    operator, e.g. ``{"email": "a@b.c", "price__lt": 10}``.
+
+    Args:
+        conditions (Dict[str, Any]): Conditions keyed by field and optional operator.
+
+    Returns:
+        List[Predicate]: The parsed predicates.
+
+    Raises:
+        ValueError: If an operator is not supported.
+    """
+    predicates = []
+    for key, value in conditions.items():
+        field, _, op = key.partition("__")
+        op = op or "eq"
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported filter operator '{op}' in '{key}'")
+        if op == "in":
+            value = tuple(value)
+        predicates.append(Predicate(field, op, value))
+    return predicates
+
+def check_identifier(name: str) -> str:
+    """Make sure a table or column name is safe to put into SQL.
+
+    Args:
+        name (str): The identifier.
+
+    Returns:
+        str: The same identifier.
+
+    Raises:
+        ValueError: If the name contains anything but letters, digits and underscores.
+    """
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid field name '{name}'")
+    return name
+
+def parse_order(order_by: Optional[Union[str, Sequence[str]]]) -> List[Tuple[str, bool]]:
+    """Turn an ordering spec into (field, descending) pairs.
+
+    Args:
+        order_by (Union[str, Sequence[str]], optional): Field name or list of
+            field names; a leading "-" sorts that field in descending order.
+
+    Returns:
+        List[Tuple[str, bool]]: Field names with their descending flag.
+    """
+    if not order_by:
+        return []
+    if isinstance(order_by, str):
+        order_by = [order_by]
+    return [(field[1:], True) if field.startswith("-") else (field, False) for field in order_by]
+
+def compile_select(table: str, predicates: List[Predicate],
+                   order: List[Tuple[str, bool]], limit: Optional[int] = None,
+                   offset: Optional[int] = None,
+                   fields: Optional[Sequence[str]] = None) -> Tuple[str, List[Any]]:
+    """Build a parameterized SELECT statement for a query.
+
+    Args:
+        table (str): Table name.
+        predicates (List[Predicate]): WHERE conditions, joined with AND.
+        order (List[Tuple[str, bool]]): ORDER BY fields with descending flags.
+        limit (int, optional): Maximum number of rows.
+        offset (int, optional): Number of rows to skip.
+        fields (Sequence[str], optional): Columns to return. Defaults to all.
+
+    Returns:
+        Tuple[str, List[Any]]: The SQL statement and its parameters.
+
+    Raises:
+        ValueError: If a table or field name is not a plain identifier.
+    """
+    columns = ", ".join(check_identifier(field) for field in fields) if fields else "*"
+    sql = f"SELECT {columns} FROM {check_identifier(table)}"
+    params: List[Any] = []
+
+    clauses = []
+    for field, op, value in predicates:
+        column = check_identifier(field)
+        if op == "in":
+            if not value:
+                clauses.append("0")
+                continue
+            clauses.append(f"{column} IN ({', '.join(['?'] * len(value))})")
+            params.extend(value)
+        elif value is None and op in ("eq", "ne"):
+            clauses.append(f"{column} IS {'NOT ' if op == 'ne' else ''}NULL")
+        else:
+            clauses.append(f"{column} {SQL_OPERATORS[op]} ?")
+            params.append(value)
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+
+    if order:
+        sql += " ORDER BY " + ", ".join(
+            f"{check_identifier(field)}{' DESC' if descending else ''}" for field, descending in order
+        )
+    if limit is not None or offset:
+        sql += " LIMIT ?"
+        params.append(-1 if limit is None else limit)
+        if offset:
+            sql += " OFFSET ?"
+            params.append(offset)
+    return sql, params
+
+def apply_options(records: Iterable[Dict[str, Any]], order: List[Tuple[str, bool]],
+                  limit: Optional[int] = None, offset: Optional[int] = None,
+                  fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """Sort, slice and project records in Python, like the SQL clauses would.
+
+    Missing values sort first, as NULL does in SQLite.
+
+    Args:
+        records (Iterable[Dict[str, Any]]): Matching records.
+        order (List[Tuple[str, bool]]): Sort fields with descending flags.
+        limit (int, optional): Maximum number of records.
+        offset (int, optional): Number of records to skip.
+        fields (Sequence[str], optional): Fields to keep. Defaults to all.
+
+    Returns:
+        List[Dict[str, Any]]: The resulting records; new dicts when projected.
+    """
+    records = list(records)
+    # Stable sorts applied from the last key to the first give a multi-key order
+    for field, descending in reversed(order):
+        records.sort(key=lambda record: (record.get(field) is not None, record.get(field)),
+                     reverse=descending)
+    start = offset or 0
+    end = None if limit is None else start + limit
+    if start or end is not None:
+        records = records[start:end]
+    if fields:
+        records = [{field: record.get(field) for field in fields} for record in records]
+    return records
+
+def encode_cursor(position: Any) -> str:
+    """Turn a database position into an opaque pagination token.
+
+    Args:
+        position (Any): JSON-serializable position returned by a database.
+
+    Returns:
+        str: URL-safe token.
+    """
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+def decode_cursor(token: Optional[str]) -> Any:
+    """Turn a pagination token back into a database position.
+
+    Args:
+        token (str, optional): Token from encode_cursor(), or None for the first page.
+
+    Returns:
+        Any: The position, or None for the first page.
+
+    Raises:
+        ValueError: If the token is malformed or does not hold a position.
+    """
+    if not token:
+        return None
+    try:
+        position = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid pagination token '{token}'") from e
+    if not _is_position(position):
+        raise ValueError(f"Invalid pagination token '{token}'")
+    return position
+
+def _is_position(position: Any) -> bool:
+    """Check the shape of a decoded position.
+
+    Databases return an int, or a pair of an index and the nested position
+    to continue from (None to start there from the beginning).
+
+    Args:
+        position (Any): Decoded position.
+
+    Returns:
+        bool: True if the position has one of these shapes.
+    """
+    if type(position) is int:
+        return True
+    return (type(position) is list and len(position) == 2
+            and type(position[0]) is int and position[0] >= 0
+            and (position[1] is None or _is_position(position[1])))
+
+def check_cursor(after: Any, expected: type) -> None:
+    """Reject a pagination cursor a database did not produce.
+
+    Args:
+        after (Any): Cursor passed to page().
+        expected (type): Type of the cursors the database returns.
+
+    Raises:
+        ValueError: If the cursor is neither None nor of the expected type.
+    """
+    if after is not None and type(after) is not expected:
+        raise ValueError(f"Invalid pagination cursor {after!r}")
+
+def compare(op: str, left: Any, right: Any) -> bool:
+    """Apply an operator to two values.
+
+    Values that cannot be ordered against each other (e.g. None and a number)
+    never satisfy a range operator.
+
+    Args:
+        op (str): One of OPERATORS.
+        left (Any): Field value of the record.
+        right (Any): Value from the predicate.
+
+    Returns:
+        bool: Whether the condition holds.
+    """
+    try:
+        if op == "eq":
+            return left == right
+        if op == "ne":
+            return left != right
+        if op == "in":
+            return left in right
+        if left is None:
+            return False
+        if op == "lt":
+            return left < right
+        if op == "lte":
+            return left <= right
+        if op == "gt":
+            return left > right
+        return left >= right
+    except TypeError:
+        return False
+
+def matches(record: Dict[str, Any], predicates: Iterable[Predicate]) -> bool:
+    """Check whether a record satisfies every predicate.
+
+    Args:
+        record (Dict[str, Any]): The record to test.
+        predicates (Iterable[Predicate]): Conditions to check.
+
+    Returns:
+        bool: True if all conditions hold.
+    """
+    return all(compare(op, record.get(field), value) for field, op, value in predicates)
@@ -0,0 +1,167 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+def _custom(name: str, **options: Any) -> Any:
+    """Create a CustomDatabase from configuration."""
+    from .database import CustomDatabase
+    return CustomDatabase(name, **options)
+
+def _sqlite(name: str, **options: Any) -> Any:
+    """Create a SqliteDatabase from configuration."""
+    from .sqlite_adapter import SqliteDatabase
+    return SqliteDatabase(**options)
+
+# Database types usable in configuration: type -> factory(name, **options)
+BACKEND_TYPES: Dict[str, Callable[..., Any]] = {
+    "custom": _custom,
+    "sqlite": _sqlite,
+}
+
+# Databases available by default; each is opened on first use
+DEFAULT_DATABASES: Dict[str, Dict[str, Any]] = {
+    "default": {"type": "custom"},
+    "test": {"type": "custom"},
+    "sqlite": {"type": "sqlite", "db_name": "database.db"},
+}
+
+
+class DatabaseRegistry:
+    """Global database registry.
+
+    A singleton class that provides a central registry for database instances,
+    allowing different parts of the application to access databases by name.
+    Databases can be registered as instances, or as factories that are only
+    called when the database is first used, so registering does no I/O.
+
+    Attributes:
+        _databases (dict): Internal storage for database instances.
+        _factories (dict): Factories of the databases not opened yet.
+        _listeners (list): Callbacks told about every registration.
+    """
+    _databases: Dict[str, Any] = {}
+    _factories: Dict[str, Callable[[], Any]] = {}
+    _listeners: List[Callable[[str, Any], None]] = []
+    _lock = threading.RLock()
+
+    @classmethod
+    def register(cls, name: str, db_instance: Any) -> None:
+        """Register a database instance with a name.
+
+        Args:
+            name (str): Unique name for the database instance.
+            db_instance (Any): Database instance to register.
+        """
+        with cls._lock:
+            cls._factories.pop(name, None)
+            cls._databases[name] = db_instance
+        for listener in list(cls._listeners):
+            listener(name, db_instance)
+
+    @classmethod
+    def register_lazy(cls, name: str, factory: Callable[[], Any]) -> None:
+        """Register a database that is created on first use.
+
+        Args:
+            name (str): Unique name for the database.
+            factory (Callable[[], Any]): Creates the database instance.
+        """
+        with cls._lock:
+            cls._databases.pop(name, None)
+            cls._factories[name] = factory
+
+    @classmethod
+    def configure(cls, config: Dict[str, Dict[str, Any]]) -> None:
+        """Register databases from configuration, each opened on first use.
+
+        Usage:
+            DatabaseRegistry.configure({
+                "sqlite": {"type": "sqlite", "db_name": "app.db", "pool_size": 10},
+                "cache": {"type": "custom", "concurrency": "model"},
+            })
+
+        Args:
+            config (Dict[str, Dict[str, Any]]): Database name to its options:
+                "type" is a key of BACKEND_TYPES, the rest is passed to the
+                database's constructor.
+
+        Raises:
+            ValueError: If a type is unknown.
+        """
+        for name, options in config.items():
+            options = dict(options)
+            kind = options.pop("type", None)
+            factory = BACKEND_TYPES.get(kind)
+            if factory is None:
+                raise ValueError(f"Unknown database type '{kind}' for '{name}', "
+                                 f"expected one of {list(BACKEND_TYPES)}")
+            cls.register_lazy(name, lambda factory=factory, name=name, options=options: factory(name, **options))
+
+    @classmethod
+    def subscribe(cls, listener: Callable[[str, Any], None]) -> None:
+        """Call a function with the name and instance of each database registered
+        or opened from now on.
+
+        Args:
+            listener (Callable[[str, Any], None]): The function.
+        """
+        cls._listeners.append(listener)
+
+    @classmethod
+    def unsubscribe(cls, listener: Callable[[str, Any], None]) -> None:
+        """Stop calling a function subscribed with subscribe().
+
+        Args:
+            listener (Callable[[str, Any], None]): The function.
+        """
+        if listener in cls._listeners:
+            cls._listeners.remove(listener)
+
+    @classmethod
+    def get(cls, name: str) -> Optional[Any]:
+        """Retrieve a database instance by name, creating it if it was registered lazily.
+
+        Args:
+            name (str): Name of the database to retrieve.
+
+        Returns:
+            Optional[Any]: The database instance if found, None otherwise.
+        """
+        db = cls._databases.get(name)
+        if db is not None or name not in cls._factories:
+            return db
+        with cls._lock:
+            db = cls._databases.get(name)
+            if db is not None:
+                return db
+            factory = cls._factories.get(name)
+            if factory is None:
+                return None
+            db = factory()
+            cls._databases[name] = db
+            del cls._factories[name]
+        for listener in list(cls._listeners):
+            listener(name, db)
+        return db
+
+    @classmethod
+    def list(cls) -> List[str]:
+        """List all registered database names, opened or not.
+
+        Returns:
+            List[str]: List of registered database names.
+        """
+        with cls._lock:
+            return list(cls._databases) + [name for name in cls._factories if name not in cls._databases]
+
+    @classmethod
+    def instances(cls) -> Dict[str, Any]:
+        """Get the databases opened so far, without opening the others.
+
+        Returns:
+            Dict[str, Any]: Database name to instance.
+        """
+        with cls._lock:
+            return dict(cls._databases)
+
+
+DatabaseRegistry.configure(DEFAULT_DATABASES)
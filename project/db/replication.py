@@ -0,0 +1,589 @@
+import contextvars
+import itertools
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .base import require_dict_records
+from .query import check_cursor
+
+# How ReplicatedDatabase picks the replica for a read
+READ_ROUTING = ("round_robin", "least_loaded")
+
+# A change shipped to the replicas: (version, written at, operation, model, id, record)
+Change = Tuple[int, float, str, str, Any, Optional[Dict[str, Any]]]
+
+class _Replica:
+    """Replica database and its replication state.
+
+    Attributes:
+        name (str): Registered name.
+        database (Any): The database.
+        applied (int): Version of the last change applied to it.
+        active (int): Reads running on it right now.
+        reads (int): Reads it served.
+        errors (int): Changes it failed to apply.
+    """
+    __slots__ = ("name", "database", "applied", "active", "reads", "errors")
+
+    def __init__(self, name: str, database: Any) -> None:
+        self.name = name
+        self.database = database
+        self.applied = 0
+        self.active = 0
+        self.reads = 0
+        self.errors = 0
+
+
+class ReplicatedDatabase:
+    """Primary database with read replicas.
+
+    Writes go to the primary and are then shipped, in order, to every
+    replica by a background thread. Reads (get, get_many, find, page,
+    iter_records) go to a replica, picked round-robin or by the fewest
+    reads in progress. A replica that is more than max_lag seconds behind is
+    skipped, and reads fall back to the primary when no replica qualifies.
+
+    Reads see the writes made before them in the same context (thread or
+    asyncio task): a replica is only used once it applied them. session()
+    limits that to a block, e.g. one request. Reads inside a transaction go
+    to the primary, and writes of a transaction are shipped once it commits.
+
+    Replicas must start as copies of the primary, e.g. all empty. In-memory
+    replicas are written by the replication thread while serving reads, so
+    give them a concurrency mode (see CustomDatabase).
+
+    Usage:
+        DatabaseRegistry.register("main", ReplicatedDatabase("sqlite", ["replica_1", "replica_2"]))
+
+    Attributes:
+        primary (Any): The database that takes the writes.
+        routing (str): One of READ_ROUTING.
+        max_lag (float): Seconds a replica may be behind and still serve reads.
+        version (int): Version of the last write to the primary.
+        fallbacks (int): Reads that went to the primary for lack of a replica.
+    """
+
+    def __init__(self, primary: str, replicas: Sequence[str], routing: str = "round_robin",
+                 max_lag: float = 1.0, clock: Callable[[], float] = time.monotonic) -> None:
+        """Set up replication between registered databases.
+
+        Args:
+            primary (str): Name of the primary in DatabaseRegistry.
+            replicas (Sequence[str]): Names of the replicas in DatabaseRegistry.
+            routing (str, optional): "round_robin" or "least_loaded".
+                Defaults to "round_robin".
+            max_lag (float, optional): Seconds a replica may be behind and
+                still serve reads. Defaults to 1.0.
+            clock (Callable[[], float], optional): Time source for the lag.
+                Defaults to time.monotonic.
+
+        Raises:
+            KeyError: If a database is not registered.
+            ValueError: If the routing is unknown, or a database does not
+                return dict records.
+        """
+        from .database import DatabaseRegistry
+        if routing not in READ_ROUTING:
+            raise ValueError(f"Unknown read routing '{routing}', expected one of {list(READ_ROUTING)}")
+        self.primary = _registered(DatabaseRegistry, primary)
+        self._replicas = [_Replica(name, _registered(DatabaseRegistry, name)) for name in replicas]
+        for database in [self.primary] + [replica.database for replica in self._replicas]:
+            require_dict_records(database, "ReplicatedDatabase")
+        self.routing = routing
+        self.max_lag = max_lag
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.version = 0
+        self.fallbacks = 0
+        # Write time of each version not yet applied by every replica
+        self._written_at: Dict[int, float] = {}
+        self._turn = itertools.count()
+        self._last_write: contextvars.ContextVar[int] = contextvars.ContextVar(f"last_write_{id(self)}", default=0)
+        self._transaction: contextvars.ContextVar[Optional[List[Tuple[str, str, Any, Optional[Dict[str, Any]]]]]] = \
+            contextvars.ContextVar(f"transaction_{id(self)}", default=None)
+        self._changes: "queue.Queue[Optional[Change]]" = queue.Queue()
+        self._applied = threading.Condition(self._lock)
+        self._shipper = threading.Thread(target=self._ship, name="replication", daemon=True)
+        self._shipper.start()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.primary, name)
+
+    # --- Replication ---
+
+    def _publish(self, changes: List[Tuple[str, str, Any, Optional[Dict[str, Any]]]]) -> None:
+        """Queue committed changes for the replicas.
+
+        Args:
+            changes (List[Tuple[str, str, Any, Optional[Dict[str, Any]]]]):
+                ("put" or "delete", model, id, record) of each change.
+        """
+        if not changes:
+            return
+        with self._lock:
+            now = self._clock()
+            for operation, model_name, obj_id, record in changes:
+                self.version += 1
+                self._written_at[self.version] = now
+                self._changes.put((self.version, now, operation, model_name, obj_id, record))
+            version = self.version
+        self._last_write.set(version)
+
+    def _record(self, operation: str, model_name: str, obj_id: Any,
+                record: Optional[Dict[str, Any]] = None) -> None:
+        """Ship a change now, or once the current transaction commits.
+
+        Args:
+            operation (str): "put" or "delete".
+            model_name (str): The model/collection name.
+            obj_id (Any): ID of the record.
+            record (Dict[str, Any], optional): The whole record, for "put".
+        """
+        change = (operation, model_name, obj_id, None if record is None else dict(record))
+        pending = self._transaction.get()
+        if pending is not None:
+            pending.append(change)
+        else:
+            self._publish([change])
+
+    def _ship(self) -> None:
+        """Apply queued changes to every replica, in order, until closed."""
+        while True:
+            change = self._changes.get()
+            if change is None:
+                return
+            version, _, operation, model_name, obj_id, record = change
+            for replica in self._replicas:
+                try:
+                    _apply(replica.database, operation, model_name, obj_id, record)
+                except Exception as e:
+                    replica.errors += 1
+                    print(f"Error replicating to '{replica.name}': {str(e)}")
+                with self._lock:
+                    replica.applied = version
+            with self._applied:
+                self._written_at.pop(version, None)
+                self._applied.notify_all()
+
+    def lag(self, replica: str) -> float:
+        """Get how far a replica is behind the primary.
+
+        Args:
+            replica (str): Registered name of the replica.
+
+        Returns:
+            float: Seconds since the oldest write it has not applied yet, or 0.0.
+        """
+        state = next(state for state in self._replicas if state.name == replica)
+        with self._lock:
+            return self._lag(state)
+
+    def _lag(self, replica: _Replica) -> float:
+        """Get the lag of a replica; the lock must be held."""
+        written_at = self._written_at.get(replica.applied + 1)
+        return 0.0 if written_at is None else self._clock() - written_at
+
+    def wait_for_replicas(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every replica applied all writes so far.
+
+        Args:
+            timeout (float, optional): Seconds to wait. Defaults to no limit.
+
+        Returns:
+            bool: True if the replicas caught up in time.
+        """
+        with self._applied:
+            target = self.version
+            return self._applied.wait_for(
+                lambda: all(replica.applied >= target for replica in self._replicas), timeout)
+
+    # --- Read routing ---
+
+    @contextmanager
+    def _reader(self) -> Iterator[Any]:
+        """Pick the database for a read and count it as in progress.
+
+        Yields:
+            Any: A replica that applied this context's writes and is within
+                max_lag, or the primary.
+        """
+        if self._transaction.get() is not None:
+            yield self.primary
+            return
+        required = self._last_write.get()
+        with self._lock:
+            candidates = [replica for replica in self._replicas
+                          if replica.applied >= required and self._lag(replica) <= self.max_lag]
+            if not candidates:
+                self.fallbacks += 1
+                replica = None
+            elif self.routing == "least_loaded":
+                replica = min(candidates, key=lambda candidate: candidate.active)
+            else:
+                replica = candidates[next(self._turn) % len(candidates)]
+            if replica is not None:
+                replica.active += 1
+                replica.reads += 1
+        if replica is None:
+            yield self.primary
+            return
+        try:
+            yield replica.database
+        finally:
+            with self._lock:
+                replica.active -= 1
+
+    def _source_of(self, database: Any) -> int:
+        """Get the index of a database in page cursors.
+
+        Args:
+            database (Any): The primary or a replica.
+
+        Returns:
+            int: 0 for the primary, or 1 plus the position of the replica.
+        """
+        if database is self.primary:
+            return 0
+        return 1 + next(index for index, replica in enumerate(self._replicas)
+                        if replica.database is database)
+
+    @contextmanager
+    def _source(self, source: int) -> Iterator[Any]:
+        """Read from the database a page cursor came from.
+
+        Args:
+            source (int): Index from _source_of().
+
+        Yields:
+            Any: The primary or the replica.
+
+        Raises:
+            ValueError: If there is no such database.
+        """
+        if not 0 <= source <= len(self._replicas):
+            raise ValueError(f"Invalid pagination cursor database {source}")
+        if source == 0:
+            yield self.primary
+            return
+        replica = self._replicas[source - 1]
+        with self._lock:
+            replica.active += 1
+            replica.reads += 1
+        try:
+            yield replica.database
+        finally:
+            with self._lock:
+                replica.active -= 1
+
+    @contextmanager
+    def session(self) -> Iterator['ReplicatedDatabase']:
+        """Scope read-your-writes to a block, e.g. one request.
+
+        Reads in the block see the block's own writes; writes made before it
+        in the same context no longer hold reads back.
+
+        Yields:
+            ReplicatedDatabase: This database.
+        """
+        token = self._last_write.set(0)
+        try:
+            yield self
+        finally:
+            self._last_write.reset(token)
+
+    def get(self, model_name: str, obj_id: Union[str, int]) -> Optional[Dict[str, Any]]:
+        """Get a record from a replica.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Union[str, int]): ID of the record to retrieve.
+
+        Returns:
+            Optional[Dict[str, Any]]: The record if found, None otherwise.
+        """
+        with self._reader() as database:
+            return database.get(model_name, obj_id)
+
+    def get_many(self, model_name: str, obj_ids: List[Union[str, int]]) -> List[Dict[str, Any]]:
+        """Get several records from a replica.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_ids (List[Union[str, int]]): IDs of the records to retrieve.
+
+        Returns:
+            List[Dict[str, Any]]: The records that were found, in the order of the requested IDs.
+        """
+        with self._reader() as database:
+            return database.get_many(model_name, obj_ids)
+
+    def find(self, model_name: str, where: Dict[str, Any],
+             order_by: Optional[Union[str, List[str]]] = None, limit: Optional[int] = None,
+             offset: Optional[int] = None, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Find the matching records on a replica.
+
+        Args:
+            model_name (str): The model/collection name.
+            where (Dict[str, Any]): Conditions, as for the underlying databases.
+            order_by (Union[str, List[str]], optional): Field(s) to sort by.
+            limit (int, optional): Maximum number of records.
+            offset (int, optional): Number of records to skip.
+            fields (List[str], optional): Fields to return. Defaults to whole records.
+
+        Returns:
+            List[Dict[str, Any]]: The matching records.
+        """
+        with self._reader() as database:
+            return database.find(model_name, where, order_by=order_by, limit=limit,
+                                 offset=offset, fields=fields)
+
+    def page(self, model_name: str, limit: int = 50,
+             after: Optional[List[Any]] = None) -> Tuple[List[Dict[str, Any]], Optional[List[Any]]]:
+        """Get one page of records from a replica.
+
+        Cursors are positions in one database's own order, which differs
+        between the primary and the replicas, so the cursor holds the
+        database that served the page and the next pages are read from it.
+
+        Args:
+            model_name (str): The model/collection name.
+            limit (int, optional): Maximum number of records. Defaults to 50.
+            after (List[Any], optional): Cursor of the previous page. Defaults to the start.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[List[Any]]]: The records and the
+                cursor of the next page, or None if there are no more records.
+
+        Raises:
+            ValueError: If the cursor is not a [database index, cursor] pair
+                of this database.
+        """
+        check_cursor(after, list)
+        if after is None:
+            with self._reader() as database:
+                records, position = database.page(model_name, limit)
+            source = self._source_of(database)
+        else:
+            source, position = after
+            with self._source(source) as database:
+                records, position = database.page(model_name, limit, position)
+        return records, (None if position is None else [source, position])
+
+    def iter_records(self, model_name: str, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Walk the records of a model on one replica.
+
+        Args:
+            model_name (str): The model/collection name.
+            batch_size (int, optional): Records read at a time. Defaults to 500.
+
+        Yields:
+            Dict[str, Any]: Each record.
+        """
+        with self._reader() as database:
+            yield from database.iter_records(model_name, batch_size)
+
+    # --- Writes ---
+
+    def create(self, model_name: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Create a record on the primary.
+
+        Args:
+            model_name (str): The model/collection name.
+            data (Dict[str, Any]): Data to store.
+
+        Returns:
+            Optional[Dict[str, Any]]: The created record, or None if the primary rejected it.
+        """
+        record = self.primary.create(model_name, data)
+        if record is not None:
+            self._record("put", model_name, record["id"], record)
+        return record
+
+    def update(self, model_name: str, obj_id: Union[str, int],
+               data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update a record on the primary.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Union[str, int]): ID of the record to update.
+            data (Dict[str, Any]): New data to apply to the record.
+
+        Returns:
+            Optional[Dict[str, Any]]: The updated record if found, None otherwise.
+        """
+        record = self.primary.update(model_name, obj_id, data)
+        if record is not None:
+            self._record("put", model_name, record["id"], record)
+        return record
+
+    def delete(self, model_name: str, obj_id: Union[str, int]) -> Optional[Dict[str, Any]]:
+        """Delete a record on the primary.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Union[str, int]): ID of the record to delete.
+
+        Returns:
+            Optional[Dict[str, Any]]: The deleted record if found, None otherwise.
+        """
+        record = self.primary.delete(model_name, obj_id)
+        if record is not None:
+            self._record("delete", model_name, record.get("id", obj_id))
+        return record
+
+    def create_many(self, model_name: str, records: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """Create several records on the primary.
+
+        Args:
+            model_name (str): The model/collection name.
+            records (List[Dict[str, Any]]): Data for each record to store.
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: The created records, or None if the batch failed.
+        """
+        with self.transaction():
+            created = self.primary.create_many(model_name, records)
+            for record in created or []:
+                self._record("put", model_name, record["id"], record)
+        return created
+
+    def update_many(self, model_name: str,
+                    updates: Dict[Union[str, int], Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """Update several records on the primary.
+
+        Args:
+            model_name (str): The model/collection name.
+            updates (Dict[Union[str, int], Dict[str, Any]]): Mapping of record
+                ID to the data to apply to that record.
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: The updated records, or None if the batch failed.
+        """
+        with self.transaction():
+            updated = self.primary.update_many(model_name, updates)
+            for record in updated or []:
+                self._record("put", model_name, record["id"], record)
+        return updated
+
+    def delete_many(self, model_name: str, obj_ids: List[Union[str, int]]) -> Optional[List[Dict[str, Any]]]:
+        """Delete several records on the primary.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_ids (List[Union[str, int]]): IDs of the records to delete.
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: The deleted records, or None if the batch failed.
+        """
+        with self.transaction():
+            deleted = self.primary.delete_many(model_name, obj_ids)
+            for record in deleted or []:
+                self._record("delete", model_name, record["id"])
+        return deleted
+
+    def create_index(self, model_name: str, field: str, kind: str = "hash") -> None:
+        """Declare a secondary index on the primary and every replica that supports indexes.
+
+        Args:
+            model_name (str): The model/collection name.
+            field (str): Name of the field to index.
+            kind (str, optional): "hash" or "sorted". Defaults to "hash".
+        """
+        for database in [self.primary] + [replica.database for replica in self._replicas]:
+            create_index = getattr(database, "create_index", None)
+            if create_index is not None:
+                create_index(model_name, field, kind)
+
+    @contextmanager
+    def transaction(self) -> Iterator['ReplicatedDatabase']:
+        """Run a transaction on the primary; replicas get its changes once it commits.
+
+        Yields:
+            ReplicatedDatabase: This database.
+        """
+        outer = self._transaction.get()
+        if outer is not None:
+            # Savepoint: drop this level's changes if it fails, as the primary does
+            mark = len(outer)
+            try:
+                with self.primary.transaction():
+                    yield self
+            except BaseException:
+                del outer[mark:]
+                raise
+            return
+        pending: List[Tuple[str, str, Any, Optional[Dict[str, Any]]]] = []
+        token = self._transaction.set(pending)
+        try:
+            with self.primary.transaction():
+                yield self
+        finally:
+            self._transaction.reset(token)
+        self._publish(pending)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the replication and routing counters.
+
+        Returns:
+            Dict[str, Any]: Primary version, fallbacks to the primary, and the
+                applied version, lag, reads and errors of each replica.
+        """
+        with self._lock:
+            return {
+                "version": self.version,
+                "fallbacks": self.fallbacks,
+                "replicas": {
+                    replica.name: {
+                        "applied": replica.applied,
+                        "lag": self._lag(replica),
+                        "reads": replica.reads,
+                        "errors": replica.errors,
+                    }
+                    for replica in self._replicas
+                },
+            }
+
+    def close(self) -> None:
+        """Ship the queued changes, then stop the replication thread."""
+        self._changes.put(None)
+        self._shipper.join()
+
+
+def _registered(registry: Any, name: str) -> Any:
+    """Look a database up in the registry.
+
+    Args:
+        registry (Any): DatabaseRegistry.
+        name (str): Registered name.
+
+    Returns:
+        Any: The database.
+
+    Raises:
+        KeyError: If the name is not registered.
+    """
+    database = registry.get(name)
+    if database is None:
+        raise KeyError(f"Database '{name}' is not registered")
+    return database
+
+def _apply(database: Any, operation: str, model_name: str, obj_id: Any,
+           record: Optional[Dict[str, Any]]) -> None:
+    """Apply a replicated change to a database.
+
+    Args:
+        database (Any): The replica.
+        operation (str): "put" or "delete".
+        model_name (str): The model/collection name.
+        obj_id (Any): ID of the record.
+        record (Dict[str, Any], optional): The whole record, for "put".
+    """
+    if operation == "delete":
+        database.delete(model_name, obj_id)
+    elif database.get(model_name, obj_id) is None:
+        database.create(model_name, dict(record))
+    else:
+        database.update(model_name, obj_id, {key: value for key, value in record.items() if key != "id"})
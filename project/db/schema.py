@@ -0,0 +1,179 @@
+from typing import Any, Dict, Optional, Sequence, Tuple, Union, get_args, get_origin, get_type_hints
+
+from .query import check_identifier
+
+# SQLite column type for each Python field type; anything else is stored as TEXT
+SQL_TYPES = {int: "INTEGER", float: "REAL", str: "TEXT", bool: "INTEGER", bytes: "BLOB"}
+
+# Column definition of the primary key every table gets
+PRIMARY_KEY = "INTEGER PRIMARY KEY AUTOINCREMENT"
+
+class TableSchema:
+    """Table layout of a model, with its SQL statements prepared once.
+
+    INSERT and UPDATE statements depend on which columns a call sets, so they
+    are built on first use for each column combination and then reused.
+    Only combinations of known columns are cached, which keeps the caches
+    bounded.
+
+    Attributes:
+        table (str): Table name.
+        columns (Tuple[str, ...]): Column names, primary key first.
+        column_set (frozenset): The same names, for membership tests.
+        definitions (Dict[str, str]): SQL definition of each column.
+        indexes (Dict[str, str]): Indexed columns and their index kind.
+        model (type, optional): Model class the table stores, if any.
+        create_sql (str): CREATE TABLE statement.
+        select_sql (str): SELECT of one row by ID.
+        delete_sql (str): DELETE of one row by ID.
+    """
+
+    def __init__(self, table: str, definitions: Dict[str, str],
+                 indexes: Optional[Dict[str, str]] = None, model: Optional[type] = None) -> None:
+        """Describe a table.
+
+        Args:
+            table (str): Table name.
+            definitions (Dict[str, str]): SQL definition of each column, e.g.
+                {"id": PRIMARY_KEY, "email": "TEXT NOT NULL"}.
+            indexes (Dict[str, str], optional): Columns to index, mapped to
+                the index kind.
+            model (type, optional): Model class the table stores.
+
+        Raises:
+            ValueError: If the table or a column name is not a plain identifier.
+        """
+        self.table = check_identifier(table)
+        self.definitions = {check_identifier(column): sql for column, sql in definitions.items()}
+        self.columns = tuple(self.definitions)
+        self.column_set = frozenset(self.columns)
+        self.indexes = dict(indexes or {})
+        self.model = model
+        columns = ", ".join(f"{column} {sql}" for column, sql in self.definitions.items())
+        self.create_sql = f"CREATE TABLE IF NOT EXISTS {self.table} ({columns})"
+        self.select_sql = f"SELECT * FROM {self.table} WHERE id=?"
+        self.delete_sql = f"DELETE FROM {self.table} WHERE id=?"
+        self._inserts: Dict[Tuple[str, ...], str] = {}
+        self._updates: Dict[Tuple[str, ...], str] = {}
+
+    @classmethod
+    def from_model(cls, model: type) -> 'TableSchema':
+        """Derive the table of a model class from its annotated fields.
+
+        The "id" field becomes the autoincrement primary key. A field is NOT
+        NULL unless it is Optional or defaults to None, and a class-level
+        default value becomes the column DEFAULT.
+
+        Args:
+            model (type): Model class with __fields__ and __field_defaults__.
+
+        Returns:
+            TableSchema: The table of the model, named after the lowercased class name.
+        """
+        try:
+            hints = get_type_hints(model)
+        except NameError:
+            hints = {}
+        defaults = model.__field_defaults__
+        definitions = {"id": PRIMARY_KEY}
+        for field in model.__fields__:
+            if field == "id":
+                continue
+            field_type, nullable = _unwrap_optional(hints.get(field, str))
+            sql = SQL_TYPES.get(field_type, "TEXT")
+            if field in defaults:
+                default = defaults[field]
+                nullable = nullable or default is None
+                if default is not None and type(default) in SQL_TYPES:
+                    sql += f" DEFAULT {_literal(default)}"
+            if not nullable:
+                sql += " NOT NULL"
+            definitions[field] = sql
+        return cls(model.__name__.lower(), definitions, model.__indexes__, model)
+
+    def insert_sql(self, columns: Sequence[str]) -> str:
+        """Get the INSERT statement setting some columns.
+
+        Args:
+            columns (Sequence[str]): Columns in the order of the values.
+
+        Returns:
+            str: Parameterized INSERT statement.
+
+        Raises:
+            ValueError: If a column name is not a plain identifier.
+        """
+        key = tuple(columns)
+        sql = self._inserts.get(key)
+        if sql is None:
+            names = ", ".join(check_identifier(column) for column in key)
+            sql = f"INSERT INTO {self.table} ({names}) VALUES ({', '.join(['?'] * len(key))})"
+            if self.column_set.issuperset(key):
+                self._inserts[key] = sql
+        return sql
+
+    def update_sql(self, columns: Sequence[str]) -> str:
+        """Get the UPDATE statement setting some columns of one row.
+
+        Args:
+            columns (Sequence[str]): Columns in the order of the values; the
+                row ID is the last parameter.
+
+        Returns:
+            str: Parameterized UPDATE statement.
+
+        Raises:
+            ValueError: If a column name is not a plain identifier.
+        """
+        key = tuple(columns)
+        sql = self._updates.get(key)
+        if sql is None:
+            assignments = ", ".join(f"{check_identifier(column)}=?" for column in key)
+            sql = f"UPDATE {self.table} SET {assignments} WHERE id=?"
+            if self.column_set.issuperset(key):
+                self._updates[key] = sql
+        return sql
+
+
+# Schemas of all model classes, keyed by table name; filled by BaseModelMeta
+SCHEMAS: Dict[str, TableSchema] = {}
+
+def register_schema(schema: TableSchema) -> None:
+    """Make a table known to databases that create their tables from schemas.
+
+    Args:
+        schema (TableSchema): The table layout.
+    """
+    SCHEMAS[schema.table] = schema
+
+def _unwrap_optional(annotation: Any) -> Tuple[Any, bool]:
+    """Split Optional[X] into X and a nullable flag.
+
+    Args:
+        annotation (Any): Field type annotation.
+
+    Returns:
+        Tuple[Any, bool]: The inner type and whether None is allowed.
+    """
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        nullable = len(args) < len(get_args(annotation))
+        return (args[0] if len(args) == 1 else Any), nullable
+    return annotation, False
+
+def _literal(value: Any) -> str:
+    """Format a default value as an SQL literal.
+
+    Args:
+        value (Any): int, float, str, bool or bytes value.
+
+    Returns:
+        str: The SQL literal.
+    """
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, bytes):
+        return f"X'{value.hex()}'"
+    return "'" + value.replace("'", "''") + "'"
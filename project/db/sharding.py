@@ -0,0 +1,438 @@
+import hashlib
+import threading
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .base import require_dict_records
+from .ids import IdAllocator, allocator_factory
+from .query import apply_options, check_cursor, parse_order
+
+class HashRing:
+    """Consistent hash ring mapping keys to nodes.
+
+    Every node is placed on the ring at several points (virtual nodes), and a
+    key belongs to the first point at or after its own hash. Adding or
+    removing a node only moves the keys next to its points, about 1/N of
+    them, instead of reshuffling every key as hash(key) % N would.
+
+    Attributes:
+        nodes (List[str]): Node names.
+        replicas (int): Points per node.
+    """
+
+    def __init__(self, nodes: Sequence[str], replicas: int = 100) -> None:
+        """Build the ring.
+
+        Args:
+            nodes (Sequence[str]): Node names.
+            replicas (int, optional): Points per node; more points spread the
+                keys more evenly. Defaults to 100.
+
+        Raises:
+            ValueError: If there are no nodes.
+        """
+        if not nodes:
+            raise ValueError("A hash ring needs at least one node")
+        self.nodes = list(nodes)
+        self.replicas = replicas
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node(self, key: Any) -> str:
+        """Find the node a key belongs to.
+
+        Args:
+            key (Any): The key; equal keys as text map to the same node, so
+                1 and "1" do.
+
+        Returns:
+            str: Node name.
+        """
+        index = bisect_right(self._hashes, _hash(str(key)))
+        return self._owners[index % len(self._owners)]
+
+
+class _BatchRejected(Exception):
+    """Raised to roll back the other shards when one rejects its batch."""
+
+
+class ShardedDatabase:
+    """Database that spreads records over several registered databases.
+
+    Each record lives on the shard its ID maps to on a consistent hash ring,
+    so single-record calls go to exactly one shard. IDs are assigned here,
+    before the record is stored, with a strategy from db.ids. The default
+    "snowflake" IDs need no coordination between shards, but processes
+    sharing the shards must use different snowflake worker numbers (see
+    SnowflakeAllocator).
+
+    Queries over many records (find, page, iter_records) are scattered to
+    all shards in parallel and their results gathered, with sorting and
+    slicing applied to the combined results. Inside a transaction they run
+    on the calling thread one shard after another instead, so they see the
+    transaction's uncommitted writes.
+
+    Transactions are opened on every shard, but committed one shard after
+    another: a failure while committing can leave some shards committed.
+
+    Usage:
+        DatabaseRegistry.register("users_0", SqliteDatabase("users_0.db"))
+        DatabaseRegistry.register("users_1", SqliteDatabase("users_1.db"))
+        DatabaseRegistry.register("users", ShardedDatabase(["users_0", "users_1"]))
+
+    Attributes:
+        shards (Dict[str, Any]): The underlying databases by registered name.
+        ring (HashRing): Maps record IDs to shard names.
+    """
+
+    def __init__(self, shards: Sequence[str], id_strategy: Any = "snowflake",
+                 replicas: int = 100) -> None:
+        """Shard over registered databases.
+
+        Args:
+            shards (Sequence[str]): Names of the databases in DatabaseRegistry.
+            id_strategy (Any, optional): ID strategy name from
+                db.ids.ID_STRATEGIES, or a callable returning a new
+                IdAllocator. Defaults to "snowflake".
+            replicas (int, optional): Points per shard on the hash ring.
+                Defaults to 100.
+
+        Raises:
+            KeyError: If a shard is not registered.
+            ValueError: If there are no shards, the ID strategy is unknown or
+                a shard does not return dict records.
+        """
+        from .database import DatabaseRegistry
+        self.shards: Dict[str, Any] = {}
+        for name in shards:
+            database = DatabaseRegistry.get(name)
+            if database is None:
+                raise KeyError(f"Database '{name}' is not registered")
+            require_dict_records(database, "ShardedDatabase")
+            self.shards[name] = database
+        self.ring = HashRing(list(self.shards), replicas)
+        self._id_factory = allocator_factory(id_strategy)
+        self._allocators: Dict[str, IdAllocator] = {}
+        self._executor = ThreadPoolExecutor(max_workers=len(self.shards),
+                                            thread_name_prefix="shard")
+        # Nesting depth of this thread's transaction
+        self._local = threading.local()
+
+    def _allocator(self, model_name: str) -> IdAllocator:
+        allocator = self._allocators.get(model_name)
+        if allocator is None:
+            allocator = self._allocators.setdefault(model_name, self._id_factory())
+        return allocator
+
+    def shard_for(self, obj_id: Union[str, int]) -> Any:
+        """Get the database a record lives on.
+
+        Args:
+            obj_id (Union[str, int]): ID of the record.
+
+        Returns:
+            Any: The shard database.
+        """
+        return self.shards[self.ring.node(obj_id)]
+
+    def _scatter(self, call: Callable[[Any], Any]) -> List[Any]:
+        """Run a call on every shard in parallel.
+
+        Inside a transaction the calls run one after another on this thread,
+        which the shards' transactions are bound to.
+
+        Args:
+            call (Callable[[Any], Any]): Called with each shard database.
+
+        Returns:
+            List[Any]: Results in shard order.
+        """
+        if getattr(self._local, "depth", 0):
+            return [call(shard) for shard in self.shards.values()]
+        return list(self._executor.map(call, self.shards.values()))
+
+    def _group(self, obj_ids: Sequence[Union[str, int]]) -> Dict[str, List[Union[str, int]]]:
+        """Split IDs by the shard they live on.
+
+        Args:
+            obj_ids (Sequence[Union[str, int]]): Record IDs.
+
+        Returns:
+            Dict[str, List[Union[str, int]]]: IDs of each shard name.
+        """
+        groups: Dict[str, List[Union[str, int]]] = {}
+        for obj_id in obj_ids:
+            groups.setdefault(self.ring.node(obj_id), []).append(obj_id)
+        return groups
+
+    def create(self, model_name: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Assign an ID to a record and store it on its shard.
+
+        Args:
+            model_name (str): The model/collection name.
+            data (Dict[str, Any]): Data to store; an "id" in it is kept.
+
+        Returns:
+            Optional[Dict[str, Any]]: The created record, or None if the shard rejected it.
+        """
+        record = dict(data)
+        if record.get("id") is None:
+            record["id"] = self._allocator(model_name).next()
+        return self.shard_for(record["id"]).create(model_name, record)
+
+    def get(self, model_name: str, obj_id: Union[str, int]) -> Optional[Dict[str, Any]]:
+        """Get a record from its shard.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Union[str, int]): ID of the record to retrieve.
+
+        Returns:
+            Optional[Dict[str, Any]]: The record if found, None otherwise.
+        """
+        return self.shard_for(obj_id).get(model_name, obj_id)
+
+    def update(self, model_name: str, obj_id: Union[str, int],
+               data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update a record on its shard.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Union[str, int]): ID of the record to update.
+            data (Dict[str, Any]): New data to apply to the record.
+
+        Returns:
+            Optional[Dict[str, Any]]: The updated record if found, None otherwise.
+        """
+        return self.shard_for(obj_id).update(model_name, obj_id, data)
+
+    def delete(self, model_name: str, obj_id: Union[str, int]) -> Optional[Dict[str, Any]]:
+        """Delete a record from its shard.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Union[str, int]): ID of the record to delete.
+
+        Returns:
+            Optional[Dict[str, Any]]: The deleted record if found, None otherwise.
+        """
+        return self.shard_for(obj_id).delete(model_name, obj_id)
+
+    def create_many(self, model_name: str,
+                    records: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """Create several records, one batch per shard.
+
+        The batches run in one transaction on the shards involved, so when
+        a shard rejects its batch, those already stored on other shards are
+        rolled back too.
+
+        Args:
+            model_name (str): The model/collection name.
+            records (List[Dict[str, Any]]): Data for each record to store.
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: The created records in input
+                order, or None if a shard rejected its batch.
+        """
+        allocator = self._allocator(model_name)
+        batches: Dict[str, List[Dict[str, Any]]] = {}
+        order = []
+        for data in records:
+            record = dict(data)
+            if record.get("id") is None:
+                record["id"] = allocator.next()
+            batches.setdefault(self.ring.node(record["id"]), []).append(record)
+            order.append(record["id"])
+        created: Dict[Any, Dict[str, Any]] = {}
+        try:
+            with ExitStack() as stack:
+                for name in batches:
+                    stack.enter_context(self.shards[name].transaction())
+                for name, batch in batches.items():
+                    result = self.shards[name].create_many(model_name, batch)
+                    if result is None:
+                        raise _BatchRejected(name)
+                    created.update((str(record["id"]), record) for record in result)
+        except _BatchRejected:
+            return None
+        return [created[str(obj_id)] for obj_id in order]
+
+    def get_many(self, model_name: str, obj_ids: List[Union[str, int]]) -> List[Dict[str, Any]]:
+        """Get several records, one query per shard.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_ids (List[Union[str, int]]): IDs of the records to retrieve.
+
+        Returns:
+            List[Dict[str, Any]]: The records that were found, in the order of
+                the requested IDs.
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        for name, ids in self._group(obj_ids).items():
+            for record in self.shards[name].get_many(model_name, ids):
+                found[str(record["id"])] = record
+        return [found[str(obj_id)] for obj_id in obj_ids if str(obj_id) in found]
+
+    def update_many(self, model_name: str,
+                    updates: Dict[Union[str, int], Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Update several records, one batch per shard.
+
+        Args:
+            model_name (str): The model/collection name.
+            updates (Dict[Union[str, int], Dict[str, Any]]): Mapping of record
+                ID to the data to apply to that record.
+
+        Returns:
+            List[Dict[str, Any]]: The records that were found and updated.
+        """
+        updated: List[Dict[str, Any]] = []
+        for name, ids in self._group(list(updates)).items():
+            updated.extend(self.shards[name].update_many(model_name, {obj_id: updates[obj_id] for obj_id in ids}) or [])
+        return updated
+
+    def delete_many(self, model_name: str, obj_ids: List[Union[str, int]]) -> List[Dict[str, Any]]:
+        """Delete several records, one batch per shard.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_ids (List[Union[str, int]]): IDs of the records to delete.
+
+        Returns:
+            List[Dict[str, Any]]: The records that were found and deleted.
+        """
+        deleted: List[Dict[str, Any]] = []
+        for name, ids in self._group(obj_ids).items():
+            deleted.extend(self.shards[name].delete_many(model_name, ids) or [])
+        return deleted
+
+    def find(self, model_name: str, where: Dict[str, Any],
+             order_by: Optional[Union[str, List[str]]] = None, limit: Optional[int] = None,
+             offset: Optional[int] = None, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Find the matching records on all shards.
+
+        Each shard sorts its matches and returns at most offset + limit of
+        them; the combined results are then sorted, sliced and projected.
+
+        Args:
+            model_name (str): The model/collection name.
+            where (Dict[str, Any]): Conditions, as for the shard databases.
+            order_by (Union[str, List[str]], optional): Field(s) to sort by; a
+                leading "-" sorts descending.
+            limit (int, optional): Maximum number of records.
+            offset (int, optional): Number of records to skip.
+            fields (List[str], optional): Fields to return. Defaults to whole records.
+
+        Returns:
+            List[Dict[str, Any]]: The matching records.
+
+        Raises:
+            ValueError: If a condition uses an unsupported operator.
+        """
+        order = parse_order(order_by)
+        if not order and limit is None and not offset:
+            results = self._scatter(lambda shard: shard.find(model_name, where, fields=fields))
+            return [record for records in results for record in records]
+        shard_limit = None if limit is None else (offset or 0) + limit
+        results = self._scatter(lambda shard: shard.find(model_name, where, order_by, shard_limit))
+        return apply_options((record for records in results for record in records),
+                             order, limit, offset, fields)
+
+    def iter_records(self, model_name: str, batch_size: int = 500,
+                     after: Optional[List[Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Walk the records of a model, one shard after another.
+
+        Args:
+            model_name (str): The model/collection name.
+            batch_size (int, optional): Records read at a time. Defaults to 500.
+            after (List[Any], optional): Cursor returned by page() to resume after.
+
+        Yields:
+            Dict[str, Any]: Each record.
+        """
+        while True:
+            records, after = self.page(model_name, batch_size, after)
+            yield from records
+            if after is None:
+                return
+
+    def page(self, model_name: str, limit: int = 50,
+             after: Optional[List[Any]] = None) -> Tuple[List[Dict[str, Any]], Optional[List[Any]]]:
+        """Get one page of records, shard by shard.
+
+        The cursor holds the shard to continue on and that shard's own cursor.
+
+        Args:
+            model_name (str): The model/collection name.
+            limit (int, optional): Maximum number of records. Defaults to 50.
+            after (List[Any], optional): Cursor of the previous page. Defaults to the start.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[List[Any]]]: The records and the
+                cursor of the next page, or None if there are no more records.
+
+        Raises:
+            ValueError: If the cursor is not a [shard index, cursor] pair.
+        """
+        check_cursor(after, list)
+        shards = list(self.shards.values())
+        index, position = after if after is not None else (0, None)
+        records: List[Dict[str, Any]] = []
+        while index < len(shards):
+            page, position = shards[index].page(model_name, limit - len(records), position)
+            records.extend(page)
+            if position is not None:
+                return records, [index, position]
+            index += 1
+            if len(records) == limit:
+                return records, ([index, None] if index < len(shards) else None)
+        return records, None
+
+    def create_index(self, model_name: str, field: str, kind: str = "hash") -> None:
+        """Declare a secondary index on every shard that supports indexes.
+
+        Args:
+            model_name (str): The model/collection name.
+            field (str): Name of the field to index.
+            kind (str, optional): "hash" or "sorted". Defaults to "hash".
+        """
+        for shard in self.shards.values():
+            create_index = getattr(shard, "create_index", None)
+            if create_index is not None:
+                create_index(model_name, field, kind)
+
+    @contextmanager
+    def transaction(self) -> Iterator['ShardedDatabase']:
+        """Run a transaction on every shard.
+
+        Yields:
+            ShardedDatabase: This database.
+        """
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        try:
+            with ExitStack() as stack:
+                for shard in self.shards.values():
+                    stack.enter_context(shard.transaction())
+                yield self
+        finally:
+            self._local.depth = depth
+
+    def close(self) -> None:
+        """Stop the scatter threads."""
+        self._executor.shutdown(wait=True)
+
+
+def _hash(text: str) -> int:
+    """Hash text to a position on the ring, the same in every process.
+
+    Args:
+        text (str): Text to hash.
+
+    Returns:
+        int: 64-bit position.
+    """
+    return int.from_bytes(hashlib.md5(text.encode()).digest()[:8], "big")
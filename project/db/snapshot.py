@@ -0,0 +1,436 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .persistence import sync_directory
+
+# File layout, all integers little-endian:
+#
+#   header    MAGIC, lsn (u64), table count (u32)
+#   per table name, offset of its section (u64)
+#   section   row count (u64), column count (u32), flags (u32), then per column: name,
+#             kind (u8) and the offsets of its presence bytes, values and
+#             heap (u64 each) and the heap length (u64)
+#
+# Names are a u16 length followed by UTF-8 bytes. Every column stores one
+# presence byte per row (ABSENT, NULL or PRESENT). INT and FLOAT columns
+# store 8-byte values; STR and JSON columns store row offsets into a heap of
+# UTF-8 text, with one extra offset marking the end of the last row.
+MAGIC = b"CDBSNAP1"
+
+INT, FLOAT, STR, JSON = 1, 2, 3, 4
+ABSENT, NULL, PRESENT = 0, 1, 2
+
+# Section flag: the "id" column holds integers in increasing order
+SORTED_IDS = 1
+
+_HEADER = struct.Struct("<8sQI")
+_SECTION = struct.Struct("<QII")
+_COLUMN = struct.Struct("<BQQQQ")
+_OFFSET = struct.Struct("<Q")
+_NAME = struct.Struct("<H")
+_INT64 = (-2 ** 63, 2 ** 63 - 1)
+
+# Marks a field a record does not have, as opposed to one set to None
+_MISSING = object()
+
+class _Column:
+    """One column of a snapshot section, read straight from the mapped file.
+
+    Attributes:
+        name (str): Field name.
+        kind (int): INT, FLOAT, STR or JSON.
+        presence (memoryview): ABSENT, NULL or PRESENT per row.
+        values (memoryview): int64 or float64 per row, or heap offsets.
+        heap (memoryview): Text of STR and JSON values.
+    """
+    __slots__ = ("name", "kind", "presence", "values", "heap")
+
+    def __init__(self, name: str, kind: int, presence: memoryview,
+                 values: memoryview, heap: memoryview) -> None:
+        self.name = name
+        self.kind = kind
+        self.presence = presence
+        self.values = values
+        self.heap = heap
+
+    def value(self, row: int) -> Any:
+        """Decode the value of one row.
+
+        Args:
+            row (int): Row number.
+
+        Returns:
+            Any: The value, None, or _MISSING if the record has no such field.
+        """
+        state = self.presence[row]
+        if state != PRESENT:
+            return None if state == NULL else _MISSING
+        if self.kind == INT or self.kind == FLOAT:
+            return self.values[row]
+        text = str(self.heap[self.values[row]:self.values[row + 1]], "utf-8")
+        return text if self.kind == STR else json.loads(text)
+
+    def decode_all(self) -> List[Any]:
+        """Decode every row at once.
+
+        Returns:
+            List[Any]: Values, None or _MISSING, one per row.
+        """
+        presence = self.presence.tolist()
+        if self.kind == INT or self.kind == FLOAT:
+            values = self.values.tolist()
+        else:
+            offsets, heap = self.values.tolist(), bytes(self.heap)
+            values = [heap[start:end].decode() for start, end in zip(offsets, offsets[1:])]
+            if self.kind == JSON:
+                values = [json.loads(text) if state == PRESENT else None
+                          for text, state in zip(values, presence)]
+        return [value if state == PRESENT else (None if state == NULL else _MISSING)
+                for value, state in zip(values, presence)]
+
+    def release(self) -> None:
+        """Release the views on the mapped file."""
+        self.presence.release()
+        self.values.release()
+        self.heap.release()
+
+
+class SnapshotTable:
+    """Records of one model in a snapshot, decoded only when asked for.
+
+    A record is looked up through the "id" column: by binary search when the
+    IDs are integers in increasing order, otherwise through an ID-to-row map
+    built on the first lookup. Each record can be taken out once; later
+    reads go to wherever the caller keeps it.
+
+    Attributes:
+        rows (int): Number of records in the snapshot.
+        remaining (int): Number of records not taken out yet.
+    """
+
+    def __init__(self, columns: List[_Column], rows: int, sorted_ids: bool = False) -> None:
+        """Wrap the columns of a section.
+
+        Args:
+            columns (List[_Column]): The columns.
+            rows (int): Number of records.
+            sorted_ids (bool, optional): Whether the IDs are integers in
+                increasing order. Defaults to False.
+        """
+        self._columns = columns
+        self.rows = rows
+        self.remaining = rows
+        self._taken = bytearray(rows)
+        self._ids = next((column for column in columns if column.name == "id"), None)
+        self._sorted = sorted_ids and self._ids is not None
+        self._positions: Optional[Dict[Any, int]] = None
+
+    def _row_of(self, obj_id: Any) -> Optional[int]:
+        """Find the row of a record.
+
+        Args:
+            obj_id (Any): ID of the record.
+
+        Returns:
+            Optional[int]: Row number, or None if the snapshot has no such record.
+        """
+        if self._ids is None:
+            return None
+        if self._sorted:
+            if not isinstance(obj_id, int):
+                return None
+            row = bisect_left(self._ids.values, obj_id)
+            return row if row < self.rows and self._ids.values[row] == obj_id else None
+        if self._positions is None:
+            self._positions = {obj_id: row for row, obj_id in enumerate(self._ids.decode_all())}
+        return self._positions.get(obj_id)
+
+    def last_id(self) -> Any:
+        """Get the largest integer ID in the snapshot.
+
+        Returns:
+            Any: The ID, or None if no record has an integer ID.
+        """
+        if self._sorted:
+            return self._ids.values[self.rows - 1] if self.rows else None
+        if self._ids is None:
+            return None
+        return max((obj_id for obj_id in self._ids.decode_all() if type(obj_id) is int), default=None)
+
+    def _record(self, row: int) -> Dict[str, Any]:
+        """Decode one record.
+
+        Args:
+            row (int): Row number.
+
+        Returns:
+            Dict[str, Any]: The record.
+        """
+        record = {}
+        for column in self._columns:
+            value = column.value(row)
+            if value is not _MISSING:
+                record[column.name] = value
+        return record
+
+    def take(self, obj_id: Any) -> Optional[Dict[str, Any]]:
+        """Decode a record and mark it as taken out.
+
+        Args:
+            obj_id (Any): ID of the record.
+
+        Returns:
+            Optional[Dict[str, Any]]: The record, or None if it is not in the
+                snapshot or was taken out before.
+        """
+        row = self._row_of(obj_id)
+        if row is None or self._taken[row]:
+            return None
+        self._taken[row] = 1
+        self.remaining -= 1
+        return self._record(row)
+
+    def take_all(self) -> Iterator[Tuple[Any, Optional[Dict[str, Any]]]]:
+        """Decode every record not taken out yet, column by column.
+
+        Yields:
+            Tuple[Any, Optional[Dict[str, Any]]]: ID and record of each row in
+                snapshot order; the record is None for rows taken out before.
+        """
+        if self._ids is None:
+            return
+        names = [column.name for column in self._columns]
+        columns = [column.decode_all() for column in self._columns]
+        id_index = names.index("id")
+        taken = self._taken
+        # Records with every field need no filtering of missing values
+        complete = all(ABSENT not in column.presence.tobytes() for column in self._columns)
+        for row, values in enumerate(zip(*columns)):
+            if taken[row]:
+                yield values[id_index], None
+            elif complete:
+                yield values[id_index], dict(zip(names, values))
+            else:
+                yield values[id_index], {name: value for name, value in zip(names, values)
+                                         if value is not _MISSING}
+        self.remaining = 0
+        self._taken = bytearray(b"\x01") * self.rows
+
+    def release(self) -> None:
+        """Release the views on the mapped file."""
+        for column in self._columns:
+            column.release()
+
+
+class SnapshotFile:
+    """Snapshot file mapped into memory.
+
+    Attributes:
+        lsn (int): Sequence number of the last log entry the snapshot includes.
+        tables (Dict[str, SnapshotTable]): Records of each model.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Map a snapshot file and read its table of contents.
+
+        Args:
+            path (str): Snapshot file path.
+
+        Raises:
+            ValueError: If the file is not a snapshot.
+        """
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        magic, self.lsn, count = _HEADER.unpack_from(self._view, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"'{path}' is not a database snapshot")
+        position = _HEADER.size
+        self.tables: Dict[str, SnapshotTable] = {}
+        for _ in range(count):
+            name, position = _read_name(self._view, position)
+            (offset,) = _OFFSET.unpack_from(self._view, position)
+            position += _OFFSET.size
+            self.tables[name] = self._read_table(offset)
+
+    def _read_table(self, position: int) -> SnapshotTable:
+        """Read the column directory of a section.
+
+        Args:
+            position (int): File offset of the section.
+
+        Returns:
+            SnapshotTable: The table, backed by views on the mapped file.
+        """
+        view = self._view
+        rows, count, flags = _SECTION.unpack_from(view, position)
+        position += _SECTION.size
+        columns = []
+        for _ in range(count):
+            name, position = _read_name(view, position)
+            kind, presence, values, heap, heap_size = _COLUMN.unpack_from(view, position)
+            position += _COLUMN.size
+            if kind == INT or kind == FLOAT:
+                value_view = view[values:values + 8 * rows].cast("q" if kind == INT else "d")
+            else:
+                value_view = view[values:values + 8 * (rows + 1)].cast("Q")
+            columns.append(_Column(name, kind, view[presence:presence + rows], value_view,
+                                   view[heap:heap + heap_size]))
+        return SnapshotTable(columns, rows, bool(flags & SORTED_IDS))
+
+    def close(self) -> None:
+        """Unmap the file; the tables cannot be read afterwards."""
+        for table in getattr(self, "tables", {}).values():
+            table.release()
+        self._view.release()
+        self._map.close()
+
+
+def open_snapshot(path: str) -> Optional[SnapshotFile]:
+    """Map a snapshot file if there is one.
+
+    Args:
+        path (str): Snapshot file path.
+
+    Returns:
+        Optional[SnapshotFile]: The snapshot, or None if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    return SnapshotFile(path)
+
+def write_snapshot(path: str, lsn: int, data: Dict[str, List[Dict[str, Any]]]) -> None:
+    """Write a snapshot atomically.
+
+    The snapshot is written to a temporary file that replaces the old one
+    only once it is on disk, so a crash leaves either snapshot intact.
+
+    Args:
+        path (str): Snapshot file path.
+        lsn (int): Sequence number of the last log entry the snapshot includes.
+        data (Dict[str, List[Dict[str, Any]]]): Records of each model, in insertion order.
+    """
+    names = [_encode_name(name) for name in data]
+    builders = [_encode_table(records) for records in data.values()]
+    position = _HEADER.size + sum(len(name) + _OFFSET.size for name in names)
+    header = [_HEADER.pack(MAGIC, lsn, len(names))]
+    body = []
+    for name, build in zip(names, builders):
+        position = _align(position)
+        section = build(position)
+        header.append(name + _OFFSET.pack(position))
+        body.append(section)
+        position += len(section)
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        written = 0
+        for chunk in header:
+            written += file.write(chunk)
+        for section in body:
+            padding = _align(written) - written
+            written += file.write(b"\0" * padding)
+            written += file.write(section)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    sync_directory(os.path.dirname(path) or ".")
+
+def _encode_table(records: List[Dict[str, Any]]) -> Callable[[int], bytes]:
+    """Turn the records of a model into columns.
+
+    Args:
+        records (List[Dict[str, Any]]): The records, in insertion order.
+
+    Returns:
+        Callable[[int], bytes]: Lays the section out at a given file offset
+            and returns its bytes.
+    """
+    names: Dict[str, None] = {}
+    for record in records:
+        names.update(dict.fromkeys(record))
+    rows = len(records)
+    flags = 0
+    columns = []
+    for name in names:
+        values = [record.get(name, _MISSING) for record in records]
+        if name == "id" and _column_kind(values) == INT and all(
+                type(value) is int for value in values) and all(map(int.__lt__, values, values[1:])):
+            flags |= SORTED_IDS
+        presence = bytes(ABSENT if value is _MISSING else NULL if value is None else PRESENT
+                         for value in values)
+        kind = _column_kind(values)
+        if kind == INT or kind == FLOAT:
+            data = array("q" if kind == INT else "d",
+                         (value if type(value) in (int, float) else 0 for value in values)).tobytes()
+            heap = b""
+        else:
+            offsets = array("Q", [0])
+            chunks = []
+            size = 0
+            for value in values:
+                if value is not _MISSING and value is not None:
+                    chunk = (value if kind == STR else json.dumps(value, separators=(",", ":"))).encode()
+                    chunks.append(chunk)
+                    size += len(chunk)
+                offsets.append(size)
+            data, heap = offsets.tobytes(), b"".join(chunks)
+        columns.append((_encode_name(name), kind, presence, data, heap))
+
+    def build(start: int) -> bytes:
+        directory_size = _SECTION.size + sum(len(name) + _COLUMN.size for name, *_ in columns)
+        position = _align(start + directory_size)
+        directory = [_SECTION.pack(rows, len(columns), flags)]
+        blobs = []
+        for name, kind, presence, data, heap in columns:
+            offsets = []
+            for blob in (presence, data, heap):
+                position = _align(position)
+                offsets.append(position)
+                blobs.append((position, blob))
+                position += len(blob)
+            directory.append(name + _COLUMN.pack(kind, *offsets, len(heap)))
+        section = bytearray(b"".join(directory))
+        for offset, blob in blobs:
+            section.extend(b"\0" * (offset - start - len(section)))
+            section.extend(blob)
+        return bytes(section)
+
+    return build
+
+def _column_kind(values: List[Any]) -> int:
+    """Pick the narrowest column type that keeps every value as it is.
+
+    Args:
+        values (List[Any]): Column values, with None and _MISSING allowed anywhere.
+
+    Returns:
+        int: INT, FLOAT, STR or JSON.
+    """
+    kinds = {type(value) for value in values if value is not _MISSING and value is not None}
+    if kinds == {int} and all(_INT64[0] <= value <= _INT64[1] for value in values if type(value) is int):
+        return INT
+    if kinds == {float}:
+        return FLOAT
+    if kinds == {str}:
+        return STR
+    return JSON
+
+def _encode_name(name: str) -> bytes:
+    encoded = name.encode()
+    return _NAME.pack(len(encoded)) + encoded
+
+def _read_name(view: memoryview, position: int) -> Tuple[str, int]:
+    (size,) = _NAME.unpack_from(view, position)
+    start = position + _NAME.size
+    return str(view[start:start + size], "utf-8"), start + size
+
+def _align(position: int) -> int:
+    """Round a file offset up to a multiple of 8."""
+    return (position + 7) & ~7
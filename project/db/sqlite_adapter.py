@@ -1,5 +1,17 @@
 import sqlite3
-from typing import Dict, Any, Optional, Union, List, Tuple
+import threading
+from contextlib import contextmanager
+from itertools import groupby
+from typing import Dict, Any, Callable, Optional, Union, List, Tuple, Iterator, Set
+from .pool import ConnectionPool
+from .query import check_cursor, check_identifier, compile_select, parse_conditions, parse_order
+from .schema import SCHEMAS, TableSchema
+
+# Keep IN (...) lists well below SQLite's host parameter limit
+MAX_QUERY_PARAMS = 500
+
+# Types of records a SqliteDatabase can return from reads
+ROW_FACTORIES = ("dict", "row", "model")
 
 class SqliteDatabase:
     """SQLite database adapter implementation.
@@ -7,49 +19,244 @@ class SqliteDatabase:
     This class provides methods to interact with SQLite database, handling CRUD
     operations and table creation for the application models.
     
+    Tables are created on first use from the schema of the model with the
+    same name (see db.schema), which also supplies the prepared statements.
+    
+    Connections come from a thread-safe pool and every call uses its own
+    cursor, so one instance can be shared by many threads. Connections run in
+    autocommit mode: a single statement is committed on its own, and several
+    statements can be grouped with transaction().
+    
+    Reads return records of the type chosen with row_factory:
+    
+    * "dict": a plain dict per row (the default).
+    * "row": sqlite3.Row objects, which index columns by name or position
+      without building a dict.
+    * "model": instances of the model that owns the table, built straight
+      from the row tuple; tables without a model fall back to dicts.
+    
+    create() and create_many() return the given data with its ID as dicts
+    whatever the row factory. sqlite3.Row objects and model instances can
+    be indexed by column name but are not dicts: a model's get() is the
+    class method, not dict.get(). The wrapping databases (CachedDatabase,
+    ReplicatedDatabase, WriteBehindDatabase, ShardedDatabase) therefore
+    only accept the "dict" row factory.
+    
+    The column layout of each table is read from the first query and then
+    reused, so rows are not matched against cursor.description each time.
+    
     Attributes:
         db_name (str): Name of the SQLite database file.
-        connection: SQLite connection object.
-        cursor: SQLite cursor object for executing queries.
+        pool (ConnectionPool): Pool of connections to the database.
+        row_factory (str): Type of the records returned by reads.
+        _local (threading.local): Connection and nesting depth of the
+            transaction open in the current thread, if any.
+        _tables (dict): Schemas of the tables known to exist, by table name.
+        _decoders (dict): Function turning a row tuple into a record, by table name.
     """
     
-    def __init__(self, db_name: str = "database.db") -> None:
-        """Initialize SQLite database connection.
+    def __init__(self, db_name: str = "database.db", pool_size: int = 5,
+                 timeout: float = 30.0, row_factory: str = "dict") -> None:
+        """Initialize SQLite database connection pool.
         
         Args:
             db_name (str, optional): Database file name. Defaults to "database.db".
+            pool_size (int, optional): Maximum number of open connections. Defaults to 5.
+            timeout (float, optional): Seconds to wait for a free connection or
+                a database lock. Defaults to 30.0.
+            row_factory (str, optional): "dict", "row" or "model". Defaults to "dict".
+            
+        Raises:
+            ValueError: If the row factory is unknown.
         """
+        if row_factory not in ROW_FACTORIES:
+            raise ValueError(f"Unknown row factory '{row_factory}', expected one of {list(ROW_FACTORIES)}")
         self.db_name = db_name
-        self.connection = sqlite3.connect(db_name)
-        self.cursor = self.connection.cursor()
-        
-        # hardcoded tables for demonstration purposes
-        self._create_table("user", {
-            "id": "INTEGER PRIMARY KEY AUTOINCREMENT",
-            "username": "TEXT",
-            "email": "TEXT",
-            "created_at": "TEXT"
-        })
-
-        self._create_table("product", {
-            "id": "INTEGER PRIMARY KEY AUTOINCREMENT",
-            "name": "TEXT",
-            "price": "REAL",
-            "description": "TEXT",
-            "quantity": "INTEGER"
-        })
-    
-    def _create_table(self, table_name: str, schema: Dict[str, str]) -> None:
-        """Create a table if it doesn't exist.
+        self.row_factory = row_factory
+        self.pool = ConnectionPool(db_name, size=pool_size, timeout=timeout)
+        self._local = threading.local()
+        self._indexes: Set[Tuple[str, str]] = set()
+        self._tables: Dict[str, TableSchema] = {}
+        self._decoders: Dict[str, Callable[[tuple], Any]] = {}
+
+    def _in_transaction(self) -> bool:
+        """Check whether the current thread has a transaction open."""
+        return getattr(self._local, "depth", 0) > 0
+
+    def _table(self, model_name: str) -> TableSchema:
+        """Get the schema of a table, creating the table on first use.
+        
+        Tables created inside a transaction are only remembered once they
+        are created again outside of one, since a rollback drops them.
         
         Args:
-            table_name (str): Name of the table to create.
-            schema (Dict[str, str]): Dictionary mapping column names to their SQL types.
+            model_name (str): Name of the table.
+            
+        Returns:
+            TableSchema: Schema of the model with that name.
+                
+        Raises:
+            ValueError: If no schema is registered for the table, e.g. because
+                its model was never imported.
+        """
+        schema = self._tables.get(model_name)
+        if schema is not None:
+            return schema
+        schema = SCHEMAS.get(model_name)
+        if schema is None:
+            raise ValueError(f"No schema registered for table '{model_name}': import its model, "
+                             f"or register one with db.schema.register_schema()")
+        with self._connection() as connection:
+            connection.execute(schema.create_sql)
+            for column in schema.indexes:
+                connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{schema.table}_{column} ON {schema.table} ({column})"
+                )
+        if not self._in_transaction():
+            self._indexes.update((model_name, column) for column in schema.indexes)
+            self._tables[model_name] = schema
+        return schema
+
+    def _decoder(self, table: str, cursor: sqlite3.Cursor) -> Callable[[tuple], Any]:
+        """Get the function turning rows of SELECT * on a table into records.
+        
+        Args:
+            table (str): Name of the table.
+            cursor (sqlite3.Cursor): Cursor of a query on the table, used to
+                learn its columns the first time.
+            
+        Returns:
+            Callable[[tuple], Any]: Row decoder for the configured row factory.
         """
-        columns = ", ".join([f"{col} {dtype}" for col, dtype in schema.items()])
-        query = f"CREATE TABLE IF NOT EXISTS {table_name} ({columns})"
-        self.cursor.execute(query)
-        self.connection.commit()    
+        decoder = self._decoders.get(table)
+        if decoder is not None:
+            return decoder
+        columns = tuple(description[0] for description in cursor.description)
+        schema = SCHEMAS.get(table)
+        model = schema.model if schema is not None and self.row_factory == "model" else None
+        if model is None:
+            decoder = lambda row: dict(zip(columns, row))
+        elif columns == model.__fields__:
+            decoder = model._make
+        else:
+            # Table created with another column order, e.g. by an older version
+            decoder = lambda row: model.from_row(dict(zip(columns, row)))
+        self._decoders[table] = decoder
+        return decoder
+
+    def _fetch(self, table: str, cursor: sqlite3.Cursor, size: Optional[int] = None) -> List[Any]:
+        """Fetch the rows of SELECT * on a table as records.
+        
+        Args:
+            table (str): Name of the table.
+            cursor (sqlite3.Cursor): Cursor of the executed query.
+            size (int, optional): Maximum number of rows. Defaults to all rows.
+            
+        Returns:
+            List[Any]: Records of the type chosen with row_factory.
+        """
+        if self.row_factory == "row":
+            cursor.row_factory = sqlite3.Row
+            return cursor.fetchall() if size is None else cursor.fetchmany(size)
+        rows = cursor.fetchall() if size is None else cursor.fetchmany(size)
+        if not rows:
+            return rows
+        return list(map(self._decoder(table, cursor), rows))
+
+    def create_index(self, model_name: str, field: str, kind: str = "hash") -> None:
+        """Create an index on a column if it doesn't exist.
+        
+        SQLite indexes are B-trees, which serve both equality and range
+        lookups, so the index kind is accepted for compatibility and ignored.
+        
+        Args:
+            model_name (str): Name of the table.
+            field (str): Name of the column to index.
+            kind (str, optional): Ignored. Defaults to "hash".
+        """
+        if (model_name, field) in self._indexes:
+            return
+        table, column = self._table(model_name).table, check_identifier(field)
+        with self._connection() as connection:
+            connection.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column})")
+        if not self._in_transaction():
+            self._indexes.add((model_name, field))
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Get the connection to use for the current call.
+        
+        Inside a transaction this is the connection that holds the
+        transaction; otherwise a connection is borrowed from the pool.
+        
+        Yields:
+            sqlite3.Connection: Connection owned by the current thread.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            yield connection
+        else:
+            with self.pool.connection() as connection:
+                yield connection
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        self.pool.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator['SqliteDatabase']:
+        """Group several operations into one transaction.
+        
+        The outermost block commits once when it exits and rolls back if an
+        exception escapes it. Nested blocks use savepoints, so an exception in
+        an inner block only undoes the work of that block. If the commit fails,
+        the connection is rolled back before it goes back to the pool.
+        
+        Yields:
+            SqliteDatabase: This database instance.
+            
+        Raises:
+            Exception: Any exception raised inside the block, after rollback,
+                even if the rollback itself failed.
+        """
+        local = self._local
+        depth = getattr(local, "depth", 0)
+        savepoint = f"sp_{depth}"
+        if depth == 0:
+            local.connection = self.pool.acquire()
+            try:
+                # Take the write lock up front so concurrent transactions
+                # wait on busy_timeout instead of failing on lock upgrade
+                local.connection.execute("BEGIN IMMEDIATE")
+            except BaseException:
+                self.pool.release(local.connection)
+                local.connection = None
+                raise
+        else:
+            local.connection.execute(f"SAVEPOINT {savepoint}")
+        local.depth = depth + 1
+        connection = local.connection
+        try:
+            yield self
+        except BaseException:
+            try:
+                if depth == 0:
+                    connection.execute("ROLLBACK")
+                else:
+                    connection.execute(f"ROLLBACK TO {savepoint}")
+                    connection.execute(f"RELEASE {savepoint}")
+            except sqlite3.Error as e:
+                # E.g. SQLite already rolled back on its own: the block's
+                # exception is the one to report
+                print(f"Error rolling back transaction: {str(e)}")
+            raise
+        else:
+            connection.execute("COMMIT" if depth == 0 else f"RELEASE {savepoint}")
+        finally:
+            local.depth = depth
+            if depth == 0:
+                local.connection = None
+                self.pool.release(connection)
 
     def create(self, model_name: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Insert a new record into the specified table.
@@ -66,14 +273,12 @@ class SqliteDatabase:
             sqlite3.Error: If there's an issue with the SQL operation.
         """
         try:
-            columns = ', '.join(data.keys())
-            placeholders = ', '.join(['?'] * len(data))
-            sql = f'INSERT INTO {model_name} ({columns}) VALUES ({placeholders})'
-            self.cursor.execute(sql, tuple(data.values()))
-            self.connection.commit()
+            sql = self._table(model_name).insert_sql(tuple(data))
+            with self._connection() as connection:
+                cursor = connection.execute(sql, tuple(data.values()))
             
             # Get the ID of the inserted row
-            last_id = self.cursor.lastrowid
+            last_id = cursor.lastrowid
             data['id'] = last_id
             return data
         except sqlite3.Error as e:
@@ -95,15 +300,12 @@ class SqliteDatabase:
             sqlite3.Error: If there's an issue with the SQL operation.
         """
         try:
-            sql = f'SELECT * FROM {model_name} WHERE id=?'
-            self.cursor.execute(sql, (int(obj_id),))
-            row = self.cursor.fetchone()
-            
-            if row:
-                # Convert row to dictionary
-                columns = [description[0] for description in self.cursor.description]
-                return dict(zip(columns, row))
-            return None
+            schema = self._table(model_name)
+            with self._connection() as connection:
+                cursor = connection.execute(schema.select_sql, (int(obj_id),))
+                rows = self._fetch(schema.table, cursor, 1)
+            
+            return rows[0] if rows else None
         except sqlite3.Error as e:
             print(f"Error retrieving record: {str(e)}")
             return None
@@ -125,12 +327,11 @@ class SqliteDatabase:
             sqlite3.Error: If there's an issue with the SQL operation.
         """
         try:
-            set_clause = ', '.join([f'{k}=?' for k in data.keys()])
-            sql = f'UPDATE {model_name} SET {set_clause} WHERE id=?'
-            self.cursor.execute(sql, (*data.values(), int(obj_id)))
-            self.connection.commit()
+            sql = self._table(model_name).update_sql(tuple(data))
+            with self._connection() as connection:
+                cursor = connection.execute(sql, (*data.values(), int(obj_id)))
             
-            if self.cursor.rowcount > 0:
+            if cursor.rowcount > 0:
                 # Return updated record
                 return self.get(model_name, obj_id)
             return None
@@ -158,13 +359,223 @@ class SqliteDatabase:
             if not record:
                 return None
                 
-            sql = f'DELETE FROM {model_name} WHERE id=?'
-            self.cursor.execute(sql, (int(obj_id),))
-            self.connection.commit()
+            sql = self._table(model_name).delete_sql
+            with self._connection() as connection:
+                cursor = connection.execute(sql, (int(obj_id),))
             
-            if self.cursor.rowcount > 0:
+            if cursor.rowcount > 0:
                 return record
             return None
         except sqlite3.Error as e:
             print(f"Error deleting record: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+
+    def create_many(self, model_name: str,
+                    records: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """Insert several records in a single transaction.
+        
+        Consecutive records with the same set of columns are inserted with one
+        executemany() call, and the whole batch is committed once.
+        
+        Args:
+            model_name (str): Name of the table to insert into.
+            records (List[Dict[str, Any]]): Column names and values for each record.
+            
+        Returns:
+            Optional[List[Dict[str, Any]]]: The created records including their IDs,
+                or None if the operation failed (nothing is inserted in that case).
+        """
+        created: List[Dict[str, Any]] = []
+        try:
+            with self.transaction(), self._connection() as connection:
+                schema = self._table(model_name)
+                for columns, group in groupby(records, key=lambda record: tuple(record.keys())):
+                    rows = [dict(record) for record in group]
+                    connection.executemany(schema.insert_sql(columns), [tuple(row.values()) for row in rows])
+
+                    if 'id' not in columns:
+                        # Rows inserted in one transaction get consecutive IDs
+                        last_id = connection.execute('SELECT last_insert_rowid()').fetchone()[0]
+                        first_id = last_id - len(rows) + 1
+                        for offset, row in enumerate(rows):
+                            row['id'] = first_id + offset
+                    created.extend(rows)
+            return created
+        except sqlite3.Error as e:
+            print(f"Error: Your input data is not valid for {model_name} model. {str(e)}")
+            return None
+
+    def get_many(self, model_name: str,
+                 obj_ids: List[Union[int, str]]) -> List[Dict[str, Any]]:
+        """Retrieve several records by ID.
+        
+        Args:
+            model_name (str): Name of the table to query.
+            obj_ids (List[Union[int, str]]): IDs of the records to retrieve.
+            
+        Returns:
+            List[Dict[str, Any]]: The records that were found, in the order of
+                the requested IDs. Missing IDs are skipped.
+        """
+        ids = [int(obj_id) for obj_id in obj_ids]
+        found: Dict[int, Dict[str, Any]] = {}
+        try:
+            table = self._table(model_name).table
+            with self._connection() as connection:
+                for start in range(0, len(ids), MAX_QUERY_PARAMS):
+                    chunk = ids[start:start + MAX_QUERY_PARAMS]
+                    placeholders = ', '.join(['?'] * len(chunk))
+                    sql = f'SELECT * FROM {table} WHERE id IN ({placeholders})'
+                    cursor = connection.execute(sql, chunk)
+                    for record in self._fetch(table, cursor):
+                        found[record['id']] = record
+        except sqlite3.Error as e:
+            print(f"Error retrieving records: {str(e)}")
+            return []
+        return [found[obj_id] for obj_id in ids if obj_id in found]
+
+    def update_many(self, model_name: str,
+                    updates: Dict[Union[int, str], Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """Update several records in a single transaction.
+        
+        Args:
+            model_name (str): Name of the table to update.
+            updates (Dict[Union[int, str], Dict[str, Any]]): Mapping of record ID
+                to the column names and values to update.
+                
+        Returns:
+            Optional[List[Dict[str, Any]]]: The records that were found and updated,
+                or None if the operation failed (nothing is updated in that case).
+        """
+        items = [(int(obj_id), data) for obj_id, data in updates.items()]
+        try:
+            with self.transaction(), self._connection() as connection:
+                schema = self._table(model_name)
+                for columns, group in groupby(items, key=lambda item: tuple(item[1].keys())):
+                    connection.executemany(schema.update_sql(columns),
+                                           [(*data.values(), obj_id) for obj_id, data in group])
+        except sqlite3.Error as e:
+            print(f"Error: Your input data is not valid for {model_name} model. {str(e)}")
+            return None
+        return self.get_many(model_name, [obj_id for obj_id, _ in items])
+
+    def delete_many(self, model_name: str,
+                    obj_ids: List[Union[int, str]]) -> Optional[List[Dict[str, Any]]]:
+        """Delete several records in a single transaction.
+        
+        Args:
+            model_name (str): Name of the table to delete from.
+            obj_ids (List[Union[int, str]]): IDs of the records to delete.
+            
+        Returns:
+            Optional[List[Dict[str, Any]]]: The records that were found and deleted,
+                or None if the operation failed (nothing is deleted in that case).
+        """
+        records = self.get_many(model_name, obj_ids)
+        try:
+            with self.transaction(), self._connection() as connection:
+                connection.executemany(self._table(model_name).delete_sql, [(record['id'],) for record in records])
+        except sqlite3.Error as e:
+            print(f"Error deleting records: {str(e)}")
+            return None
+        return records
+
+    def find(self, model_name: str, where: Dict[str, Any],
+             order_by: Optional[Union[str, List[str]]] = None, limit: Optional[int] = None,
+             offset: Optional[int] = None, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Find the records matching some conditions.
+        
+        The query is compiled to one parameterized SELECT, so filtering,
+        sorting and paging run inside SQLite and can use its indexes.
+        
+        Args:
+            model_name (str): Name of the table to query.
+            where (Dict[str, Any]): Conditions every returned record must meet,
+                e.g. ``{"email": "a@example.com", "id__gt": 10}``.
+            order_by (Union[str, List[str]], optional): Column(s) to sort by; a
+                leading "-" sorts descending.
+            limit (int, optional): Maximum number of records to return.
+            offset (int, optional): Number of matching records to skip.
+            fields (List[str], optional): Columns to return. Defaults to all columns.
+            
+        Returns:
+            List[Dict[str, Any]]: The matching records, or an empty list if an
+                error occurred.
+                
+        Raises:
+            ValueError: If a condition uses an unsupported operator or a field
+                name is not a plain identifier.
+        """
+        sql, params = compile_select(model_name, parse_conditions(where), parse_order(order_by),
+                                     limit, offset, fields)
+        try:
+            table = self._table(model_name).table
+            with self._connection() as connection:
+                cursor = connection.execute(sql, params)
+                if not fields:
+                    return self._fetch(table, cursor)
+                columns = [description[0] for description in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"Error retrieving records: {str(e)}")
+            return []
+
+    def iter_records(self, model_name: str, batch_size: int = 500,
+                     after: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Stream the records of a table in ID order.
+        
+        Rows are read in batches with keyset pagination (``WHERE id > ?``),
+        so at most one batch is in memory and no connection is held between
+        batches; the caller may use the database while iterating.
+        
+        Args:
+            model_name (str): Name of the table to read.
+            batch_size (int, optional): Number of rows read per query. Defaults to 500.
+            after (int, optional): ID to resume after. Defaults to the start.
+            
+        Yields:
+            Dict[str, Any]: Each record.
+        """
+        while True:
+            records, after = self.page(model_name, batch_size, after)
+            yield from records
+            if after is None:
+                return
+
+    def page(self, model_name: str, limit: int = 50,
+             after: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Get one page of records in ID order.
+        
+        The ID of the last record is the cursor of the next page. Seeking to
+        it uses the primary key, so deep pages cost the same as the first page.
+        
+        Args:
+            model_name (str): Name of the table to read.
+            limit (int, optional): Maximum number of records. Defaults to 50.
+            after (int, optional): Cursor of the previous page. Defaults to the start.
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[int]]: The records and the cursor
+                of the next page, or None if there are no more records.
+        
+        Raises:
+            ValueError: If the cursor is not an int.
+        """
+        check_cursor(after, int)
+        table = self._table(model_name).table
+        # Read one extra row to know whether another page follows
+        if after is None:
+            sql, params = f'SELECT * FROM {table} ORDER BY id LIMIT ?', (limit + 1,)
+        else:
+            sql, params = f'SELECT * FROM {table} WHERE id > ? ORDER BY id LIMIT ?', (int(after), limit + 1)
+        try:
+            with self._connection() as connection:
+                cursor = connection.execute(sql, params)
+                records = self._fetch(table, cursor, limit + 1)
+        except sqlite3.Error as e:
+            print(f"Error retrieving records: {str(e)}")
+            return [], None
+        if len(records) > limit:
+            del records[limit:]
+            return records, records[-1]['id']
+        return records, None
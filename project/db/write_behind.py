@@ -0,0 +1,584 @@
+import atexit
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from itertools import groupby
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from .base import require_dict_records
+from .ids import IdAllocator, SequenceAllocator
+
+# A buffered write: (sequence, "create" / "update" / "delete", model, id, data)
+Write = Tuple[int, str, str, Any, Optional[Dict[str, Any]]]
+
+class BackpressureTimeout(RuntimeError):
+    """Raised when the write buffer stays full for longer than the timeout."""
+
+
+class WriteBehindDatabase:
+    """Buffers writes in memory and flushes them to another database in batches.
+
+    create(), update() and delete() return as soon as the write is queued; a
+    background thread applies queued writes in one transaction per batch,
+    once max_batch writes are waiting or the oldest has waited
+    flush_interval seconds. New records get their ID when they are queued,
+    continuing after the highest ID already stored.
+
+    Reads of single records see queued writes. Queries over many records
+    (find, page, iter_records) flush the buffer first.
+
+    The buffer holds at most max_pending writes; further writers wait for a
+    flush, and give up with BackpressureTimeout after put_timeout seconds.
+    close(), also run when the interpreter exits, flushes what is left.
+
+    If a batch fails, it is rolled back and its groups of writes (a single
+    write, or the writes of one transaction or *_many call) are retried one
+    at a time, so only the groups that fail on their own are lost. Lost
+    writes are counted in lost, kept in failed and passed to on_error: their
+    callers were already told they succeeded, so this is the only place the
+    loss shows up.
+
+    Usage:
+        DatabaseRegistry.register("ingest", WriteBehindDatabase(sqlite_db, max_batch=1000))
+
+    Attributes:
+        backend (Any): The database written to.
+        max_batch (int): Writes applied per transaction.
+        flush_interval (float): Longest time a write waits in the buffer.
+        max_pending (int): Most writes the buffer holds.
+        put_timeout (float, optional): Seconds a writer waits for room, or
+            None to wait as long as it takes.
+        flushed (int): Writes applied so far.
+        batches (int): Batches applied so far.
+        errors (int): Groups of writes that failed and were dropped.
+        lost (int): Writes dropped because their group failed.
+        failed (Deque[Tuple[List[Write], Exception]]): The latest dropped
+            groups, with the error each raised.
+    """
+
+    def __init__(self, backend: Any, max_batch: int = 500, flush_interval: float = 0.05,
+                 max_pending: int = 10000, put_timeout: Optional[float] = 10.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 on_error: Optional[Callable[[List[Write], Exception], None]] = None) -> None:
+        """Start buffering writes for a database.
+
+        Args:
+            backend (Any): Database to write to.
+            max_batch (int, optional): Writes per batch. Defaults to 500.
+            flush_interval (float, optional): Seconds before a partial batch
+                is flushed. Defaults to 0.05.
+            max_pending (int, optional): Buffer size. Defaults to 10000.
+            put_timeout (float, optional): Seconds a writer waits for room in
+                a full buffer. Defaults to 10.0.
+            clock (Callable[[], float], optional): Time source. Defaults to
+                time.monotonic.
+            on_error (Callable[[List[Write], Exception], None], optional):
+                Called from the flusher thread with each group of writes that
+                could not be stored and the error. Defaults to printing it.
+
+        Raises:
+            ValueError: If max_batch or max_pending is less than 1, or the
+                database does not return dict records.
+        """
+        if max_batch < 1 or max_pending < 1:
+            raise ValueError("max_batch and max_pending must be at least 1")
+        require_dict_records(backend, "WriteBehindDatabase")
+        self.backend = backend
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.put_timeout = put_timeout
+        self._clock = clock
+        self._on_error = on_error
+        self._cond = threading.Condition()
+        # Groups of writes to apply together, with the time they were queued
+        self._queue: Deque[Tuple[float, List[Write]]] = deque()
+        self._pending = 0
+        self._seq = 0
+        self._flushed_seq = 0
+        # Latest queued version of each record: (sequence, record or None if deleted)
+        self._overlay: Dict[Tuple[str, Any], Tuple[int, Optional[Dict[str, Any]]]] = {}
+        self._allocators: Dict[str, IdAllocator] = {}
+        self._flush_lock = threading.Lock()
+        self._transaction: contextvars.ContextVar[Optional[Tuple[List[Write], Dict[Tuple[str, Any], Optional[Dict[str, Any]]]]]] = \
+            contextvars.ContextVar(f"write_behind_{id(self)}", default=None)
+        self._closed = False
+        self._flush_requested = False
+        self.flushed = 0
+        self.batches = 0
+        self.errors = 0
+        self.lost = 0
+        self.failed: Deque[Tuple[List[Write], Exception]] = deque(maxlen=100)
+        self._flusher = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.backend, name)
+
+    # --- Buffer ---
+
+    def _allocator(self, model_name: str) -> IdAllocator:
+        """Get the ID sequence of a model, starting after the highest stored ID.
+
+        Args:
+            model_name (str): The model/collection name.
+
+        Returns:
+            IdAllocator: The allocator.
+        """
+        allocator = self._allocators.get(model_name)
+        if allocator is None:
+            with self._cond:
+                allocator = self._allocators.get(model_name)
+                if allocator is None:
+                    allocator = SequenceAllocator()
+                    last = self.backend.find(model_name, {}, order_by="-id", limit=1)
+                    if last:
+                        allocator.observe(allocator.key(last[0]["id"]))
+                    self._allocators[model_name] = allocator
+        return allocator
+
+    def _enqueue(self, writes: List[Tuple[str, str, Any, Optional[Dict[str, Any]]]],
+                 versions: Dict[Tuple[str, Any], Optional[Dict[str, Any]]]) -> None:
+        """Queue writes to be applied together, waiting for room if needed.
+
+        Args:
+            writes (List[Tuple[str, str, Any, Optional[Dict[str, Any]]]]):
+                Kind, model, ID and data of each write.
+            versions (Dict[Tuple[str, Any], Optional[Dict[str, Any]]]): New
+                version of each written record, None for deleted ones.
+
+        Raises:
+            BackpressureTimeout: If the buffer stays full for put_timeout seconds.
+            RuntimeError: If the database was closed.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Write-behind database is closed")
+            if self._pending + len(writes) > self.max_pending and self._pending:
+                self._flush_requested = True
+                self._cond.notify_all()
+                if not self._cond.wait_for(
+                        lambda: self._pending + len(writes) <= self.max_pending or not self._pending,
+                        self.put_timeout):
+                    raise BackpressureTimeout(
+                        f"Write buffer stayed full for {self.put_timeout} seconds")
+            group = []
+            for kind, model_name, obj_id, data in writes:
+                self._seq += 1
+                group.append((self._seq, kind, model_name, obj_id, data))
+            for key, record in versions.items():
+                self._overlay[key] = (self._seq, record)
+            self._queue.append((self._clock(), group))
+            self._pending += len(group)
+            if self._pending >= self.max_batch:
+                self._cond.notify_all()
+            elif len(self._queue) == 1:
+                self._cond.notify_all()
+
+    def _write(self, kind: str, model_name: str, obj_id: Any,
+               data: Optional[Dict[str, Any]], record: Optional[Dict[str, Any]]) -> None:
+        """Queue one write, or keep it for the current transaction.
+
+        Args:
+            kind (str): "create", "update" or "delete".
+            model_name (str): The model/collection name.
+            obj_id (Any): ID of the record.
+            data (Dict[str, Any], optional): Data of the write.
+            record (Dict[str, Any], optional): Record after the write, None if deleted.
+        """
+        transaction = self._transaction.get()
+        if transaction is not None:
+            transaction[0].append((0, kind, model_name, obj_id, data))
+            transaction[1][(model_name, obj_id)] = record
+        else:
+            self._enqueue([(kind, model_name, obj_id, data)], {(model_name, obj_id): record})
+
+    def _run(self) -> None:
+        """Flush batches in the background until closed."""
+        while True:
+            with self._cond:
+                while not self._due():
+                    if self._closed and not self._queue:
+                        return
+                    timeout = None
+                    if self._queue:
+                        timeout = max(0.0, self._queue[0][0] + self.flush_interval - self._clock())
+                    self._cond.wait(timeout)
+            self._flush_batch()
+
+    def _due(self) -> bool:
+        """Check whether a batch should be flushed now; the lock must be held."""
+        if not self._queue:
+            return False
+        return (self._closed or self._flush_requested or self._pending >= self.max_batch
+                or self._clock() - self._queue[0][0] >= self.flush_interval)
+
+    def _apply_groups(self, groups: List[List[Write]]) -> None:
+        """Apply groups of writes in one backend transaction.
+
+        Args:
+            groups (List[List[Write]]): The groups, in queue order.
+
+        Raises:
+            Exception: Whatever the backend raised; the transaction is rolled back.
+        """
+        with self.backend.transaction():
+            for (kind, model_name), run in groupby([write for group in groups for write in group],
+                                                   key=lambda write: (write[1], write[2])):
+                _apply(self.backend, kind, model_name, list(run))
+
+    def _flush_batch(self) -> None:
+        """Apply the oldest queued writes, up to max_batch, in one transaction."""
+        with self._flush_lock:
+            with self._cond:
+                groups: List[List[Write]] = []
+                size = 0
+                while self._queue and (not groups or size + len(self._queue[0][1]) <= self.max_batch):
+                    groups.append(self._queue.popleft()[1])
+                    size += len(groups[-1])
+                if not self._queue:
+                    self._flush_requested = False
+            if not groups:
+                return
+            failures: List[Tuple[List[Write], Exception]] = []
+            try:
+                self._apply_groups(groups)
+            except Exception:
+                # Find the groups at fault, so the others are still stored
+                for group in groups:
+                    try:
+                        self._apply_groups([group])
+                    except Exception as e:
+                        failures.append((group, e))
+            lost = sum(len(group) for group, _ in failures)
+            last = groups[-1][-1][0]
+            with self._cond:
+                self._flushed_seq = last
+                self._pending -= size
+                self.flushed += size - lost
+                self.batches += 1
+                self.errors += len(failures)
+                self.lost += lost
+                self.failed.extend(failures)
+                for key in {(write[2], write[3]) for group in groups for write in group}:
+                    entry = self._overlay.get(key)
+                    if entry is not None and entry[0] <= last:
+                        del self._overlay[key]
+                self._cond.notify_all()
+            for group, error in failures:
+                if self._on_error is not None:
+                    self._on_error(group, error)
+                else:
+                    print(f"Error flushing {len(group)} buffered writes, dropped: {str(error)}")
+
+    def flush(self) -> None:
+        """Apply every write queued so far before returning."""
+        with self._cond:
+            target = self._seq
+        while True:
+            with self._cond:
+                if self._flushed_seq >= target or not self._queue:
+                    return
+            self._flush_batch()
+
+    def close(self) -> None:
+        """Flush the remaining writes and stop the background thread."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+        self.flush()
+        atexit.unregister(self.close)
+
+    # --- Reads ---
+
+    def _lookup(self, model_name: str, obj_id: Any) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """Find the queued version of a record.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Any): ID of the record, as stored.
+
+        Returns:
+            Tuple[bool, Optional[Dict[str, Any]]]: Whether a write is queued,
+                and the record after it (None if deleted).
+        """
+        key = (model_name, obj_id)
+        transaction = self._transaction.get()
+        if transaction is not None and key in transaction[1]:
+            return True, transaction[1][key]
+        entry = self._overlay.get(key)
+        if entry is not None:
+            return True, entry[1]
+        return False, None
+
+    def get(self, model_name: str, obj_id: Union[str, int]) -> Optional[Dict[str, Any]]:
+        """Get a record, including writes still in the buffer.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Union[str, int]): ID of the record to retrieve.
+
+        Returns:
+            Optional[Dict[str, Any]]: The record if found, None otherwise.
+        """
+        obj_id = self._allocator(model_name).key(obj_id)
+        queued, record = self._lookup(model_name, obj_id)
+        if queued:
+            return None if record is None else dict(record)
+        return self.backend.get(model_name, obj_id)
+
+    def get_many(self, model_name: str, obj_ids: List[Union[str, int]]) -> List[Dict[str, Any]]:
+        """Get several records, including writes still in the buffer.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_ids (List[Union[str, int]]): IDs of the records to retrieve.
+
+        Returns:
+            List[Dict[str, Any]]: The records that were found, in the order of the requested IDs.
+        """
+        return [record for record in (self.get(model_name, obj_id) for obj_id in obj_ids)
+                if record is not None]
+
+    def find(self, model_name: str, where: Dict[str, Any],
+             order_by: Optional[Union[str, List[str]]] = None, limit: Optional[int] = None,
+             offset: Optional[int] = None, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Flush the buffer, then find the matching records.
+
+        Args:
+            model_name (str): The model/collection name.
+            where (Dict[str, Any]): Conditions, as for the wrapped database.
+            order_by (Union[str, List[str]], optional): Field(s) to sort by.
+            limit (int, optional): Maximum number of records.
+            offset (int, optional): Number of records to skip.
+            fields (List[str], optional): Fields to return. Defaults to whole records.
+
+        Returns:
+            List[Dict[str, Any]]: The matching records.
+        """
+        self.flush()
+        return self.backend.find(model_name, where, order_by=order_by, limit=limit,
+                                 offset=offset, fields=fields)
+
+    def page(self, model_name: str, limit: int = 50,
+             after: Optional[Any] = None) -> Tuple[List[Dict[str, Any]], Optional[Any]]:
+        """Flush the buffer, then get one page of records.
+
+        Args:
+            model_name (str): The model/collection name.
+            limit (int, optional): Maximum number of records. Defaults to 50.
+            after (Any, optional): Cursor of the previous page. Defaults to the start.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[Any]]: The records and the cursor
+                of the next page, or None if there are no more records.
+        """
+        self.flush()
+        return self.backend.page(model_name, limit, after)
+
+    def iter_records(self, model_name: str, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Flush the buffer, then walk the records of a model.
+
+        Args:
+            model_name (str): The model/collection name.
+            batch_size (int, optional): Records read at a time. Defaults to 500.
+
+        Yields:
+            Dict[str, Any]: Each record.
+        """
+        self.flush()
+        yield from self.backend.iter_records(model_name, batch_size)
+
+    # --- Writes ---
+
+    def create(self, model_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a new record.
+
+        Args:
+            model_name (str): The model/collection name.
+            data (Dict[str, Any]): Data to store.
+
+        Returns:
+            Dict[str, Any]: The record with its ID, as it will be stored.
+
+        Raises:
+            BackpressureTimeout: If the buffer stays full for put_timeout seconds.
+        """
+        allocator = self._allocator(model_name)
+        record = dict(data)
+        if record.get("id") is None:
+            record["id"] = allocator.next()
+        else:
+            record["id"] = allocator.key(record["id"])
+            allocator.observe(record["id"])
+        self._write("create", model_name, record["id"], record, record)
+        return dict(record)
+
+    def update(self, model_name: str, obj_id: Union[str, int],
+               data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Queue changes to a record.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Union[str, int]): ID of the record to update.
+            data (Dict[str, Any]): New data to apply to the record.
+
+        Returns:
+            Optional[Dict[str, Any]]: The record as it will be after the
+                update, or None if it does not exist.
+
+        Raises:
+            BackpressureTimeout: If the buffer stays full for put_timeout seconds.
+        """
+        obj_id = self._allocator(model_name).key(obj_id)
+        current = self.get(model_name, obj_id)
+        if current is None:
+            return None
+        record = {**current, **data, "id": obj_id}
+        self._write("update", model_name, obj_id, dict(data), record)
+        return dict(record)
+
+    def delete(self, model_name: str, obj_id: Union[str, int]) -> Optional[Dict[str, Any]]:
+        """Queue the deletion of a record.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_id (Union[str, int]): ID of the record to delete.
+
+        Returns:
+            Optional[Dict[str, Any]]: The record, or None if it does not exist.
+
+        Raises:
+            BackpressureTimeout: If the buffer stays full for put_timeout seconds.
+        """
+        obj_id = self._allocator(model_name).key(obj_id)
+        current = self.get(model_name, obj_id)
+        if current is None:
+            return None
+        self._write("delete", model_name, obj_id, None, None)
+        return current
+
+    def create_many(self, model_name: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Queue several new records, to be stored together.
+
+        Args:
+            model_name (str): The model/collection name.
+            records (List[Dict[str, Any]]): Data for each record to store.
+
+        Returns:
+            List[Dict[str, Any]]: The records with their IDs.
+        """
+        with self.transaction():
+            return [self.create(model_name, data) for data in records]
+
+    def update_many(self, model_name: str,
+                    updates: Dict[Union[str, int], Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Queue changes to several records, to be applied together.
+
+        Args:
+            model_name (str): The model/collection name.
+            updates (Dict[Union[str, int], Dict[str, Any]]): Mapping of record
+                ID to the data to apply to that record.
+
+        Returns:
+            List[Dict[str, Any]]: The records that exist, as they will be after the update.
+        """
+        with self.transaction():
+            updated = [self.update(model_name, obj_id, data) for obj_id, data in updates.items()]
+        return [record for record in updated if record is not None]
+
+    def delete_many(self, model_name: str, obj_ids: List[Union[str, int]]) -> List[Dict[str, Any]]:
+        """Queue the deletion of several records, to be applied together.
+
+        Args:
+            model_name (str): The model/collection name.
+            obj_ids (List[Union[str, int]]): IDs of the records to delete.
+
+        Returns:
+            List[Dict[str, Any]]: The records that existed.
+        """
+        with self.transaction():
+            deleted = [self.delete(model_name, obj_id) for obj_id in obj_ids]
+        return [record for record in deleted if record is not None]
+
+    @contextmanager
+    def transaction(self) -> Iterator['WriteBehindDatabase']:
+        """Queue the writes of a block as one group, or none of them on failure.
+
+        The group is applied in a single batch transaction. Reads inside the
+        block see its writes. A nested block that fails drops only its own
+        writes.
+
+        Yields:
+            WriteBehindDatabase: This database.
+        """
+        outer = self._transaction.get()
+        if outer is not None:
+            # Savepoint: drop this level's writes if it fails
+            writes, versions = outer
+            mark, saved = len(writes), dict(versions)
+            try:
+                yield self
+            except BaseException:
+                del writes[mark:]
+                versions.clear()
+                versions.update(saved)
+                raise
+            return
+        writes: List[Write] = []
+        versions: Dict[Tuple[str, Any], Optional[Dict[str, Any]]] = {}
+        token = self._transaction.set((writes, versions))
+        try:
+            yield self
+        finally:
+            self._transaction.reset(token)
+        if writes:
+            self._enqueue([write[1:] for write in writes], versions)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the buffer counters.
+
+        Returns:
+            Dict[str, Any]: Queued, flushed, failed and lost counts.
+        """
+        with self._cond:
+            return {
+                "pending": self._pending,
+                "flushed": self.flushed,
+                "batches": self.batches,
+                "errors": self.errors,
+                "lost": self.lost,
+                "capacity": self.max_pending,
+            }
+
+
+def _apply(backend: Any, kind: str, model_name: str, writes: List[Write]) -> None:
+    """Apply consecutive writes of one kind to one model.
+
+    Args:
+        backend (Any): The database written to.
+        kind (str): "create", "update" or "delete".
+        model_name (str): The model/collection name.
+        writes (List[Write]): The writes.
+
+    Raises:
+        RuntimeError: If the database rejected the writes.
+    """
+    if kind == "create":
+        result = backend.create_many(model_name, [dict(write[4]) for write in writes])
+    elif kind == "update":
+        merged: Dict[Any, Dict[str, Any]] = {}
+        for write in writes:
+            merged.setdefault(write[3], {}).update(write[4])
+        result = backend.update_many(model_name, merged)
+    else:
+        result = backend.delete_many(model_name, [write[3] for write in writes])
+    if result is None:
+        raise RuntimeError(f"{model_name}: {kind} of {len(writes)} records was rejected")
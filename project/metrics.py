@@ -0,0 +1,343 @@
+import functools
+import inspect
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import routes_decorator
+from db import interceptors
+
+# Database methods timed per backend
+DB_OPERATIONS = ("create", "get", "update", "delete")
+
+# Quantiles exported for every histogram
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Significant bits kept per bucket: 2 ** (SUB_BITS - 1) buckets per power of
+# two, so a recorded value is off by at most 1 / 2 ** (SUB_BITS - 1) (~3%)
+SUB_BITS = 6
+_HALF = 1 << (SUB_BITS - 1)
+
+def _bucket(value: int) -> int:
+    """Get the bucket index of a value.
+
+    Values below 2 ** SUB_BITS get a bucket each; above that, each power of
+    two is split into the same number of equal buckets.
+
+    Args:
+        value (int): Non-negative value.
+
+    Returns:
+        int: The bucket index.
+    """
+    shift = value.bit_length() - SUB_BITS
+    if shift <= 0:
+        return value
+    return shift * _HALF + (value >> shift)
+
+def _bucket_top(index: int) -> int:
+    """Get the highest value of a bucket.
+
+    Args:
+        index (int): The bucket index.
+
+    Returns:
+        int: The highest value stored in that bucket.
+    """
+    if index < 2 * _HALF:
+        return index
+    shift = index // _HALF - 1
+    return ((index - shift * _HALF + 1) << shift) - 1
+
+
+class Histogram:
+    """Log-linear (HDR-style) histogram of non-negative integers, e.g. nanoseconds.
+
+    Recording is a bit count and a list increment, whatever the value, and
+    the buckets take a fixed amount of memory.
+
+    Attributes:
+        count (int): Values recorded.
+        total (int): Sum of the values.
+        max (int): Largest value.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        """Drop every recorded value."""
+        with self._lock:
+            self._counts: List[int] = [0] * (_bucket(2 ** 64 - 1) + 1)
+            self.count = 0
+            self.total = 0
+            self.max = 0
+
+    def record(self, value: int) -> None:
+        """Add a value.
+
+        Args:
+            value (int): The value, at least 0.
+        """
+        index = _bucket(value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, quantile: float) -> int:
+        """Get the value below which a share of the recorded values fall.
+
+        Args:
+            quantile (float): The share, between 0 and 1.
+
+        Returns:
+            int: The highest value of the bucket holding that rank, capped at
+                the largest recorded value; 0 if nothing was recorded.
+        """
+        with self._lock:
+            rank = max(1, math.ceil(quantile * self.count))
+            seen = 0
+            for index, count in enumerate(self._counts):
+                seen += count
+                if seen >= rank:
+                    return min(_bucket_top(index), self.max)
+            return 0
+
+
+class RouteStats:
+    """Calls, errors and latency of one route.
+
+    A call counts as an error if the handler raises or returns a dict with
+    an "error" key or an "error" status, as the controllers do.
+
+    Attributes:
+        errors (int): Requests that failed.
+        latency (Histogram): Handler time in nanoseconds.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.errors = 0
+        self.latency = Histogram()
+
+    @property
+    def calls(self) -> int:
+        """int: Requests handled."""
+        return self.latency.count
+
+    def record(self, elapsed: int, failed: bool) -> None:
+        """Count one request.
+
+        Args:
+            elapsed (int): Handler time in nanoseconds.
+            failed (bool): Whether the request failed.
+        """
+        self.latency.record(elapsed)
+        if failed:
+            with self._lock:
+                self.errors += 1
+
+    def clear(self) -> None:
+        """Drop every recorded request."""
+        with self._lock:
+            self.errors = 0
+        self.latency.clear()
+
+
+# Stats per route path, as registered (e.g. "/{backend}/users/get")
+ROUTE_STATS: Dict[str, RouteStats] = {}
+
+# Operation time per (database name, operation)
+DB_STATS: Dict[Tuple[str, str], Histogram] = {}
+
+_enabled = False
+_stats_lock = threading.Lock()
+
+def _failed(result: Any) -> bool:
+    """Check whether a handler result reports an error."""
+    return isinstance(result, dict) and ("error" in result or result.get("status") == "error")
+
+def _route_stats(path: str) -> RouteStats:
+    """Get the stats of a route, creating them on first use."""
+    stats = ROUTE_STATS.get(path)
+    if stats is None:
+        with _stats_lock:
+            stats = ROUTE_STATS.setdefault(path, RouteStats())
+    return stats
+
+def _time_route(path: str, handler: Callable) -> Callable:
+    """Wrap a route handler to record its calls, errors and latency.
+
+    Args:
+        path (str): The route path.
+        handler (Callable): The handler.
+
+    Returns:
+        Callable: The timed handler, a coroutine function if the handler is one.
+    """
+    stats = _route_stats(path)
+    if inspect.iscoroutinefunction(handler):
+        @functools.wraps(handler)
+        async def timed_async(**kwargs: Any) -> Any:
+            start = time.perf_counter_ns()
+            failed = True
+            try:
+                result = await handler(**kwargs)
+                failed = _failed(result)
+                return result
+            finally:
+                stats.record(time.perf_counter_ns() - start, failed)
+        return timed_async
+
+    @functools.wraps(handler)
+    def timed(**kwargs: Any) -> Any:
+        start = time.perf_counter_ns()
+        failed = True
+        try:
+            result = handler(**kwargs)
+            failed = _failed(result)
+            return result
+        finally:
+            stats.record(time.perf_counter_ns() - start, failed)
+    return timed
+
+def _time_operation(method: Callable, histogram: Histogram) -> Callable:
+    """Wrap a database method to record how long it takes."""
+    @functools.wraps(method)
+    def timed(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter_ns()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            histogram.record(time.perf_counter_ns() - start)
+    return timed
+
+def _time_database(name: str, operation: str, method: Callable) -> Callable:
+    """Interceptor timing the create, get, update and delete calls of a database.
+
+    Args:
+        name (str): Name the database is registered under.
+        operation (str): The method name.
+        method (Callable): The method.
+
+    Returns:
+        Callable: The timed method, or the method itself for other operations.
+    """
+    if operation not in DB_OPERATIONS:
+        return method
+    with _stats_lock:
+        histogram = DB_STATS.setdefault((name, operation), Histogram())
+    return _time_operation(method, histogram)
+
+def enable() -> None:
+    """Start recording route and database metrics.
+
+    Wraps every route handler and the methods of every registered database,
+    including those registered later.
+    """
+    global _enabled
+    if _enabled:
+        return
+    _enabled = True
+    routes_decorator.add_middleware(_time_route)
+    interceptors.add_interceptor(_time_database)
+
+def disable() -> None:
+    """Stop recording metrics and remove every wrapper.
+
+    Handlers and databases are called directly again, so disabled metrics
+    cost nothing. Recorded metrics are kept until reset().
+    """
+    global _enabled
+    if not _enabled:
+        return
+    _enabled = False
+    routes_decorator.remove_middleware(_time_route)
+    interceptors.remove_interceptor(_time_database)
+
+def is_enabled() -> bool:
+    """Check whether metrics are being recorded.
+
+    Returns:
+        bool: True between enable() and disable().
+    """
+    return _enabled
+
+def reset() -> None:
+    """Drop everything recorded so far."""
+    with _stats_lock:
+        for stats in ROUTE_STATS.values():
+            stats.clear()
+        for histogram in DB_STATS.values():
+            histogram.clear()
+
+def _summary(histogram: Histogram) -> Dict[str, Any]:
+    """Get the count, total and quantiles of a histogram, in seconds."""
+    summary: Dict[str, Any] = {"count": histogram.count, "sum": histogram.total / 1e9}
+    for quantile in QUANTILES:
+        summary[f"p{round(quantile * 100)}"] = histogram.percentile(quantile) / 1e9
+    return summary
+
+def snapshot() -> Dict[str, Any]:
+    """Get the recorded metrics.
+
+    Returns:
+        Dict[str, Any]: Per route, its calls, errors and latency summary; per
+            database and operation, its latency summary. Times are in seconds.
+    """
+    return {
+        "routes": {path: {"calls": stats.calls, "errors": stats.errors, **_summary(stats.latency)}
+                   for path, stats in list(ROUTE_STATS.items()) if stats.calls},
+        "databases": {f"{name}.{operation}": _summary(histogram)
+                      for (name, operation), histogram in list(DB_STATS.items()) if histogram.count},
+    }
+
+def _label(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _summary_lines(metric: str, labels: str, histogram: Histogram) -> List[str]:
+    """Render a histogram as the samples of a Prometheus summary."""
+    lines = [f'{metric}{{{labels},quantile="{quantile}"}} {histogram.percentile(quantile) / 1e9:.9f}'
+             for quantile in QUANTILES]
+    lines.append(f"{metric}_sum{{{labels}}} {histogram.total / 1e9:.9f}")
+    lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+    return lines
+
+def render_prometheus() -> str:
+    """Render the recorded metrics in the Prometheus text format.
+
+    Returns:
+        str: The exposition text.
+    """
+    routes = [(_label(path), stats) for path, stats in sorted(ROUTE_STATS.items()) if stats.calls]
+    databases = [(f'database="{_label(name)}",operation="{operation}"', histogram)
+                 for (name, operation), histogram in sorted(DB_STATS.items()) if histogram.count]
+    lines = [
+        "# HELP route_requests_total Requests handled per route.",
+        "# TYPE route_requests_total counter",
+    ]
+    lines += [f'route_requests_total{{route="{path}"}} {stats.calls}' for path, stats in routes]
+    lines += [
+        "# HELP route_errors_total Requests that raised or returned an error, per route.",
+        "# TYPE route_errors_total counter",
+    ]
+    lines += [f'route_errors_total{{route="{path}"}} {stats.errors}' for path, stats in routes]
+    lines += [
+        "# HELP route_latency_seconds Handler time per route.",
+        "# TYPE route_latency_seconds summary",
+    ]
+    for path, stats in routes:
+        lines += _summary_lines("route_latency_seconds", f'route="{path}"', stats.latency)
+    lines += [
+        "# HELP db_operation_seconds Database call time per database and operation.",
+        "# TYPE db_operation_seconds summary",
+    ]
+    for labels, histogram in databases:
+        lines += _summary_lines("db_operation_seconds", labels, histogram)
+    return "\n".join(lines) + "\n"
@@ -1,5 +1,100 @@
-from db.database import DatabaseRegistry
-from typing import Dict, Any, Optional, Type, ClassVar
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from db.registry import DatabaseRegistry
+from db.query import encode_cursor, decode_cursor
+from db.schema import TableSchema, register_schema
+from typing import Dict, Any, Optional, Type, ClassVar, List, ContextManager, Iterable, Iterator, Union, Tuple, get_origin
+
+# Databases bound with BaseModel.using() in the current thread or asyncio task,
+# keyed by model class. The mapping is replaced, never mutated, on every bind.
+_bound_databases: ContextVar[Dict[type, Any]] = ContextVar("bound_databases", default={})
+
+def _is_field(name: str, annotation: Any) -> bool:
+    """Check whether a class annotation declares a per-instance field.
+    
+    Args:
+        name (str): Annotated name.
+        annotation (Any): The annotation, possibly a string.
+        
+    Returns:
+        bool: False for private names and ClassVar annotations.
+    """
+    if name.startswith("_"):
+        return False
+    if isinstance(annotation, str):
+        return not annotation.startswith(("ClassVar", "typing.ClassVar"))
+    return annotation is not ClassVar and get_origin(annotation) is not ClassVar
+
+def _compile(source: str, name: str, namespace: Dict[str, Any]) -> Any:
+    """Compile generated source and return the function it defines.
+    
+    Args:
+        source (str): Source of a single function definition.
+        name (str): Name of the function.
+        namespace (Dict[str, Any]): Globals the function can see.
+        
+    Returns:
+        Any: The compiled function.
+    """
+    exec(source, namespace)
+    return namespace[name]
+
+def _build_methods(cls: type) -> Dict[str, Any]:
+    """Generate the field-specific methods of a model class.
+    
+    The methods are written out for the class's own field list, so creating
+    and converting an instance needs no loop, no setattr() and no __dict__.
+    
+    Args:
+        cls (type): The model class.
+        
+    Returns:
+        Dict[str, Any]: __init__, to_dict, from_row and _make for the class.
+    """
+    fields = cls.__fields__
+    namespace: Dict[str, Any] = {"_new": object.__new__, "_fields": frozenset(fields)}
+    for index, field in enumerate(fields):
+        namespace[f"_d{index}"] = cls.__field_defaults__.get(field)
+
+    # The instance and the catch-all get names no field can have (fields
+    # never start with "_"), so fields called "self" or "extra" still work
+    params = "".join(f"{field}=_d{index}, " for index, field in enumerate(fields))
+    assign = "".join(f"    __self.{field} = {field}\n" for field in fields)
+    init = _compile(
+        f"def __init__(__self, {params}**__extra):\n{assign}    __self._extra = __extra or None\n",
+        "__init__", dict(namespace))
+
+    items = ", ".join(f"{field!r}: self.{field}" for field in fields)
+    to_dict = _compile(
+        f"def to_dict(self):\n"
+        f"    data = {{{items}}}\n"
+        f"    if self._extra:\n"
+        f"        data.update(self._extra)\n"
+        f"    return data\n",
+        "to_dict", dict(namespace))
+
+    reads = "".join(f"    obj.{field} = row.get({field!r}, _d{index})\n"
+                    for index, field in enumerate(fields))
+    from_row = _compile(
+        f"def from_row(cls, row):\n"
+        f"    obj = _new(cls)\n{reads}"
+        f"    obj._extra = None if _fields.issuperset(row) else "
+        f"{{key: value for key, value in row.items() if key not in _fields}}\n"
+        f"    return obj\n",
+        "from_row", dict(namespace))
+
+    targets = "".join(f"obj.{field}, " for field in fields)
+    unpack = f"    {targets}= values\n" if fields else ""
+    make = _compile(
+        f"def _make(cls, values):\n"
+        f"    obj = _new(cls)\n{unpack}"
+        f"    obj._extra = None\n"
+        f"    return obj\n",
+        "_make", dict(namespace))
+
+    return {"__init__": init, "to_dict": to_dict,
+            "from_row": classmethod(from_row), "_make": classmethod(make)}
 
 class BaseModelMeta(type):
     """Metaclass that registers all models in an internal registry.
@@ -7,15 +102,48 @@ class BaseModelMeta(type):
     This metaclass automatically registers all model classes that inherit from
     BaseModel, making them available through the registry dictionary.
     
+    It also turns the annotated fields of a model into __slots__, so instances
+    have no per-instance __dict__, and generates __init__, to_dict, from_row
+    and _make written out for those fields. A model can still define any of
+    these methods itself. Class-level values of fields become their defaults.
+    
+    Every registered model also publishes its table schema (see db.schema),
+    from which SQL databases create their tables.
+    
     Attributes:
         registry (dict): Dictionary mapping class names to class objects.
     """
     registry: ClassVar[Dict[str, Type]] = {}
 
     def __new__(cls, name, bases, attrs):
+        fields: List[str] = []
+        defaults: Dict[str, Any] = {}
+        for base in reversed(bases):
+            for field in getattr(base, "__fields__", ()):
+                if field not in fields:
+                    fields.append(field)
+            defaults.update(getattr(base, "__field_defaults__", {}))
+        inherited = set(fields)
+
+        own = [field for field, annotation in attrs.get("__annotations__", {}).items()
+               if _is_field(field, annotation)]
+        for field in own:
+            if field in attrs:
+                # A class attribute would shadow the slot of the same name
+                defaults[field] = attrs.pop(field)
+            if field not in inherited:
+                fields.append(field)
+        attrs.setdefault("__slots__", tuple(field for field in own if field not in inherited))
+        attrs["__fields__"] = tuple(fields)
+        attrs["__field_defaults__"] = defaults
+
         obj = super().__new__(cls, name, bases, attrs)
+        for method, function in _build_methods(obj).items():
+            if method not in attrs:
+                setattr(obj, method, function)
         if name != "BaseModel":  # Avoid registering the base class itself
             BaseModelMeta.registry[name] = obj
+            register_schema(TableSchema.from_model(obj))
         return obj
 
 class BaseModel(metaclass=BaseModelMeta):
@@ -25,18 +153,73 @@ class BaseModel(metaclass=BaseModelMeta):
     providing common database operations and dynamic database selection.
     
     Attributes:
-        _db_instance: The database instance used by this model.
+        _db_name (str): Name of the database this model uses by default.
+        _db_instance: The database instance used by this model, unless another
+            one is bound to the current context with using(); looked up from
+            _db_name on first use.
+        __indexes__ (dict): Secondary indexes to maintain, mapping field name
+            to index kind ("hash" or "sorted").
     """
-    _db_instance = DatabaseRegistry.get("default")  # Default database
+    __slots__ = ("_extra",)
+    _db_name = "default"  # Default database
+    _db_instance: Any = None
+    __indexes__: ClassVar[Dict[str, str]] = {}
+    __fields__: ClassVar[Tuple[str, ...]] = ()
+    __field_defaults__: ClassVar[Dict[str, Any]] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        """Look up attributes that are not declared fields of the model.
+        
+        Args:
+            name (str): Attribute name.
+            
+        Returns:
+            Any: Value passed for an undeclared field.
+            
+        Raises:
+            AttributeError: If there is no such attribute.
+        """
+        if name != "_extra":
+            extra = self._extra
+            if extra and name in extra:
+                return extra[name]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def __getitem__(self, key: str) -> Any:
+        """Read a field by name, so instances can stand in for database records.
+        
+        Only indexing is supported: instances are not mappings, and get() is
+        the class method that loads a record, not dict.get().
+        
+        Args:
+            key (str): Field name.
+            
+        Returns:
+            Any: The field value.
+            
+        Raises:
+            KeyError: If there is no such field.
+        """
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    # __init__, to_dict, from_row and _make are generated by BaseModelMeta
+    # for every model; the definitions below document their behavior.
 
     def __init__(self, **kwargs):
         """Initialize a model instance with provided attributes.
         
+        Declared fields that are not given get their class-level default, or
+        None. Undeclared attributes are kept as well and included in to_dict().
+        
         Args:
             **kwargs: Key-value pairs representing model attributes.
         """
-        for key, value in kwargs.items():
-            setattr(self, key, value)
+        for field in self.__fields__:
+            setattr(self, field, kwargs.pop(field, self.__field_defaults__.get(field)))
+        self._extra = kwargs or None
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert the model instance to a dictionary.
@@ -44,8 +227,55 @@ class BaseModel(metaclass=BaseModelMeta):
         Returns:
             Dict[str, Any]: Dictionary representation of the model.
         """
+        data = {field: getattr(self, field) for field in self.__fields__}
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> 'BaseModel':
+        """Build a model instance from a database record.
+        
+        Args:
+            row (Dict[str, Any]): Record returned by a database.
+            
+        Returns:
+            BaseModel: The model instance.
+        """
+        return cls(**row)
+
+    @classmethod
+    def _from_record(cls, record: Any) -> 'BaseModel':
+        """Turn a record returned by a database into a model instance.
         
-        return {k: v for k, v in self.__dict__.items()}
+        Args:
+            record (Any): A dict, any other mapping such as sqlite3.Row, or a
+                model instance already built by the database.
+                
+        Returns:
+            BaseModel: The model instance.
+        """
+        if type(record) is dict:
+            return cls.from_row(record)
+        if type(record) is cls:
+            return record
+        if isinstance(record, BaseModel):
+            record = record.to_dict()
+        elif not isinstance(record, dict):
+            record = dict(record)
+        return cls.from_row(record)
+
+    @classmethod
+    def _make(cls, values: Iterable[Any]) -> 'BaseModel':
+        """Build a model instance from field values in declaration order.
+        
+        Args:
+            values (Iterable[Any]): One value for each name in __fields__.
+            
+        Returns:
+            BaseModel: The model instance.
+        """
+        return cls(**dict(zip(cls.__fields__, values)))
 
     @classmethod
     def use_db(cls, db_name: str) -> None:
@@ -54,14 +284,101 @@ class BaseModel(metaclass=BaseModelMeta):
         Args:
             db_name (str): Name of the database to use.
             
+        Raises:
+            ValueError: If the specified database is not found.
+        """
+        cls._db_instance = cls._lookup_db(db_name)
+        cls._db_name = db_name
+
+    @staticmethod
+    def _lookup_db(db_name: str) -> Any:
+        """Find a registered database by name.
+        
+        Args:
+            db_name (str): Name of the database.
+            
+        Returns:
+            Any: The registered database instance.
+            
         Raises:
             ValueError: If the specified database is not found.
         """
         db = DatabaseRegistry.get(db_name)
-        if db:
-            cls._db_instance = db
-        else:
+        if not db:
             raise ValueError(f"Database '{db_name}' not found")
+        return db
+
+    @classmethod
+    def current_db(cls) -> Any:
+        """Get the database this model uses in the current context.
+        
+        Returns:
+            Any: The database bound with using(), or the model's default database.
+        """
+        db = _bound_databases.get().get(cls)
+        if db is None:
+            db = cls._db_instance
+            if db is None:
+                db = cls._db_instance = cls._lookup_db(cls._db_name)
+        return db
+
+    @classmethod
+    @contextmanager
+    def using(cls, db_name: str) -> Iterator[Any]:
+        """Use a different database for this model inside a with block.
+        
+        Unlike use_db(), the binding only affects the current thread or asyncio
+        task, and it is undone when the block exits, even on exceptions.
+        
+        Usage:
+            with User.using("sqlite"):
+                user = User.get(1)
+        
+        Args:
+            db_name (str): Name of the database to use.
+            
+        Yields:
+            Any: The bound database instance.
+            
+        Raises:
+            ValueError: If the specified database is not found.
+        """
+        db = cls._lookup_db(db_name)
+        token = _bound_databases.set({**_bound_databases.get(), cls: db})
+        try:
+            yield db
+        finally:
+            _bound_databases.reset(token)
+
+    @classmethod
+    def on(cls, db_name: str) -> 'BoundModel':
+        """Get a view of this model that runs every call on another database.
+        
+        Usage:
+            user = User.on("sqlite").get(1)
+        
+        Args:
+            db_name (str): Name of the database to use.
+            
+        Returns:
+            BoundModel: Proxy whose class methods run inside using(db_name).
+        """
+        return BoundModel(cls, db_name)
+
+    @classmethod
+    def atomic(cls) -> ContextManager[Any]:
+        """Run several operations of this model in one database transaction.
+        
+        Usage:
+            with User.atomic():
+                User.create(username="alice")
+                User.update(1, email="alice@example.com")
+        
+        Returns:
+            ContextManager[Any]: Transaction context of the selected database;
+                nested blocks become savepoints.
+        """
+        return cls.current_db().transaction()
 
     @classmethod
     def create(cls, model_name: Optional[str] = None, **data) -> Optional['BaseModel']:
@@ -76,10 +393,10 @@ class BaseModel(metaclass=BaseModelMeta):
         """
         if data:
             model = model_name or cls.__name__.lower()
-            record = cls._db_instance.create(model, data)
+            record = cls.current_db().create(model, data)
             
             if record:
-                return cls(**record)
+                return cls._from_record(record)
         else:
             raise ValueError("No data provided for creation")    
         return None
@@ -98,10 +415,10 @@ class BaseModel(metaclass=BaseModelMeta):
         if obj_id is None:
             obj_id = model_name
             model_name = cls.__name__.lower()
-        record = cls._db_instance.get(model_name, obj_id)
+        record = cls.current_db().get(model_name, obj_id)
     
         if record:
-            return cls(**record)
+            return cls._from_record(record)
         return None
         
     @classmethod
@@ -120,10 +437,10 @@ class BaseModel(metaclass=BaseModelMeta):
             if obj_id is None:
                 obj_id = model_name
                 model_name = cls.__name__.lower()
-            record = cls._db_instance.update(model_name, obj_id, data)
+            record = cls.current_db().update(model_name, obj_id, data)
             
             if record:
-                return cls(**record)
+                return cls._from_record(record)
         else:
             raise ValueError("No data provided for update")    
         return None
@@ -142,8 +459,209 @@ class BaseModel(metaclass=BaseModelMeta):
         if obj_id is None:
             obj_id = model_name
             model_name = cls.__name__.lower()
-        record = cls._db_instance.delete(model_name, obj_id)
+        record = cls.current_db().delete(model_name, obj_id)
         
         if record:
-            return cls(**record)
+            return cls._from_record(record)
         return None
+
+    @classmethod
+    def bulk_create(cls, records: List[Dict[str, Any]], model_name: Optional[str] = None) -> List['BaseModel']:
+        """Create several objects in the selected database with one call.
+        
+        Args:
+            records (List[Dict[str, Any]]): Attributes for each new object.
+            model_name (str, optional): Name of the model. If None, uses the class name.
+            
+        Returns:
+            List[BaseModel]: New model instances, or an empty list if the
+                database rejected the batch.
+        """
+        if not records:
+            raise ValueError("No data provided for creation")
+        model = model_name or cls.__name__.lower()
+        created = cls.current_db().create_many(model, records)
+        return [cls._from_record(record) for record in created or []]
+
+    @classmethod
+    def bulk_get(cls, obj_ids: List[Any], model_name: Optional[str] = None) -> List['BaseModel']:
+        """Retrieve several objects by ID.
+        
+        Args:
+            obj_ids (List[Any]): Object IDs.
+            model_name (str, optional): Name of the model. If None, uses the class name.
+            
+        Returns:
+            List[BaseModel]: Model instances that were found.
+        """
+        model = model_name or cls.__name__.lower()
+        records = cls.current_db().get_many(model, obj_ids)
+        return [cls._from_record(record) for record in records]
+
+    @classmethod
+    def bulk_update(cls, updates: Dict[Any, Dict[str, Any]], model_name: Optional[str] = None) -> List['BaseModel']:
+        """Update several objects by ID.
+        
+        Args:
+            updates (Dict[Any, Dict[str, Any]]): Mapping of object ID to the
+                attributes to update.
+            model_name (str, optional): Name of the model. If None, uses the class name.
+            
+        Returns:
+            List[BaseModel]: Updated model instances.
+        """
+        if not updates:
+            raise ValueError("No data provided for update")
+        model = model_name or cls.__name__.lower()
+        records = cls.current_db().update_many(model, updates)
+        return [cls._from_record(record) for record in records or []]
+
+    @classmethod
+    def bulk_delete(cls, obj_ids: List[Any], model_name: Optional[str] = None) -> List['BaseModel']:
+        """Delete several objects by ID.
+        
+        Args:
+            obj_ids (List[Any]): Object IDs.
+            model_name (str, optional): Name of the model. If None, uses the class name.
+            
+        Returns:
+            List[BaseModel]: Deleted model instances.
+        """
+        model = model_name or cls.__name__.lower()
+        records = cls.current_db().delete_many(model, obj_ids)
+        return [cls._from_record(record) for record in records or []]
+
+    @classmethod
+    def ensure_indexes(cls, model_name: Optional[str] = None) -> None:
+        """Create the indexes declared in __indexes__ on the selected database.
+        
+        Databases without secondary index support are left unchanged.
+        
+        Args:
+            model_name (str, optional): Name of the model. If None, uses the class name.
+        """
+        create_index = getattr(cls.current_db(), "create_index", None)
+        if create_index is None:
+            return
+        model = model_name or cls.__name__.lower()
+        for field, kind in cls.__indexes__.items():
+            create_index(model, field, kind)
+
+    @classmethod
+    def filter(cls, model_name: Optional[str] = None, *,
+               order_by: Optional[Union[str, List[str]]] = None, limit: Optional[int] = None,
+               offset: Optional[int] = None, fields: Optional[List[str]] = None,
+               **conditions) -> List[Any]:
+        """Find the objects matching some conditions.
+        
+        Usage:
+            User.filter(email="alice@example.com")
+            Product.filter(price__gte=10, order_by="-price", limit=20)
+            User.filter(fields=["id", "email"])
+        
+        Args:
+            model_name (str, optional): Name of the model. If None, uses the class name.
+            order_by (Union[str, List[str]], optional): Field(s) to sort by; a
+                leading "-" sorts descending.
+            limit (int, optional): Maximum number of objects to return.
+            offset (int, optional): Number of matching objects to skip.
+            fields (List[str], optional): Only return these fields, as plain
+                dictionaries instead of model instances.
+            **conditions: Field values to match. A "__op" suffix selects another
+                operator than equality: ne, lt, lte, gt, gte or in.
+                
+        Returns:
+            List[Any]: Matching model instances, or dictionaries if fields is given.
+            
+        Raises:
+            ValueError: If a condition uses an unsupported operator.
+        """
+        model = model_name or cls.__name__.lower()
+        cls.ensure_indexes(model)
+        records = cls.current_db().find(model, conditions, order_by=order_by, limit=limit,
+                                        offset=offset, fields=fields)
+        if fields:
+            return records
+        return [cls._from_record(record) for record in records]
+
+    @classmethod
+    def iter_all(cls, batch_size: int = 500, model_name: Optional[str] = None) -> Iterator['BaseModel']:
+        """Stream every object of this model without loading them all at once.
+        
+        The database is chosen when this method is called, so the iterator
+        keeps using it even if it is consumed outside a using() block.
+        
+        Args:
+            batch_size (int, optional): Number of records the database reads
+                at a time. Defaults to 500.
+            model_name (str, optional): Name of the model. If None, uses the class name.
+            
+        Returns:
+            Iterator[BaseModel]: Lazily built model instances.
+        """
+        model = model_name or cls.__name__.lower()
+        records = cls.current_db().iter_records(model, batch_size)
+        return (cls._from_record(record) for record in records)
+
+    @classmethod
+    def page(cls, limit: int = 50, after: Optional[str] = None,
+             model_name: Optional[str] = None) -> Tuple[List['BaseModel'], Optional[str]]:
+        """Get one page of objects using keyset pagination.
+        
+        Usage:
+            users, token = User.page(limit=100)
+            while token:
+                users, token = User.page(limit=100, after=token)
+        
+        Args:
+            limit (int, optional): Maximum number of objects. Defaults to 50.
+            after (str, optional): Token of the previous page. Defaults to the first page.
+            model_name (str, optional): Name of the model. If None, uses the class name.
+            
+        Returns:
+            Tuple[List[BaseModel], Optional[str]]: Model instances and the token of
+                the next page, or None on the last page.
+                
+        Raises:
+            ValueError: If limit is not an integer of at least 1, or the token
+                is malformed.
+        """
+        if type(limit) is not int or limit < 1:
+            raise ValueError("Page limit must be an integer of at least 1")
+        model = model_name or cls.__name__.lower()
+        records, cursor = cls.current_db().page(model, limit, decode_cursor(after))
+        token = None if cursor is None else encode_cursor(cursor)
+        return [cls._from_record(record) for record in records], token
+
+
+class BoundModel:
+    """Model class bound to a specific database.
+    
+    Returned by BaseModel.on(); every class method called through it runs
+    inside BaseModel.using() for the bound database.
+    
+    Attributes:
+        model (Type[BaseModel]): The wrapped model class.
+        db_name (str): Name of the database the calls run on.
+    """
+
+    def __init__(self, model: Type[BaseModel], db_name: str) -> None:
+        """Bind a model class to a database.
+        
+        Args:
+            model (Type[BaseModel]): The model class.
+            db_name (str): Name of the database to use.
+        """
+        self.model = model
+        self.db_name = db_name
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.model, name)
+        if not callable(attr):
+            return attr
+
+        @wraps(attr)
+        def call(*args, **kwargs):
+            with self.model.using(self.db_name):
+                return attr(*args, **kwargs)
+        return call
@@ -1,3 +1,4 @@
+from typing import Optional
 from .base_model import BaseModel
 
 class Product(BaseModel):
@@ -9,13 +10,14 @@ class Product(BaseModel):
     Attributes:
         id (int): Unique identifier for the product.
         name (str): The name of the product.
-        description (str): Detailed description of the product.
-        price (float): The price of the product in currency units.
-        quantity (int): Available inventory quantity.
+        description (str, optional): Detailed description of the product.
+        price (float, optional): The price of the product in currency units.
+        quantity (int): Available inventory quantity. Defaults to 0.
     """
     id: int
     name: str
-    description: str
-    price: float
-    quantity: int
+    description: Optional[str] = None
+    price: Optional[float] = None
+    quantity: int = 0
 
+    __indexes__ = {"price": "sorted"}
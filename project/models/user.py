@@ -1,3 +1,4 @@
+from typing import Optional
 from .base_model import BaseModel
 
 class User(BaseModel):
@@ -9,12 +10,12 @@ class User(BaseModel):
     Attributes:
         id (int): Unique identifier for the user.
         username (str): The user's display name in the system.
-        email (str): The user's email address for notifications and login.
-        created_at (str): Timestamp when the user account was created.
+        email (str, optional): The user's email address for notifications and login.
+        created_at (str, optional): Timestamp when the user account was created.
     """
     id: int
     username: str
-    email: str
-    created_at: str
-
+    email: Optional[str] = None
+    created_at: Optional[str] = None
 
+    __indexes__ = {"email": "hash"}
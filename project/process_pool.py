@@ -0,0 +1,162 @@
+import asyncio
+import importlib
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Modules whose import registers the request routes
+CONTROLLER_MODULES = (
+    "controllers.user_controller",
+    "controllers.product_controller",
+    "controllers.database_controller",
+    "controllers.metrics_controller",
+    "controllers.profiling_controller",
+)
+
+def _init_worker(modules: Sequence[str], sqlite_path: Optional[str], pool_size: int) -> None:
+    """Prepare a worker process to handle requests.
+
+    Imports the controllers, so their routes are registered in the worker,
+    and configures a SqliteDatabase of the worker's own as "sqlite", opened
+    on its first request: SQLite connections cannot be shared with the
+    parent process.
+
+    Args:
+        modules (Sequence[str]): Modules to import.
+        sqlite_path (str, optional): SQLite database file, or None to keep
+            the "sqlite" database the imports registered.
+        pool_size (int): Connections of the worker's SQLite pool.
+    """
+    for module in modules:
+        importlib.import_module(module)
+    if sqlite_path is not None:
+        from db.registry import DatabaseRegistry
+        DatabaseRegistry.configure({"sqlite": {"type": "sqlite", "db_name": sqlite_path, "pool_size": pool_size}})
+
+def _run(path: str, kwargs: Dict[str, Any]) -> Any:
+    """Handle one request inside a worker process.
+
+    Args:
+        path (str): The request path.
+        kwargs (Dict[str, Any]): Request data.
+
+    Returns:
+        Any: Result of the handler.
+    """
+    from routes_decorator import handle_request
+    return handle_request(path, **kwargs)
+
+
+class ProcessDispatcher:
+    """Handles requests in a pool of worker processes.
+
+    Each worker imports the controllers and opens its own connections to the
+    SQLite file, which runs in WAL mode, so readers in different workers do
+    not block each other. Request data and results are pickled between
+    processes, so handlers must return picklable values, which the
+    controllers' dicts are.
+
+    Only the SQLite file is shared: in-memory databases such as "default"
+    exist separately in every worker, so their requests should not be sent
+    through the pool.
+
+    Usage:
+        with ProcessDispatcher(workers=4, sqlite_path="database.db") as dispatcher:
+            result = dispatcher.handle_request("/sql/users/get", user_id=1)
+
+    Attributes:
+        workers (int): Number of worker processes.
+    """
+
+    def __init__(self, workers: Optional[int] = None, sqlite_path: Optional[str] = "database.db",
+                 modules: Sequence[str] = CONTROLLER_MODULES, pool_size: int = 2,
+                 start_method: str = "spawn") -> None:
+        """Start the worker processes.
+
+        Args:
+            workers (int, optional): Number of processes. Defaults to the
+                number of CPUs.
+            sqlite_path (str, optional): SQLite file each worker registers
+                as "sqlite". Defaults to "database.db".
+            modules (Sequence[str], optional): Modules that register the
+                routes. Defaults to CONTROLLER_MODULES.
+            pool_size (int, optional): SQLite connections per worker. Defaults to 2.
+            start_method (str, optional): Multiprocessing start method.
+                Defaults to "spawn", which works on every platform and does
+                not copy the parent's open connections.
+        """
+        self.workers = workers or multiprocessing.cpu_count()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+            initargs=(tuple(modules), sqlite_path, pool_size),
+        )
+
+    def submit(self, path: str, **kwargs: Any) -> Future:
+        """Send a request to a worker without waiting for it.
+
+        Args:
+            path (str): The request path.
+            **kwargs: Request data.
+
+        Returns:
+            Future: Resolves to the handler's result.
+        """
+        return self._executor.submit(_run, path, kwargs)
+
+    def handle_request(self, path: str, **kwargs: Any) -> Any:
+        """Handle a request in a worker and wait for the result.
+
+        Args:
+            path (str): The request path.
+            **kwargs: Request data.
+
+        Returns:
+            Any: Result of the corresponding handler function,
+                or an error message if the route is not found.
+        """
+        return self.submit(path, **kwargs).result()
+
+    async def handle_request_async(self, path: str, **kwargs: Any) -> Any:
+        """Handle a request in a worker without blocking the event loop.
+
+        Args:
+            path (str): The request path.
+            **kwargs: Request data.
+
+        Returns:
+            Any: Result of the corresponding handler function.
+        """
+        return await asyncio.wrap_future(self.submit(path, **kwargs))
+
+    def map(self, requests: Iterable[Tuple[str, Dict[str, Any]]], chunksize: int = 16) -> List[Any]:
+        """Handle many requests across the workers.
+
+        Requests are sent in chunks, so the cost of passing them between
+        processes is shared by several requests.
+
+        Args:
+            requests (Iterable[Tuple[str, Dict[str, Any]]]): Pairs of request
+                path and request data.
+            chunksize (int, optional): Requests sent to a worker at a time.
+                Defaults to 16.
+
+        Returns:
+            List[Any]: Results in the same order as the requests.
+        """
+        requests = list(requests)
+        if not requests:
+            return []
+        paths, kwargs = zip(*requests)
+        return list(self._executor.map(_run, paths, kwargs, chunksize=chunksize))
+
+    def close(self) -> None:
+        """Wait for pending requests, then stop the workers."""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'ProcessDispatcher':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
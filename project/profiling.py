@@ -0,0 +1,383 @@
+import cProfile
+import functools
+import inspect
+import io
+import itertools
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import routes_decorator
+from db import interceptors
+
+
+class Call:
+    """One route request or database call, as seen by the hooks.
+
+    Attributes:
+        kind (str): "route" or "database".
+        name (str): Route path as registered, e.g. "/{backend}/users/get",
+            or "<database>.<operation>", e.g. "sqlite.get".
+        args (tuple): Positional arguments.
+        kwargs (dict): Keyword arguments.
+        result (Any): Return value, set before the after hooks run.
+        error (BaseException, optional): Exception raised, set before the
+            error hooks run.
+        elapsed (float): Seconds the call took, set before the after and
+            error hooks run.
+        data (dict): Free space for hooks, e.g. to pass state from a before
+            hook to an after hook.
+    """
+    __slots__ = ("kind", "name", "args", "kwargs", "result", "error", "elapsed", "data")
+
+    def __init__(self, kind: str, name: str, args: tuple, kwargs: Dict[str, Any]) -> None:
+        self.kind = kind
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.elapsed = 0.0
+        self.data: Dict[str, Any] = {}
+
+
+class Hooks:
+    """Callbacks run around route handlers and/or database calls.
+
+    Exceptions raised by the callbacks propagate to the caller, like the
+    handler's own.
+
+    Attributes:
+        before (Callable[[Call], None], optional): Run before the call.
+        after (Callable[[Call], None], optional): Run after a call returns.
+        error (Callable[[Call], None], optional): Run after a call raises.
+        routes (bool): Whether to run around route handlers.
+        databases (bool): Whether to run around database calls.
+    """
+
+    def __init__(self, before: Optional[Callable[[Call], None]] = None,
+                 after: Optional[Callable[[Call], None]] = None,
+                 error: Optional[Callable[[Call], None]] = None,
+                 routes: bool = True, databases: bool = True) -> None:
+        self.before = before
+        self.after = after
+        self.error = error
+        self.routes = routes
+        self.databases = databases
+
+
+_hooks: List[Hooks] = []
+_hooks_lock = threading.Lock()
+
+def _notify(hooks: List[Hooks], event: str, call: Call) -> None:
+    """Run one kind of callback ("before", "after" or "error") of each hook."""
+    for hook in hooks:
+        callback = getattr(hook, event)
+        if callback is not None:
+            callback(call)
+
+def _run(hooks: List[Hooks], call: Call, func: Callable) -> Any:
+    """Call a function between the hooks."""
+    _notify(hooks, "before", call)
+    start = time.perf_counter()
+    try:
+        call.result = func(*call.args, **call.kwargs)
+    except BaseException as e:
+        call.elapsed = time.perf_counter() - start
+        call.error = e
+        _notify(hooks, "error", call)
+        raise
+    call.elapsed = time.perf_counter() - start
+    _notify(hooks, "after", call)
+    return call.result
+
+async def _run_async(hooks: List[Hooks], call: Call, func: Callable) -> Any:
+    """Await a coroutine function between the hooks."""
+    _notify(hooks, "before", call)
+    start = time.perf_counter()
+    try:
+        call.result = await func(*call.args, **call.kwargs)
+    except BaseException as e:
+        call.elapsed = time.perf_counter() - start
+        call.error = e
+        _notify(hooks, "error", call)
+        raise
+    call.elapsed = time.perf_counter() - start
+    _notify(hooks, "after", call)
+    return call.result
+
+def _hook_route(path: str, handler: Callable) -> Callable:
+    """Middleware running the route hooks around a handler."""
+    hooks = [hook for hook in _hooks if hook.routes]
+    if not hooks:
+        return handler
+    if inspect.iscoroutinefunction(handler):
+        @functools.wraps(handler)
+        async def hooked_async(**kwargs: Any) -> Any:
+            return await _run_async(hooks, Call("route", path, (), kwargs), handler)
+        return hooked_async
+
+    @functools.wraps(handler)
+    def hooked(**kwargs: Any) -> Any:
+        return _run(hooks, Call("route", path, (), kwargs), handler)
+    return hooked
+
+def _hook_database(name: str, operation: str, method: Callable) -> Callable:
+    """Interceptor running the database hooks around a database method."""
+    hooks = [hook for hook in _hooks if hook.databases]
+    if not hooks:
+        return method
+    call_name = f"{name}.{operation}"
+
+    @functools.wraps(method)
+    def hooked(*args: Any, **kwargs: Any) -> Any:
+        return _run(hooks, Call("database", call_name, args, kwargs), method)
+    return hooked
+
+def _reinstall() -> None:
+    """Wrap handlers and databases again after the hooks changed."""
+    routes_decorator.remove_middleware(_hook_route)
+    interceptors.remove_interceptor(_hook_database)
+    if any(hook.routes for hook in _hooks):
+        routes_decorator.add_middleware(_hook_route)
+    if any(hook.databases for hook in _hooks):
+        interceptors.add_interceptor(_hook_database)
+
+def add_hooks(before: Optional[Callable[[Call], None]] = None,
+              after: Optional[Callable[[Call], None]] = None,
+              error: Optional[Callable[[Call], None]] = None,
+              routes: bool = True, databases: bool = True) -> Hooks:
+    """Run callbacks around every route handler and/or database call.
+
+    Usage:
+        def slow(call):
+            if call.elapsed > 0.1:
+                print(f"{call.kind} {call.name} took {call.elapsed:.3f}s")
+
+        hooks = add_hooks(after=slow)
+        ...
+        remove_hooks(hooks)
+
+    Args:
+        before (Callable[[Call], None], optional): Run before each call.
+        after (Callable[[Call], None], optional): Run after each call that returns.
+        error (Callable[[Call], None], optional): Run after each call that raises.
+        routes (bool, optional): Hook route handlers. Defaults to True.
+        databases (bool, optional): Hook the operations of the registered
+            databases (see db.interceptors.OPERATIONS). Defaults to True.
+
+    Returns:
+        Hooks: Handle to pass to remove_hooks().
+    """
+    hooks = Hooks(before, after, error, routes, databases)
+    with _hooks_lock:
+        _hooks.append(hooks)
+        _reinstall()
+    return hooks
+
+def remove_hooks(hooks: Hooks) -> None:
+    """Stop running callbacks added with add_hooks().
+
+    Once no hooks are left, handlers and databases are called directly again.
+
+    Args:
+        hooks (Hooks): Handle returned by add_hooks().
+    """
+    with _hooks_lock:
+        if hooks in _hooks:
+            _hooks.remove(hooks)
+            _reinstall()
+
+
+class RouteProfile:
+    """Profiles collected from the sampled requests of one route.
+
+    Attributes:
+        samples (int): Requests profiled.
+        stats (pstats.Stats, optional): Merged cProfile statistics.
+        peak_memory (int): Largest peak of traced memory during one request, in bytes.
+        allocations (List[tracemalloc.Statistic]): Lines that allocated the
+            most memory still held at the end of the last sampled request.
+    """
+
+    def __init__(self) -> None:
+        self.samples = 0
+        self.stats: Optional[pstats.Stats] = None
+        self.peak_memory = 0
+        self.allocations: List[tracemalloc.Statistic] = []
+
+    def report(self, limit: int = 20, sort: str = "cumulative") -> str:
+        """Format the collected profile.
+
+        Args:
+            limit (int, optional): Functions and allocation lines listed. Defaults to 20.
+            sort (str, optional): pstats sort key. Defaults to "cumulative".
+
+        Returns:
+            str: The profile as text.
+        """
+        out = io.StringIO()
+        out.write(f"{self.samples} sampled requests\n")
+        if self.stats is not None:
+            self.stats.stream = out
+            self.stats.sort_stats(sort).print_stats(limit)
+        if self.allocations:
+            out.write(f"Peak traced memory: {self.peak_memory} bytes\n")
+            for statistic in self.allocations[:limit]:
+                out.write(f"{statistic}\n")
+        return out.getvalue()
+
+
+# Collected profiles per route path
+PROFILES: Dict[str, RouteProfile] = {}
+
+# Where dump_profiles(), and so the /profiling/dump route, writes by default
+PROFILE_DIRECTORY = os.environ.get("PROFILE_DIRECTORY", "profiles")
+
+_sampling: Optional[Dict[str, Any]] = None
+# One sampled request is profiled at a time: profilers and tracemalloc are
+# process-wide, so concurrent samples would mix or reject each other
+_profile_lock = threading.Lock()
+
+@contextmanager
+def _capture(path: str) -> Iterator[None]:
+    """Profile the block with cProfile and/or tracemalloc and keep the results.
+
+    Args:
+        path (str): Route path the results are kept under.
+    """
+    settings = _sampling
+    if settings is None or not _profile_lock.acquire(blocking=False):
+        yield
+        return
+    try:
+        profiler = cProfile.Profile() if settings["cpu"] else None
+        tracing = settings["memory"] and not tracemalloc.is_tracing()
+        before = None
+        if settings["memory"]:
+            if tracing:
+                tracemalloc.start(settings["frames"])
+            else:
+                before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:  # Another profiler is active (Python 3.12+)
+                profiler = None
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            profile = PROFILES.setdefault(path, RouteProfile())
+            profile.samples += 1
+            if profiler is not None:
+                if profile.stats is None:
+                    profile.stats = pstats.Stats(profiler)
+                else:
+                    profile.stats.add(profiler)
+            if settings["memory"]:
+                peak = tracemalloc.get_traced_memory()[1]
+                snapshot = tracemalloc.take_snapshot().filter_traces(
+                    [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)])
+                if tracing:
+                    tracemalloc.stop()
+                profile.peak_memory = max(profile.peak_memory, peak)
+                profile.allocations = (snapshot.compare_to(before, "lineno") if before is not None
+                                       else snapshot.statistics("lineno"))
+    finally:
+        _profile_lock.release()
+
+def _sample_route(path: str, handler: Callable) -> Callable:
+    """Middleware profiling one in every N requests of a route."""
+    settings = _sampling
+    if settings is None or (settings["routes"] is not None and path not in settings["routes"]):
+        return handler
+    counter = itertools.count(1)
+    every = settings["every"]
+    if inspect.iscoroutinefunction(handler):
+        @functools.wraps(handler)
+        async def sampled_async(**kwargs: Any) -> Any:
+            if next(counter) % every:
+                return await handler(**kwargs)
+            # The profile also covers other tasks the event loop runs meanwhile
+            with _capture(path):
+                return await handler(**kwargs)
+        return sampled_async
+
+    @functools.wraps(handler)
+    def sampled(**kwargs: Any) -> Any:
+        if next(counter) % every:
+            return handler(**kwargs)
+        with _capture(path):
+            return handler(**kwargs)
+    return sampled
+
+def start_sampling(every: int = 100, cpu: bool = True, memory: bool = False,
+                   routes: Optional[Sequence[str]] = None, frames: int = 1) -> None:
+    """Profile one in every N requests of each route, while the app runs.
+
+    Sampled requests run under cProfile and/or tracemalloc; the others only
+    pay for a counter. Results accumulate in PROFILES until reset_profiles().
+
+    Args:
+        every (int, optional): Profile every Nth request of a route. Defaults to 100.
+        cpu (bool, optional): Collect cProfile statistics. Defaults to True.
+        memory (bool, optional): Trace memory allocations. Defaults to False.
+        routes (Sequence[str], optional): Route paths, as registered, to
+            sample. Defaults to every route.
+        frames (int, optional): Stack frames kept per traced allocation. Defaults to 1.
+
+    Raises:
+        ValueError: If every is less than 1.
+    """
+    global _sampling
+    if every < 1:
+        raise ValueError("every must be at least 1")
+    routes_decorator.remove_middleware(_sample_route)
+    _sampling = {"every": every, "cpu": cpu, "memory": memory, "frames": frames,
+                 "routes": None if routes is None else set(routes)}
+    routes_decorator.add_middleware(_sample_route)
+
+def stop_sampling() -> None:
+    """Stop profiling requests; collected profiles are kept."""
+    global _sampling
+    _sampling = None
+    routes_decorator.remove_middleware(_sample_route)
+
+def reset_profiles() -> None:
+    """Drop the collected profiles."""
+    PROFILES.clear()
+
+def dump_profiles(directory: Optional[str] = None) -> List[str]:
+    """Write the collected profile of each route to a directory.
+
+    Each route gets a "<route>.prof" file in the binary pstats format, which
+    pstats, snakeviz and similar tools read, and a "<route>.txt" report.
+
+    Args:
+        directory (str, optional): Directory to write to, created if missing.
+            Defaults to PROFILE_DIRECTORY.
+
+    Returns:
+        List[str]: Paths of the written files.
+    """
+    if directory is None:
+        directory = PROFILE_DIRECTORY
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    for path, profile in list(PROFILES.items()):
+        slug = re.sub(r"[^A-Za-z0-9_-]+", "_", path).strip("_") or "root"
+        if profile.stats is not None:
+            written.append(os.path.join(directory, f"{slug}.prof"))
+            profile.stats.dump_stats(written[-1])
+        written.append(os.path.join(directory, f"{slug}.txt"))
+        with open(written[-1], "w", encoding="utf-8") as report:
+            report.write(f"{path}\n{profile.report()}")
+    return written
@@ -1,33 +1,335 @@
-from typing import Dict, Any, Callable
+import contextvars
+import functools
+import inspect
+from typing import TYPE_CHECKING, Dict, Any, Callable, Iterable, List, Optional, Tuple
 
-# Dictionary to store all registered routes
+# asyncio is imported where it is used: it takes longer to import than
+# everything else here, and plain handle_request() calls never need it
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+# Dictionary to store all registered routes with a literal path
 ROUTES: Dict[str, Callable] = {}
 
+# Dictionary to store all registered routes with {param} segments,
+# keyed by their template path
+ROUTE_TEMPLATES: Dict[str, Callable] = {}
+
+# Executor for plain (blocking) handlers called through handle_request_async;
+# None means the event loop's default thread pool
+_executor: Optional["Executor"] = None
+
+# Functions wrapping every handler, e.g. the timing added by metrics.enable();
+# each is called with the route path and the handler, the last added outermost
+_middlewares: List[Callable[[str, Callable], Callable]] = []
+
+class _RouteNode:
+    """Node of the compiled route trie, one per path segment.
+
+    Attributes:
+        static (dict): Children for literal segments, keyed by segment.
+        param_name (str, optional): Name of the {param} segment at this position.
+        param_child (_RouteNode, optional): Child matched by any segment.
+        handler (Callable, optional): Handler of the route ending at this node.
+    """
+    __slots__ = ("static", "param_name", "param_child", "handler")
+
+    def __init__(self) -> None:
+        self.static: Dict[str, "_RouteNode"] = {}
+        self.param_name: Optional[str] = None
+        self.param_child: Optional["_RouteNode"] = None
+        self.handler: Optional[Callable] = None
+
+_ROUTE_TRIE = _RouteNode()
+
+def _add_template(path: str, func: Callable) -> None:
+    """Compile a templated path into the route trie.
+
+    Args:
+        path (str): Route path with {param} segments, e.g. "/{backend}/users/get".
+        func (Callable): Handler for the route.
+
+    Raises:
+        ValueError: If another template uses a different parameter name at
+            the same position.
+    """
+    node = _ROUTE_TRIE
+    for segment in path.split("/"):
+        if segment.startswith("{") and segment.endswith("}"):
+            name = segment[1:-1]
+            if node.param_child is None:
+                node.param_name, node.param_child = name, _RouteNode()
+            elif node.param_name != name:
+                raise ValueError(
+                    f"Route '{path}' uses '{{{name}}}' where another route uses '{{{node.param_name}}}'"
+                )
+            node = node.param_child
+        else:
+            node = node.static.setdefault(segment, _RouteNode())
+    node.handler = func
+
+def _remove_template(path: str) -> None:
+    """Remove a templated path from the route trie, with the nodes only it used.
+
+    Args:
+        path (str): Route path with {param} segments.
+    """
+    trail: List[Tuple[_RouteNode, Optional[str]]] = []
+    node = _ROUTE_TRIE
+    for segment in path.split("/"):
+        if segment.startswith("{") and segment.endswith("}"):
+            child, key = node.param_child, None
+        else:
+            child, key = node.static.get(segment), segment
+        if child is None:
+            return
+        trail.append((node, key))
+        node = child
+    node.handler = None
+    for parent, key in reversed(trail):
+        if node.handler is not None or node.static or node.param_child is not None:
+            break
+        if key is None:
+            parent.param_name = parent.param_child = None
+        else:
+            del parent.static[key]
+        node = parent
+
+def _match(node: _RouteNode, segments: List[str], index: int,
+           params: Dict[str, str]) -> Optional[Callable]:
+    """Walk the route trie, preferring literal segments over parameters.
+
+    Args:
+        node (_RouteNode): Node reached so far.
+        segments (List[str]): Segments of the requested path.
+        index (int): Index of the next segment to match.
+        params (Dict[str, str]): Collected parameter values, filled in place.
+
+    Returns:
+        Optional[Callable]: The matched handler, or None.
+    """
+    if index == len(segments):
+        return node.handler
+    segment = segments[index]
+    child = node.static.get(segment)
+    if child is not None:
+        handler = _match(child, segments, index + 1, params)
+        if handler is not None:
+            return handler
+    if node.param_child is not None and segment:
+        handler = _match(node.param_child, segments, index + 1, params)
+        if handler is not None:
+            params[node.param_name] = segment
+            return handler
+    return None
+
+def resolve(path: str) -> Tuple[Optional[Callable], Dict[str, str]]:
+    """Find the handler for a request path.
+
+    Literal paths are a single dict lookup. Otherwise the path is matched
+    against the compiled templates one segment at a time, so the cost depends
+    on the path length and not on the number of registered routes.
+
+    Args:
+        path (str): The request path.
+
+    Returns:
+        Tuple[Optional[Callable], Dict[str, str]]: The handler (None if no route
+            matches) and the values of the path parameters.
+    """
+    handler = ROUTES.get(path)
+    if handler is not None:
+        return handler, {}
+    params: Dict[str, str] = {}
+    return _match(_ROUTE_TRIE, path.split("/"), 0, params), params
+
 def route(path: str) -> Callable:
     """Register a function as a route handler.
-    
+
+    Both plain functions and ``async def`` coroutine functions can be registered.
+    Segments written as ``{name}`` match any value, which is passed to the
+    handler as the keyword argument ``name``:
+
+        @route('/{backend}/users/get')
+        def get_user_from(backend, user_id): ...
+
     Args:
         path (str): The route path.
-        
+
     Returns:
         Callable: Decorator function that registers the handler.
     """
     def decorator(func: Callable) -> Callable:
-        ROUTES[path] = func
+        if "{" in path:
+            _add_template(path, _wrap(path, func))
+            ROUTE_TEMPLATES[path] = func
+        else:
+            ROUTES[path] = _wrap(path, func)
         return func
     return decorator
 
+def unroute(path: str) -> None:
+    """Remove the handler registered for a route path, literal or templated.
+
+    Args:
+        path (str): The route path, as given to route().
+    """
+    if path in ROUTE_TEMPLATES:
+        del ROUTE_TEMPLATES[path]
+        _remove_template(path)
+    else:
+        ROUTES.pop(path, None)
+
+def _wrap(path: str, func: Callable) -> Callable:
+    """Apply the middlewares to a handler.
+
+    Args:
+        path (str): The route path.
+        func (Callable): The handler as registered.
+
+    Returns:
+        Callable: The wrapped handler, or the handler itself without middlewares.
+    """
+    wrapper = func
+    for middleware in _middlewares:
+        wrapper = middleware(path, wrapper)
+    if wrapper is not func:
+        wrapper.__route_handler__ = func
+    return wrapper
+
+def _rewrap() -> None:
+    """Wrap every registered handler again with the current middlewares."""
+    for path, func in list(ROUTES.items()):
+        ROUTES[path] = _wrap(path, getattr(func, "__route_handler__", func))
+    for path, func in ROUTE_TEMPLATES.items():
+        _add_template(path, _wrap(path, func))
+
+def add_middleware(middleware: Callable[[str, Callable], Callable]) -> None:
+    """Wrap every registered and future handler.
+
+    Handlers are wrapped once here rather than on every request, so without
+    middlewares requests go straight to the handlers.
+
+    Args:
+        middleware (Callable[[str, Callable], Callable]): Function taking the
+            route path and the handler and returning the handler to call instead.
+    """
+    if middleware not in _middlewares:
+        _middlewares.append(middleware)
+        _rewrap()
+
+def remove_middleware(middleware: Callable[[str, Callable], Callable]) -> None:
+    """Stop wrapping the handlers with a middleware added with add_middleware().
+
+    Args:
+        middleware (Callable[[str, Callable], Callable]): The middleware.
+    """
+    if middleware in _middlewares:
+        _middlewares.remove(middleware)
+        _rewrap()
+
 def handle_request(path: str, **kwargs: Any) -> Any:
     """Handle a request for a given route path.
-    
+
+    ``async def`` handlers are run in a new event loop, so inside a running
+    loop such routes must be awaited with handle_request_async() instead.
+
+    Args:
+        path (str): The request path.
+        **kwargs: Request data.
+
+    Returns:
+        Any: Result of the corresponding handler function,
+            or an error message if the route is not found.
+
+    Raises:
+        RuntimeError: If the handler is a coroutine function and an event
+            loop is already running in this thread.
+    """
+    handler, params = resolve(path)
+    if handler is None:
+        return {"error": f"Route '{path}' not found"}
+    if params:
+        kwargs.update(params)
+    if inspect.iscoroutinefunction(handler):
+        import asyncio
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(handler(**kwargs))
+        raise RuntimeError(f"Route '{path}' has an async handler and an event loop is running: "
+                           f"use 'await handle_request_async(...)' instead")
+    return handler(**kwargs)
+
+def set_executor(executor: Optional["Executor"]) -> None:
+    """Set the executor that runs plain handlers for handle_request_async.
+
+    Args:
+        executor (Optional[Executor]): Executor to use, or None for the event
+            loop's default thread pool.
+    """
+    global _executor
+    _executor = executor
+
+async def handle_request_async(path: str, **kwargs: Any) -> Any:
+    """Handle a request for a given route path without blocking the event loop.
+
+    ``async def`` handlers are awaited directly. Plain handlers, which may block
+    on a database, run in the executor set with set_executor(); they see the
+    caller's context variables, so bindings made with BaseModel.using() apply.
+
     Args:
         path (str): The request path.
         **kwargs: Request data.
-        
+
     Returns:
         Any: Result of the corresponding handler function,
             or an error message if the route is not found.
     """
-    if path in ROUTES:
-        return ROUTES[path](**kwargs)
-    return {"error": f"Route '{path}' not found"}
\ No newline at end of file
+    handler, params = resolve(path)
+    if handler is None:
+        return {"error": f"Route '{path}' not found"}
+    if params:
+        kwargs.update(params)
+    if inspect.iscoroutinefunction(handler):
+        return await handler(**kwargs)
+    import asyncio
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, handler, **kwargs)
+    return await loop.run_in_executor(_executor, call)
+
+async def gather_requests(requests: Iterable[Tuple[str, Dict[str, Any]]],
+                          limit: Optional[int] = None,
+                          return_exceptions: bool = False) -> List[Any]:
+    """Handle many requests concurrently on the running event loop.
+
+    Usage:
+        results = await gather_requests([
+            ("/users/get", {"user_id": 1}),
+            ("/products/get", {"product_id": 2}),
+        ], limit=100)
+
+    Args:
+        requests (Iterable[Tuple[str, Dict[str, Any]]]): Pairs of request path
+            and request data.
+        limit (int, optional): Maximum number of requests in flight at once.
+            Defaults to no limit.
+        return_exceptions (bool, optional): Return exceptions raised by handlers
+            as results instead of raising the first one. Defaults to False.
+
+    Returns:
+        List[Any]: Results in the same order as the requests.
+    """
+    import asyncio
+    if limit is None:
+        calls = [handle_request_async(path, **kwargs) for path, kwargs in requests]
+    else:
+        semaphore = asyncio.Semaphore(limit)
+
+        async def limited(path: str, kwargs: Dict[str, Any]) -> Any:
+            async with semaphore:
+                return await handle_request_async(path, **kwargs)
+
+        calls = [limited(path, kwargs) for path, kwargs in requests]
+    return await asyncio.gather(*calls, return_exceptions=return_exceptions)
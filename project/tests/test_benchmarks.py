@@ -0,0 +1,31 @@
+import json
+
+from benchmarks import suite
+from routes_decorator import ROUTES, ROUTE_TEMPLATES
+
+
+def test_compare_flags_slowdowns_beyond_tolerance():
+    """Test that only results slower than the tolerance are regressions."""
+    baseline = {"a": 1000.0, "b": 1000.0, "c": 1000.0, "gone": 5.0}
+    results = {"a": 800.0, "b": 700.0, "c": 1500.0, "new": 1.0}
+    assert suite.compare(results, baseline, tolerance=0.25) == ["b"]
+
+
+def test_suite_saves_and_checks_a_baseline(tmp_path):
+    """Test a tiny run against a baseline saved by the same run."""
+    path = str(tmp_path / "baseline.json")
+    args = ["--only", "dispatch/literal,crud/sqlite_memory", "--duration", "0.01", "--repeat", "1",
+            "--rows", "50"]
+    assert suite.main(args + ["--save", path]) == 0
+    assert "/bench/{value}/noop" not in ROUTE_TEMPLATES and "/bench/noop" not in ROUTES
+    results = json.load(open(path))["results"]
+    assert sorted(results) == [
+        "crud/sqlite_memory/rows=50/create",
+        "crud/sqlite_memory/rows=50/delete",
+        "crud/sqlite_memory/rows=50/get",
+        "crud/sqlite_memory/rows=50/update",
+        "dispatch/literal",
+    ]
+    results["dispatch/literal"] *= 1000
+    json.dump({"results": results}, open(path, "w"))
+    assert suite.main(args + ["--compare", path]) == 1
@@ -9,9 +9,13 @@ sys.path.append('D:\\Code\\labs\\python_labs\\module.py\\project')
 from controllers.user_controller import *
 from controllers.product_controller import *
 from controllers.database_controller import *
+from controllers.profiling_controller import *
+from db.query import encode_cursor
 from models.user import User
 from models.product import Product
-from routes_decorator import route, handle_request, ROUTES
+import asyncio
+import os
+from routes_decorator import route, unroute, resolve, handle_request, handle_request_async, gather_requests, ROUTES, ROUTE_TEMPLATES
 
 
 # --- User Controller Tests ---
@@ -92,18 +96,17 @@ def test_delete_user_nonexistent():
 def test_sql_create_user_valid_data(mock_user):
     """Test creating a user in SQL with valid data."""
     with patch.object(User, 'create', return_value=mock_user), \
-         patch.object(User, 'use_db'):
+         patch.object(User, 'using') as mock_using:
         result = sql_create_user({"username": "test_user", "email": "test@example.com"})
         assert result["status"] == "success"
         assert result["user"] == mock_user.to_dict()
-        User.use_db.assert_any_call("sqlite")
-        User.use_db.assert_any_call("default")
+        mock_using.assert_called_once_with("sqlite")
 
 
 def test_sql_get_user_with_invalid_id():
     """Test retrieving a user from SQL with invalid ID."""
     with patch.object(User, 'get', return_value=None), \
-         patch.object(User, 'use_db'):
+         patch.object(User, 'using'):
         result = sql_get_user("invalid_id")
         assert result["status"] == "error"
         assert "not found" in result["message"]
@@ -156,12 +159,81 @@ def test_update_product_valid_data(mock_product):
 def test_sql_delete_product_existing():
     """Test deleting an existing product from SQL."""
     with patch.object(Product, 'delete', return_value={"id": "1"}), \
-         patch.object(Product, 'use_db'):
+         patch.object(Product, 'using'):
         result = sql_delete_product("1")
         assert result["status"] == "success"
         assert "deleted" in result["message"]
 
 
+# --- Bulk Controller Tests ---
+
+def test_bulk_create_users(mock_user):
+    """Test creating several users with one request."""
+    records = [{"username": "a"}, {"username": "b"}]
+    with patch.object(User, 'bulk_create', return_value=[mock_user, mock_user]) as mock_create:
+        result = bulk_create_users(records)
+        assert result["status"] == "success"
+        assert len(result["users"]) == 2
+        mock_create.assert_called_once_with(records)
+
+
+def test_sql_bulk_delete_products():
+    """Test deleting several products from SQL with one request."""
+    deleted = [MagicMock(id=1), MagicMock(id=2)]
+    with patch.object(Product, 'bulk_delete', return_value=deleted), \
+         patch.object(Product, 'using') as mock_using:
+        result = sql_bulk_delete_products(["1", "2"])
+        assert result["status"] == "success"
+        assert result["deleted"] == [1, 2]
+        mock_using.assert_called_once_with("sqlite")
+
+
+# --- Model Query Tests ---
+
+def test_filter_declares_model_indexes():
+    """Test that filter() builds the model's declared indexes and uses them."""
+    from db.database import CustomDatabase
+
+    database = CustomDatabase("filter")
+    with patch.object(User, '_db_instance', database):
+        User.create(username="alice", email="alice@example.com")
+        User.create(username="bob", email="bob@example.com")
+        users = User.filter(email="bob@example.com")
+    assert [user.username for user in users] == ["bob"]
+    assert "email" in database.indexes["user"]
+
+    # Once built, declaring the indexes again must not block other readers
+    with patch.object(User, '_db_instance', database), \
+         patch.object(database._locks, 'write', side_effect=AssertionError("write lock taken")):
+        assert [user.username for user in User.filter(email="alice@example.com")] == ["alice"]
+
+
+def test_list_users_route_pages_with_token():
+    """Test that /users/list returns a token that leads to the next page."""
+    from db.database import CustomDatabase
+
+    with patch.object(User, '_db_instance', CustomDatabase("list")):
+        User.bulk_create([{"username": f"user{i}"} for i in range(5)])
+        first = handle_request("/users/list", limit=3)
+        second = handle_request("/users/list", limit=3, after=first["next"])
+    assert [user["username"] for user in first["users"]] == ["user0", "user1", "user2"]
+    assert [user["username"] for user in second["users"]] == ["user3", "user4"]
+    assert second["next"] is None
+
+
+def test_list_routes_reject_bad_tokens_and_limits():
+    """Test that a malformed or mistyped token or limit returns an error."""
+    assert "error" in handle_request("/users/list", after="not a token!")
+    assert "error" in handle_request("/sql/users/list", after="bm90IGpzb24=")
+    for position in ([1], True, 1.5, "1", [1, 2, 3], [-1, None]):
+        assert "error" in handle_request("/users/list", after=encode_cursor(position))
+        assert "error" in handle_request("/sql/products/list", after=encode_cursor(position))
+    assert "error" in handle_request("/test/products/list", limit=0)
+    assert "error" in handle_request("/products/list", limit=-1)
+    assert "error" in handle_request("/users/list", limit="5")
+    assert "error" in handle_request("/sql/users/list", limit=True)
+
+
 # --- Database Controller Tests ---
 
 def test_switch_database_valid_model():
@@ -268,6 +340,139 @@ def test_route_decorator():
     del ROUTES[test_path]
 
 
+def test_sql_route_does_not_switch_model_database():
+    """Test that an SQL route leaves the model's default database untouched, even on errors."""
+    default_db = User.current_db()
+    with patch.object(User, 'get', side_effect=RuntimeError("boom")):
+        with pytest.raises(RuntimeError):
+            sql_get_user("1")
+    assert User.current_db() is default_db
+
+
+def test_using_is_local_to_the_thread():
+    """Test that a database bound with using() is not seen by other threads."""
+    from concurrent.futures import ThreadPoolExecutor
+    from db.database import DatabaseRegistry
+
+    default_db = User.current_db()
+    with User.using("test"):
+        assert User.current_db() is DatabaseRegistry.get("test")
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(User.current_db).result() is default_db
+    assert User.current_db() is default_db
+
+
+def test_on_runs_call_on_bound_database():
+    """Test that Model.on() binds the database only for the proxied call."""
+    from db.database import DatabaseRegistry
+
+    seen = []
+    with patch.object(User, 'get', side_effect=lambda *args: seen.append(User.current_db())):
+        User.on("test").get("1")
+    assert seen == [DatabaseRegistry.get("test")]
+
+
+def test_route_template_passes_path_parameters():
+    """Test that {param} segments are matched and passed as keyword arguments."""
+    @route('/templated/{kind}/items/{item_id}')
+    def test_function(kind, item_id, extra=None):
+        return {"kind": kind, "item_id": item_id, "extra": extra}
+
+    try:
+        result = handle_request('/templated/books/items/42', extra="x")
+        assert result == {"kind": "books", "item_id": "42", "extra": "x"}
+        assert resolve('/templated/books/items')[0] is None
+        assert resolve('/templated//items/42')[0] is None
+    finally:
+        unroute('/templated/{kind}/items/{item_id}')
+    assert resolve('/templated/books/items/42')[0] is None
+    assert '/templated/{kind}/items/{item_id}' not in ROUTE_TEMPLATES
+
+
+def test_static_route_wins_over_template():
+    """Test that a literal path is preferred to a template matching the same path."""
+    handler, params = resolve('/sql/users/get')
+    assert handler is sql_get_user
+    assert params == {}
+
+    handler, params = resolve('/test/users/get')
+    assert handler is backend_get_user
+    assert params == {"backend": "test"}
+
+
+def test_backend_route_with_unknown_database():
+    """Test that naming a database that is not registered returns an error."""
+    assert handle_request('/missing/users/get', user_id="1") == {"error": "Database 'missing' not found"}
+    assert handle_request('/missing/products/list') == {"error": "Database 'missing' not found"}
+
+
+def test_backend_route_uses_named_database(mock_user):
+    """Test that the {backend} segment selects the database for the request only."""
+    from db.database import DatabaseRegistry
+
+    seen = []
+    def fake_get(*args):
+        seen.append(User.current_db())
+        return mock_user
+
+    with patch.object(User, 'get', side_effect=fake_get):
+        result = handle_request('/test/users/get', user_id="1")
+    assert result["status"] == "success"
+    assert seen == [DatabaseRegistry.get("test")]
+
+
+def test_handle_request_async_with_async_handler():
+    """Test awaiting an async def handler."""
+    test_path = "/async/test"
+
+    @route(test_path)
+    async def test_function(param=None):
+        return {"param": param}
+
+    result = asyncio.run(handle_request_async(test_path, param="value"))
+    assert result["param"] == "value"
+    assert handle_request(test_path, param="sync")["param"] == "sync"
+
+    async def inside_loop():
+        with pytest.raises(RuntimeError, match="handle_request_async"):
+            handle_request(test_path)
+    asyncio.run(inside_loop())
+
+    # Clean up
+    del ROUTES[test_path]
+
+
+def test_handle_request_async_runs_plain_handler_in_executor():
+    """Test that a plain handler runs off the event loop thread and sees bound databases."""
+    import threading
+    from db.database import DatabaseRegistry
+
+    test_path = "/async/plain"
+    ROUTES[test_path] = lambda: (threading.current_thread(), User.current_db())
+
+    async def call():
+        with User.using("test"):
+            return await handle_request_async(test_path)
+
+    thread, db = asyncio.run(call())
+    assert thread is not threading.main_thread()
+    assert db is DatabaseRegistry.get("test")
+
+    # Clean up
+    del ROUTES[test_path]
+
+
+def test_gather_requests_keeps_order():
+    """Test handling a batch of requests concurrently."""
+    with patch.object(User, 'get', side_effect=lambda user_id: None):
+        requests = [("/users/get", {"user_id": str(i)}) for i in range(20)]
+        requests.append(("/nonexistent/route", {}))
+        results = asyncio.run(gather_requests(requests, limit=5))
+    assert len(results) == 21
+    assert all(result["status"] == "error" for result in results[:20])
+    assert "not found" in results[20]["error"]
+
+
 # --- Edge Cases and Invalid Input Tests ---
 
 def test_create_user_special_characters():
@@ -286,6 +491,138 @@ def test_get_user_non_numeric_id():
         assert "not found" in result["message"]
 
 
+# --- Process Pool Tests ---
+
+def test_process_dispatcher_shares_sqlite_file(tmp_path):
+    """Test that worker processes serve requests against one SQLite file."""
+    from process_pool import ProcessDispatcher
+    path = str(tmp_path / "shared.db")
+    with ProcessDispatcher(workers=2, sqlite_path=path) as dispatcher:
+        created = dispatcher.handle_request("/sql/users/create", data={"username": "alice"})
+        assert created["status"] == "success"
+        user_id = created["user"]["id"]
+        results = dispatcher.map([("/sql/users/get", {"user_id": user_id})] * 8, chunksize=2)
+        assert all(result["user"]["username"] == "alice" for result in results)
+        assert asyncio.run(dispatcher.handle_request_async("/missing")) == {"error": "Route '/missing' not found"}
+
+
+# --- Metrics Tests ---
+
+def test_histogram_percentiles():
+    """Test that percentiles are within the bucket precision."""
+    from metrics import Histogram
+    histogram = Histogram()
+    for value in range(1, 100001):
+        histogram.record(value)
+    assert histogram.count == 100000
+    for quantile, expected in ((0.5, 50000), (0.95, 95000), (0.99, 99000)):
+        assert expected <= histogram.percentile(quantile) <= expected * 1.04
+    assert histogram.percentile(1.0) == 100000
+
+
+def test_metrics_record_routes_and_databases():
+    """Test per-route and per-database metrics and their removal."""
+    import metrics
+    from controllers.metrics_controller import get_metrics
+    from db.database import CustomDatabase, DatabaseRegistry
+    test_path = "/metrics_test/{outcome}"
+    route(test_path)(lambda outcome: {"error": "boom"} if outcome == "fail" else {"status": "success"})
+    metrics.reset()
+    metrics.enable()
+    try:
+        DatabaseRegistry.register("metrics_db", CustomDatabase("metrics_db"))
+        database = DatabaseRegistry.get("metrics_db")
+        database.get("user", 1)
+        handle_request("/metrics_test/ok")
+        handle_request("/metrics_test/fail")
+        assert asyncio.run(handle_request_async("/metrics_test/ok")) == {"status": "success"}
+        stats = metrics.snapshot()
+        assert stats["routes"][test_path]["calls"] == 3
+        assert stats["routes"][test_path]["errors"] == 1
+        assert stats["databases"]["metrics_db.get"]["count"] == 1
+        text = handle_request("/metrics")
+        assert 'route_requests_total{route="/metrics_test/{outcome}"} 3' in text
+        assert 'route_errors_total{route="/metrics_test/{outcome}"} 1' in text
+        assert 'db_operation_seconds_count{database="metrics_db",operation="get"} 1' in text
+        assert "# TYPE route_latency_seconds summary" in text
+    finally:
+        metrics.disable()
+    assert "get" not in database.__dict__
+    assert resolve("/metrics")[0] is get_metrics
+    handle_request("/metrics_test/ok")
+    assert metrics.snapshot()["routes"][test_path]["calls"] == 3
+    DatabaseRegistry._databases.pop("metrics_db")
+
+
+# --- Profiling Tests ---
+
+def test_profiling_hooks_see_routes_and_databases():
+    """Test before, after and error hooks around handlers and database calls."""
+    import profiling
+    from db.database import CustomDatabase, DatabaseRegistry
+    test_path = "/profiling_test/{outcome}"
+
+    @route(test_path)
+    def test_handler(outcome):
+        DatabaseRegistry.get("profiling_db").get("user", 1)
+        if outcome == "fail":
+            raise ValueError("boom")
+        return {"status": "success"}
+
+    events = []
+    hooks = profiling.add_hooks(
+        before=lambda call: events.append(("before", call.kind, call.name)),
+        after=lambda call: events.append(("after", call.kind, call.name, call.elapsed >= 0)),
+        error=lambda call: events.append(("error", call.kind, call.name, type(call.error).__name__)),
+    )
+    try:
+        DatabaseRegistry.register("profiling_db", CustomDatabase("profiling_db"))
+        handle_request("/profiling_test/ok")
+        with pytest.raises(ValueError):
+            handle_request("/profiling_test/fail")
+    finally:
+        profiling.remove_hooks(hooks)
+    assert events == [
+        ("before", "route", test_path),
+        ("before", "database", "profiling_db.get"),
+        ("after", "database", "profiling_db.get", True),
+        ("after", "route", test_path, True),
+        ("before", "route", test_path),
+        ("before", "database", "profiling_db.get"),
+        ("after", "database", "profiling_db.get", True),
+        ("error", "route", test_path, "ValueError"),
+    ]
+    handle_request("/profiling_test/ok")
+    assert len(events) == 8
+    assert resolve("/profiling_test/ok")[0] is test_handler
+    DatabaseRegistry._databases.pop("profiling_db")
+
+
+def test_profiling_samples_one_in_n_requests(tmp_path, monkeypatch):
+    """Test that sampled requests are profiled and dumped per route."""
+    import profiling
+    test_path = "/profiling_sampled"
+    route(test_path)(lambda: [{"id": i} for i in range(1000)])
+    profiling.reset_profiles()
+    assert handle_request("/profiling/start", every=3, memory=True, routes=[test_path])["message"]
+    try:
+        for _ in range(7):
+            assert len(handle_request(test_path)) == 1000
+        handle_request("/users/get", user_id=1)
+    finally:
+        handle_request("/profiling/stop")
+    profile = profiling.PROFILES[test_path]
+    assert profile.samples == 2
+    assert profile.peak_memory > 0
+    assert "<lambda>" in handle_request("/profiling/report", route_path=test_path)["report"]
+    assert "/users/get" not in profiling.PROFILES
+    monkeypatch.setattr(profiling, "PROFILE_DIRECTORY", str(tmp_path))
+    files = handle_request("/profiling/dump")["files"]
+    assert all(os.path.dirname(path) == str(tmp_path) for path in files)
+    assert sorted(os.path.basename(path) for path in files) == ["profiling_sampled.prof", "profiling_sampled.txt"]
+    del ROUTES[test_path]
+
+
 def run_tests_and_display_results():
     """Run all tests and display the results."""
     import pytest
@@ -303,4 +640,4 @@ if __name__ == "__main__":
     try:
         run_tests_and_display_results()
     except Exception as e:
-        print(f"Error running tests: {e}")
\ No newline at end of file
+        print(f"Error running tests: {e}")
@@ -0,0 +1,1099 @@
+import os
+import pytest
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from db.database import CustomDatabase, DatabaseRegistry
+from db.locks import RWLock
+from db.ids import BlockAllocator, FileBlockSource, SequenceAllocator, SnowflakeAllocator, UlidAllocator
+from db.replication import ReplicatedDatabase
+from db.schema import SCHEMAS, TableSchema
+from db.sharding import HashRing, ShardedDatabase
+from db.snapshot import open_snapshot, write_snapshot
+from db.sqlite_adapter import SqliteDatabase
+from db.write_behind import BackpressureTimeout, WriteBehindDatabase
+from models.user import User
+from models.product import Product
+
+
+@pytest.fixture(params=["custom", "sqlite"])
+def database(request):
+    """Create an empty database of each backend type."""
+    if request.param == "custom":
+        return CustomDatabase("bulk")
+    return SqliteDatabase(":memory:")
+
+
+# --- Bulk Operation Tests ---
+
+def test_create_many_assigns_ids(database):
+    """Test that bulk creation returns every record with its own ID."""
+    created = database.create_many("user", [
+        {"username": "alice", "email": "alice@example.com"},
+        {"username": "bob", "email": "bob@example.com"},
+        {"username": "carol"},
+    ])
+    assert [record["username"] for record in created] == ["alice", "bob", "carol"]
+    assert len({str(record["id"]) for record in created}) == 3
+    assert database.get("user", created[2]["id"])["username"] == "carol"
+
+
+def test_get_many_keeps_requested_order(database):
+    """Test that bulk retrieval follows the requested ID order and skips missing IDs."""
+    created = database.create_many("user", [{"username": "a"}, {"username": "b"}])
+    ids = [created[1]["id"], 999, created[0]["id"]]
+    assert [record["username"] for record in database.get_many("user", ids)] == ["b", "a"]
+
+
+def test_update_many(database):
+    """Test updating several records at once."""
+    created = database.create_many("user", [{"username": "a"}, {"username": "b"}])
+    updated = database.update_many("user", {
+        created[0]["id"]: {"email": "a@example.com"},
+        created[1]["id"]: {"email": "b@example.com"},
+    })
+    assert [record["email"] for record in updated] == ["a@example.com", "b@example.com"]
+    assert database.get("user", created[1]["id"])["email"] == "b@example.com"
+
+
+def test_delete_many(database):
+    """Test deleting several records at once."""
+    created = database.create_many("user", [{"username": "a"}, {"username": "b"}])
+    deleted = database.delete_many("user", [created[0]["id"], 999])
+    assert [record["username"] for record in deleted] == ["a"]
+    assert database.get("user", created[0]["id"]) is None
+    assert database.get("user", created[1]["id"]) is not None
+
+
+def test_sqlite_create_many_is_atomic():
+    """Test that an invalid record rolls back the whole SQLite batch."""
+    database = SqliteDatabase(":memory:")
+    result = database.create_many("user", [{"username": "a"}, {"unknown_column": "b"}])
+    assert result is None
+    assert database.get_many("user", [1, 2]) == []
+
+
+# --- Transaction Tests ---
+
+def test_transaction_commits_on_success(database):
+    """Test that changes made inside a transaction are kept."""
+    with database.transaction():
+        first = database.create("user", {"username": "a"})
+        database.update("user", first["id"], {"email": "a@example.com"})
+    assert database.get("user", first["id"])["email"] == "a@example.com"
+
+
+def test_transaction_rolls_back_on_error(database):
+    """Test that an exception undoes every change made in the block."""
+    kept = database.create("user", {"username": "kept"})
+    with pytest.raises(RuntimeError):
+        with database.transaction():
+            database.create("user", {"username": "lost"})
+            database.update("user", kept["id"], {"username": "changed"})
+            database.delete("user", kept["id"])
+            raise RuntimeError("boom")
+    assert database.get("user", kept["id"])["username"] == "kept"
+    assert [r["username"] for r in database.get_many("user", [kept["id"], 2])] == ["kept"]
+
+
+def test_nested_transaction_rolls_back_to_savepoint(database):
+    """Test that a failing inner block keeps the work of the outer block."""
+    with database.transaction():
+        outer = database.create("user", {"username": "outer"})
+        with pytest.raises(RuntimeError):
+            with database.transaction():
+                database.update("user", outer["id"], {"username": "inner"})
+                raise RuntimeError("boom")
+    assert database.get("user", outer["id"])["username"] == "outer"
+
+
+# --- Connection Pool Tests ---
+
+def test_sqlite_serves_concurrent_threads(tmp_path):
+    """Test that one SqliteDatabase can be shared by many threads."""
+    database = SqliteDatabase(str(tmp_path / "pool.db"), pool_size=4)
+
+    def create_and_read(index):
+        record = database.create("user", {"username": f"user{index}"})
+        return database.get("user", record["id"])["username"]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        names = list(executor.map(create_and_read, range(50)))
+
+    assert names == [f"user{index}" for index in range(50)]
+    assert len(database.pool._all) <= 4
+    database.close()
+
+
+def test_sqlite_transaction_is_isolated_per_thread(tmp_path):
+    """Test that a transaction in one thread does not capture other threads' writes."""
+    database = SqliteDatabase(str(tmp_path / "pool.db"), pool_size=2)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with pytest.raises(RuntimeError):
+            with database.transaction():
+                database.create("user", {"username": "rolled back"})
+                # Waits for the write lock, then commits on its own connection
+                other = executor.submit(database.create, "user", {"username": "kept"})
+                raise RuntimeError("boom")
+        kept = other.result(timeout=10)
+
+    assert database.get("user", kept["id"])["username"] == "kept"
+    assert [r["username"] for r in database.get_many("user", [1, 2])] == ["kept"]
+    database.close()
+
+
+def test_sqlite_never_pools_an_open_transaction(tmp_path):
+    """Test that connections go back to the pool outside any transaction."""
+    database = SqliteDatabase(str(tmp_path / "pool.db"), pool_size=1)
+    with pytest.raises(RuntimeError, match="boom"):
+        with database.transaction():
+            database.create("user", {"username": "lost"})
+            # SQLite ended the transaction on its own, so ROLLBACK fails
+            database._local.connection.execute("ROLLBACK")
+            raise RuntimeError("boom")
+
+    table = database._table("user").table
+    with database.pool.connection() as connection:
+        connection.execute("BEGIN")
+        connection.execute(f"INSERT INTO {table} (username) VALUES ('left open')")
+    with database.pool.connection() as connection:
+        assert not connection.in_transaction
+    database.create("user", {"username": "kept"})
+    assert [r["username"] for r in database.find("user", {})] == ["kept"]
+    database.close()
+
+
+# --- Query and Index Tests ---
+
+@pytest.fixture
+def products():
+    """Create an in-memory database with a few products."""
+    database = CustomDatabase("query")
+    database.create_many("product", [
+        {"name": "pen", "price": 2.5},
+        {"name": "book", "price": 12.0},
+        {"name": "lamp", "price": 30.0},
+        {"name": "gift card"},
+    ])
+    return database
+
+
+def test_find_without_index_scans(products):
+    """Test equality and range conditions without any index."""
+    assert [r["name"] for r in products.find("product", {"price__gte": 10})] == ["book", "lamp"]
+    assert [r["name"] for r in products.find("product", {"name__in": ["pen", "lamp"]})] == ["pen", "lamp"]
+    assert products.find("product", {"price__lt": 10, "name": "book"}) == []
+
+
+def test_find_with_indexes_matches_scan(products):
+    """Test that indexed lookups return the same records as a scan."""
+    conditions = [{"price__gte": 2.5, "price__lt": 30}, {"price": 30.0}, {"name": "pen"}, {"price__gt": 100}]
+    expected = [products.find("product", where) for where in conditions]
+
+    products.create_index("product", "price", "sorted")
+    products.create_index("product", "name", "hash")
+    assert [products.find("product", where) for where in conditions] == expected
+
+
+def test_sorted_index_finds_none_and_unordered_values(products):
+    """Test that lookups of None or of values the index cannot order match a scan."""
+    products.create("product", {"name": "free", "price": None})
+    products.create("product", {"name": "quote", "price": "on request"})
+    conditions = [{"price": None}, {"price": "on request"}, {"price__gte": "a"}, {"price": None, "name": "free"}]
+    expected = [products.find("product", where) for where in conditions]
+    assert all(expected)
+
+    products.create_index("product", "price", "sorted")
+    assert [products.find("product", where) for where in conditions] == expected
+    products.delete("product", expected[3][0]["id"])
+    assert products.find("product", {"price": None}) == expected[0][:-1]
+
+def test_indexes_follow_writes_and_rollbacks(products):
+    """Test that indexes are maintained on update, delete and rollback."""
+    products.create_index("product", "price", "sorted")
+    products.create_index("product", "name", "hash")
+
+    products.update("product", "1", {"price": 50.0, "name": "fountain pen"})
+    products.delete("product", "2")
+    with pytest.raises(RuntimeError):
+        with products.transaction():
+            products.update("product", "3", {"price": 1.0})
+            raise RuntimeError("boom")
+
+    assert [r["name"] for r in products.find("product", {"price__gte": 10})] == ["lamp", "fountain pen"]
+    assert products.find("product", {"name": "pen"}) == []
+    assert [r["id"] for r in products.find("product", {"name": "fountain pen"})] == [1]
+
+
+def test_find_rejects_unknown_operator(products):
+    """Test that an unsupported operator is reported."""
+    with pytest.raises(ValueError):
+        products.find("product", {"price__between": (1, 2)})
+
+
+@pytest.fixture(params=["custom", "sqlite"])
+def product_table(request):
+    """Create a database of each backend type holding a few products."""
+    database = CustomDatabase("query") if request.param == "custom" else SqliteDatabase(":memory:")
+    database.create_many("product", [
+        {"name": "pen", "price": 2.5, "quantity": 100},
+        {"name": "book", "price": 12.0, "quantity": 5},
+        {"name": "lamp", "price": 30.0, "quantity": 5},
+        {"name": "gift card", "quantity": 0},
+    ])
+    return database
+
+
+def test_find_orders_pages_and_projects(product_table):
+    """Test that both backends sort, page and project query results the same way."""
+    found = product_table.find("product", {"quantity__lt": 50}, order_by=["quantity", "-price"],
+                               limit=2, offset=1, fields=["name", "price"])
+    assert found == [{"name": "lamp", "price": 30.0}, {"name": "book", "price": 12.0}]
+
+
+def test_find_handles_nulls_like_python(product_table):
+    """Test equality with None and ne on missing values."""
+    assert [r["name"] for r in product_table.find("product", {"price": None})] == ["gift card"]
+    names = [r["name"] for r in product_table.find("product", {"price__ne": 12.0}, order_by="name")]
+    assert names == ["gift card", "lamp", "pen"]
+
+
+def test_sqlite_find_uses_index():
+    """Test that SQLite plans indexed filters as index searches."""
+    database = SqliteDatabase(":memory:")
+    database.create_index("product", "price")
+    sql = "EXPLAIN QUERY PLAN SELECT * FROM product WHERE price >= ?"
+    with database.pool.connection() as connection:
+        plan = " ".join(str(row) for row in connection.execute(sql, (10,)))
+    assert "idx_product_price" in plan
+
+
+def test_sqlite_find_rejects_unsafe_field_names():
+    """Test that field names cannot inject SQL."""
+    with pytest.raises(ValueError):
+        SqliteDatabase(":memory:").find("product", {"price; DROP TABLE product": 1})
+
+
+# --- Streaming and Pagination Tests ---
+
+def test_iter_records_streams_everything(database):
+    """Test that iteration visits every record once, across batch boundaries."""
+    database.create_many("user", [{"username": f"user{i}"} for i in range(25)])
+    names = [record["username"] for record in database.iter_records("user", batch_size=10)]
+    assert names == [f"user{i}" for i in range(25)]
+
+
+def test_page_tokens_walk_all_pages(database):
+    """Test that keyset pages cover the table once and skip deleted records."""
+    created = database.create_many("user", [{"username": f"user{i}"} for i in range(10)])
+    database.delete("user", created[4]["id"])
+
+    names, cursor = [], None
+    while True:
+        records, cursor = database.page("user", 3, cursor)
+        names.extend(record["username"] for record in records)
+        if cursor is None:
+            break
+    assert names == [f"user{i}" for i in range(10) if i != 4]
+
+
+def test_page_cursor_survives_writes(database):
+    """Test that a cursor stays valid when records before it are deleted."""
+    created = database.create_many("user", [{"username": f"user{i}"} for i in range(6)])
+    first, cursor = database.page("user", 3)
+    database.delete("user", created[0]["id"])
+    database.delete("user", created[2]["id"])
+    second, cursor = database.page("user", 3, cursor)
+    assert [record["username"] for record in second] == ["user3", "user4", "user5"]
+    assert cursor is None
+
+
+def test_insertion_order_compacts_stale_entries():
+    """Test that deleted records are eventually dropped from the insertion order."""
+    database = CustomDatabase("compact")
+    created = database.create_many("user", [{"username": str(i)} for i in range(3000)])
+    database.delete_many("user", [record["id"] for record in created[:2000]])
+    assert len(database.order["user"]._seqs) < 3000
+    assert [record["username"] for record in database.iter_records("user")] == [str(i) for i in range(2000, 3000)]
+
+
+# --- Cache Tests ---
+
+class FakeClock:
+    """Manually advanced time source."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def cached():
+    """Create a small cache in front of an in-memory SQLite database."""
+    from db.cache import CachedDatabase
+
+    clock = FakeClock()
+    cache = CachedDatabase(SqliteDatabase(":memory:"), capacity=2, ttl=10, clock=clock)
+    cache.clock = clock
+    return cache
+
+
+def test_cache_hits_after_first_read(cached):
+    """Test that repeated reads are answered from the cache."""
+    record = cached.backend.create("user", {"username": "a"})
+    assert cached.get("user", record["id"])["username"] == "a"
+    assert cached.get("user", str(record["id"]))["username"] == "a"
+    assert (cached.hits, cached.misses) == (1, 1)
+
+
+def test_cache_evicts_least_recently_used(cached):
+    """Test that the cache stays within capacity, dropping the oldest entry."""
+    ids = [record["id"] for record in cached.create_many("user", [{"username": str(i)} for i in range(3)])]
+    assert cached.stats()["size"] == 2
+    assert cached.evictions == 1
+    cached.get("user", ids[0])
+    assert cached.misses == 1
+
+
+def test_cache_expires_entries(cached):
+    """Test that an entry older than the TTL is read again."""
+    record = cached.create("user", {"username": "a"})
+    cached.clock.now = 11
+    cached.get("user", record["id"])
+    assert (cached.expirations, cached.misses) == (1, 1)
+
+
+def test_cache_writes_through(cached):
+    """Test that updates and deletes are never hidden by the cache."""
+    record = cached.create("user", {"username": "a"})
+    cached.update("user", record["id"], {"username": "b"})
+    assert cached.get("user", record["id"])["username"] == "b"
+    cached.delete("user", record["id"])
+    assert cached.get("user", record["id"]) is None
+
+
+def test_cache_does_not_share_records_with_callers(cached):
+    """Test that changing a record passed in or handed out leaves the cached copy alone."""
+    data = {"username": "a"}
+    record = cached.create("user", data)
+    data["username"] = "changed"
+    record["username"] = "changed"
+    cached.get("user", record["id"])["username"] = "changed"
+    assert cached.get("user", record["id"])["username"] == "a"
+
+def test_cache_is_cleared_on_rollback(cached):
+    """Test that writes undone by a rollback do not linger in the cache."""
+    record = cached.create("user", {"username": "a"})
+    with pytest.raises(RuntimeError):
+        with cached.transaction():
+            cached.update("user", record["id"], {"username": "b"})
+            raise RuntimeError("boom")
+    assert cached.get("user", record["id"])["username"] == "a"
+
+
+# --- Schema Tests ---
+
+def test_schema_follows_model_annotations():
+    """Test that the table layout is derived from the model fields."""
+    schema = SCHEMAS["product"]
+    assert schema.columns == Product.__fields__
+    assert schema.definitions["id"] == "INTEGER PRIMARY KEY AUTOINCREMENT"
+    assert schema.definitions["name"] == "TEXT NOT NULL"
+    assert schema.definitions["price"] == "REAL"
+    assert schema.definitions["quantity"] == "INTEGER DEFAULT 0 NOT NULL"
+    assert schema.indexes == {"price": "sorted"}
+
+
+def test_sqlite_creates_tables_from_schemas():
+    """Test that SQLite creates a model table on first use, with its defaults and constraints."""
+    database = SqliteDatabase(":memory:")
+    product = database.create("product", {"name": "pen"})
+    assert database.get("product", product["id"])["quantity"] == 0
+    assert database.create("product", {"price": 1.0}) is None
+    assert database.create("user", {"username": "a", "name": "Alice"}) is None
+
+
+def test_sqlite_rejects_tables_without_schema():
+    """Test that using a table no model defines is reported instead of silently failing."""
+    database = SqliteDatabase(":memory:")
+    with pytest.raises(ValueError, match="No schema registered"):
+        database.create("unknown_model", {"name": "x"})
+    with pytest.raises(ValueError):
+        database.find("unknown_model", {})
+
+def test_statements_are_prepared_once():
+    """Test that statements for known columns are cached and unknown columns are checked."""
+    schema = TableSchema("item", {"id": "INTEGER PRIMARY KEY", "name": "TEXT"})
+    assert schema.insert_sql(("name",)) is schema.insert_sql(("name",))
+    assert schema.update_sql(("name",)) == "UPDATE item SET name=? WHERE id=?"
+    with pytest.raises(ValueError):
+        schema.insert_sql(("name) VALUES (1); --",))
+
+
+# --- Row Factory Tests ---
+
+@pytest.mark.parametrize("row_factory", ["dict", "row", "model"])
+def test_row_factories_return_same_data(row_factory):
+    """Test that every row factory yields records with the same fields and values."""
+    database = SqliteDatabase(":memory:", row_factory=row_factory)
+    created = database.create_many("user", [{"username": f"user{i}", "email": f"{i}@x"} for i in range(3)])
+    ids = [record["id"] for record in created]
+
+    record = database.get("user", ids[0])
+    assert record["username"] == "user0"
+    assert [r["email"] for r in database.get_many("user", ids[::-1])] == ["2@x", "1@x", "0@x"]
+    assert [r["id"] for r in database.find("user", {"id__gt": ids[0]})] == ids[1:]
+    records, cursor = database.page("user", 2)
+    assert [r["id"] for r in records] == ids[:2] and cursor == ids[1]
+    assert User._from_record(record).to_dict() == {
+        "id": ids[0], "username": "user0", "email": "0@x", "created_at": None,
+    }
+    if row_factory == "model":
+        assert type(record) is User
+
+
+def test_unknown_row_factory():
+    """Test that an unknown row factory is rejected."""
+    with pytest.raises(ValueError):
+        SqliteDatabase(":memory:", row_factory="namedtuple")
+
+
+@pytest.mark.parametrize("row_factory", ["row", "model"])
+def test_wrappers_require_dict_records(row_factory):
+    """Test that the wrapping databases refuse a database returning rows or models."""
+    from db.cache import CachedDatabase
+
+    database = SqliteDatabase(":memory:", row_factory=row_factory)
+    with pytest.raises(ValueError):
+        CachedDatabase(database)
+    with pytest.raises(ValueError):
+        WriteBehindDatabase(database)
+    DatabaseRegistry.register("model_rows", database)
+    try:
+        with pytest.raises(ValueError):
+            ReplicatedDatabase("model_rows", [])
+        with pytest.raises(ValueError):
+            ShardedDatabase(["model_rows"])
+    finally:
+        DatabaseRegistry._databases.pop("model_rows")
+
+# --- Persistence Tests ---
+
+def test_persistent_database_recovers_from_log(tmp_path):
+    """Test that creates, updates and deletes survive a restart."""
+    database = CustomDatabase("durable", path=str(tmp_path))
+    first = database.create("user", {"username": "a"})
+    second = database.create("user", {"username": "b"})
+    database.update("user", first["id"], {"email": "a@example.com"})
+    database.delete("user", second["id"])
+    database.close()
+
+    recovered = CustomDatabase("durable", path=str(tmp_path))
+    assert recovered.get("user", first["id"]) == {"username": "a", "id": first["id"], "email": "a@example.com"}
+    assert recovered.get("user", second["id"]) is None
+
+
+def test_snapshot_replays_only_the_log_tail(tmp_path):
+    """Test that a snapshot replaces the log it covers and later changes are replayed on top."""
+    database = CustomDatabase("durable", path=str(tmp_path), snapshot_every=3)
+    for name in ("a", "b", "c", "d"):
+        database.create("user", {"username": name})
+    database.close()
+    assert len(list((tmp_path / "wal").iterdir())) == 1
+
+    recovered = CustomDatabase("durable", path=str(tmp_path))
+    assert [r["username"] for r in recovered.iter_records("user")] == ["a", "b", "c", "d"]
+    assert recovered._logged == 1
+
+
+def test_transactions_and_bulk_writes_trigger_snapshots(tmp_path):
+    """Test that changes logged by transactions and bulk writes count towards snapshot_every."""
+    database = CustomDatabase("durable", path=str(tmp_path), snapshot_every=3)
+    with database.transaction():
+        database.create("user", {"username": "a"})
+        database.create("user", {"username": "b"})
+    database.create_many("user", [{"username": "c"}, {"username": "d"}])
+    assert database._logged == 0
+    database.close()
+    assert len(list((tmp_path / "wal").iterdir())) == 1
+    assert len(list(CustomDatabase("durable", path=str(tmp_path)).iter_records("user"))) == 4
+
+
+def test_interval_policy_syncs_in_the_background(tmp_path):
+    """Test that the "interval" policy forces entries to disk without further writes."""
+    from db.persistence import WriteAheadLog
+
+    log = WriteAheadLog(str(tmp_path), fsync="interval", interval=0.01)
+    lsn = log.append([("put", "user", 1, {"username": "a"})])
+    deadline = time.monotonic() + 5
+    while log._synced < lsn and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert log._synced == lsn
+    log.close()
+
+def test_rolled_back_and_torn_entries_are_not_recovered(tmp_path):
+    """Test that a rolled back transaction is never logged and a torn last line is ignored."""
+    database = CustomDatabase("durable", path=str(tmp_path), fsync="never")
+    with database.transaction():
+        database.create("user", {"username": "kept"})
+    with pytest.raises(RuntimeError):
+        with database.transaction():
+            database.create("user", {"username": "lost"})
+            raise RuntimeError("boom")
+    database.close()
+    segment = next((tmp_path / "wal").iterdir())
+    with open(segment, "ab") as file:
+        file.write(b'{"lsn": 9, "ops": [["put", "user"')
+
+    recovered = CustomDatabase("durable", path=str(tmp_path))
+    assert [r["username"] for r in recovered.iter_records("user")] == ["kept"]
+    recovered.create("user", {"username": "after"})
+    recovered.close()
+    assert len(list(CustomDatabase("durable", path=str(tmp_path)).iter_records("user"))) == 2
+
+
+def test_group_commit_from_many_threads(tmp_path):
+    """Test that concurrent durable writes all reach the log."""
+    database = CustomDatabase("durable", path=str(tmp_path))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda i: database.create(f"model{i}", {"n": i}), range(40)))
+    database.close()
+    recovered = CustomDatabase("durable", path=str(tmp_path))
+    assert sorted(recovered.get(f"model{i}", "1")["n"] for i in range(40)) == list(range(40))
+
+
+# --- Snapshot Tests ---
+
+def test_snapshot_round_trip(tmp_path):
+    """Test that the binary snapshot keeps value types, None and missing fields."""
+    path = str(tmp_path / "snapshot.bin")
+    records = [
+        {"id": 1, "name": "a", "price": 1.5, "tags": ["x"], "flag": True},
+        {"id": 2, "name": None, "price": 2.0},
+        {"id": 3, "name": "ü", "price": None, "tags": {"k": 1}, "flag": False},
+    ]
+    write_snapshot(path, 7, {"item": records, "empty": []})
+    snapshot = open_snapshot(path)
+    assert snapshot.lsn == 7
+    assert [record for _, record in snapshot.tables["item"].take_all()] == records
+    assert list(snapshot.tables["empty"].take_all()) == []
+    snapshot.close()
+    assert open_snapshot(str(tmp_path / "missing.bin")) is None
+
+
+def test_snapshot_records_are_decoded_on_demand(tmp_path):
+    """Test that lookups decode single records and scans keep the insertion order."""
+    database = CustomDatabase("durable", path=str(tmp_path))
+    for name in ("a", "b", "c"):
+        database.create("user", {"username": name})
+    database.snapshot()
+    database.close()
+
+    recovered = CustomDatabase("durable", path=str(tmp_path))
+    assert recovered.get("user", "2")["username"] == "b"
+    assert recovered.delete("user", "1")
+    assert recovered._cold["user"].remaining == 1
+    assert [r["username"] for r in recovered.iter_records("user")] == ["b", "c"]
+    assert "user" not in recovered._cold
+    recovered.close()
+
+
+# --- ID Allocation Tests ---
+
+def test_ids_are_not_reused_after_delete():
+    """Test that a deleted record's ID is never handed out again."""
+    database = CustomDatabase("ids")
+    first = database.create("user", {"username": "a"})
+    database.create("user", {"username": "b"})
+    database.delete("user", first["id"])
+    third = database.create("user", {"username": "c"})
+    assert third["id"] == 3
+    assert database.get("user", "2")["username"] == "b"
+    assert len(database.data["user"]) == 2
+
+
+def test_explicit_ids_never_rewind_the_sequence():
+    """Test that creating a record with an ID below the sequence does not move it back."""
+    database = CustomDatabase("ids")
+    for i in range(5):
+        database.create("user", {"username": str(i)})
+    for obj_id in (3, 4, 5):
+        database.delete("user", obj_id)
+    database.create("user", {"id": 3, "username": "explicit"})
+    assert database.create("user", {"username": "next"})["id"] == 6
+
+def test_concurrent_creates_get_distinct_ids():
+    """Test that IDs handed out from many threads never collide."""
+    database = CustomDatabase("ids")
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        created = list(executor.map(lambda i: database.create("user", {"n": i}), range(2000)))
+    assert sorted(record["id"] for record in created) == list(range(1, 2001))
+
+
+def test_ids_continue_after_recovery(tmp_path):
+    """Test that recovered snapshots and logs move the sequence past their IDs."""
+    database = CustomDatabase("durable", path=str(tmp_path))
+    for name in ("a", "b"):
+        database.create("user", {"username": name})
+    database.snapshot()
+    database.create("user", {"username": "c"})
+    database.close()
+
+    recovered = CustomDatabase("durable", path=str(tmp_path))
+    assert recovered._cold["user"]._sorted
+    assert recovered.create("user", {"username": "d"})["id"] == 4
+    recovered.close()
+
+
+def test_ids_continue_after_scanning_a_recovered_snapshot(tmp_path):
+    """Test that decoding a whole snapshot before the first create keeps the sequence."""
+    database = CustomDatabase("durable", path=str(tmp_path))
+    for name in ("a", "b", "c"):
+        database.create("user", {"username": name})
+    database.snapshot()
+    database.close()
+
+    recovered = CustomDatabase("durable", path=str(tmp_path))
+    assert len(list(recovered.iter_records("user"))) == 3
+    assert recovered.create("user", {"username": "d"})["id"] == 4
+    recovered.close()
+
+
+def test_sequence_ids_stay_distinct_while_observing():
+    """Test that moving the sequence forward never hands out an ID twice."""
+    allocator = SequenceAllocator()
+
+    def draw(i):
+        obj_id = allocator.next()
+        # E.g. recovery replaying IDs while other threads create records
+        allocator.observe(obj_id)
+        return obj_id
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            ids = list(executor.map(draw, range(20000)))
+    finally:
+        sys.setswitchinterval(interval)
+    assert len(set(ids)) == len(ids)
+
+
+def test_id_strategies():
+    """Test that snowflake and ULID IDs increase even within one millisecond."""
+    snowflakes = SnowflakeAllocator(worker=3, clock=lambda: 1700000000.0)
+    ids = [snowflakes.next() for _ in range(5000)]
+    assert ids == sorted(set(ids))
+    assert all((obj_id >> 12) & 1023 == 3 for obj_id in ids)
+
+    assert SnowflakeAllocator().worker == os.getpid() % 1024
+    ulids = UlidAllocator(clock=lambda: 1700000000.0)
+    ids = [ulids.next() for _ in range(100)]
+    assert ids == sorted(set(ids)) and all(len(obj_id) == 26 for obj_id in ids)
+    database = CustomDatabase("ids", id_strategy="ulid")
+    record = database.create("user", {"username": "a"})
+    assert database.get("user", record["id"]) == record
+
+    with pytest.raises(ValueError):
+        CustomDatabase("ids", id_strategy="uuid")
+
+
+def test_block_allocators_share_a_counter_file(tmp_path):
+    """Test that allocators reserving blocks from one file never overlap."""
+    source = FileBlockSource(str(tmp_path / "ids"))
+    first, second = BlockAllocator(source, block_size=10), BlockAllocator(source, block_size=10)
+    ids = [allocator.next() for _ in range(25) for allocator in (first, second)]
+    assert len(set(ids)) == 50
+    assert first.next() < first.next()
+
+
+# --- Concurrency Tests ---
+
+@pytest.mark.parametrize("mode", ["model", "striped"])
+def test_concurrent_updates_are_not_lost(mode):
+    """Test that increments from many threads all land with a locking mode."""
+    database = CustomDatabase("shared", concurrency=mode)
+    database.create_many("user", [{"visits": 0} for _ in range(4)])
+    database.create_index("user", "group")
+    lock = threading.Lock()
+
+    def work(i):
+        obj_id = i % 4 + 1
+        with lock:
+            visits = database.get("user", obj_id)["visits"]
+            database.update("user", obj_id, {"visits": visits + 1})
+        database.update("user", obj_id, {"group": i % 3})
+        database.create("event", {"n": i})
+        return database.find("user", {"group": i % 3})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(work, range(400)))
+    assert sum(r["visits"] for r in database.find("user", {})) == 400
+    assert len(list(database.iter_records("event", batch_size=7))) == 400
+    assert sorted(r["id"] for r in database.find("user", {"group__gte": 0})) == [1, 2, 3, 4]
+
+
+def test_transaction_holds_back_other_writers():
+    """Test that another thread's write waits for a transaction and survives its rollback."""
+    database = CustomDatabase("shared", concurrency="striped")
+    record = database.create("user", {"username": "a"})
+    started, written = threading.Event(), []
+
+    def writer():
+        started.set()
+        written.append(database.create("user", {"username": "b"}))
+
+    with pytest.raises(RuntimeError):
+        with database.transaction():
+            database.update("user", record["id"], {"username": "changed"})
+            thread = threading.Thread(target=writer)
+            thread.start()
+            started.wait()
+            thread.join(0.1)
+            assert not written
+            raise RuntimeError("boom")
+    thread.join()
+    assert database.get("user", record["id"])["username"] == "a"
+    assert database.get("user", written[0]["id"])["username"] == "b"
+
+
+def test_rw_lock():
+    """Test reader sharing, writer reentrancy and the refused upgrade."""
+    lock = RWLock()
+    inside = threading.Barrier(2, timeout=1)
+
+    def reader():
+        with lock.read():
+            inside.wait()
+
+    threads = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with lock.write(), lock.read(), lock.write():
+        pass
+    with lock.read():
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+    with pytest.raises(ValueError):
+        CustomDatabase("shared", concurrency="global")
+
+
+# --- Sharding Tests ---
+
+@pytest.fixture
+def sharded(tmp_path):
+    """Shard over two in-memory databases and one SQLite file."""
+    names = ["shard_a", "shard_b", "shard_c"]
+    DatabaseRegistry.register("shard_a", CustomDatabase("shard_a"))
+    DatabaseRegistry.register("shard_b", CustomDatabase("shard_b"))
+    DatabaseRegistry.register("shard_c", SqliteDatabase(str(tmp_path / "shard_c.db")))
+    database = ShardedDatabase(names)
+    yield database
+    database.close()
+    for name in names:
+        DatabaseRegistry._databases.pop(name)
+
+
+def test_sharded_records_spread_over_shards(sharded):
+    """Test that records land on the shard of their ID and are found there."""
+    created = sharded.create_many("user", [{"username": f"user{i}", "email": f"{i}@x"} for i in range(60)])
+    assert [record["username"] for record in created] == [f"user{i}" for i in range(60)]
+    for record in created:
+        assert sharded.shard_for(record["id"]).get("user", record["id"])["username"] == record["username"]
+    counts = [len(shard.find("user", {})) for shard in sharded.shards.values()]
+    assert sum(counts) == 60 and all(counts)
+
+    single = sharded.create("user", {"username": "solo"})
+    assert sharded.get("user", str(single["id"]))["username"] == "solo"
+    sharded.update("user", single["id"], {"email": "solo@x"})
+    assert sharded.get("user", single["id"])["email"] == "solo@x"
+    assert sharded.delete("user", single["id"])["username"] == "solo"
+    ids = [created[5]["id"], 12345, created[1]["id"]]
+    assert [r["username"] for r in sharded.get_many("user", ids)] == ["user5", "user1"]
+
+
+def test_sharded_scatter_gather_queries(sharded):
+    """Test that queries combine, sort and page the results of every shard."""
+    sharded.create_many("user", [{"username": f"user{i:02}"} for i in range(30)])
+    top = sharded.find("user", {"username__gte": "user10"}, order_by="-username", limit=3, offset=1,
+                       fields=["username"])
+    assert top == [{"username": "user28"}, {"username": "user27"}, {"username": "user26"}]
+    assert len(sharded.find("user", {})) == 30
+
+    seen, cursor = [], None
+    while True:
+        records, cursor = sharded.page("user", 7, cursor)
+        seen.extend(record["username"] for record in records)
+        if cursor is None:
+            break
+    assert sorted(seen) == [f"user{i:02}" for i in range(30)]
+    with pytest.raises(ValueError):
+        sharded.page("user", 7, 3)
+    assert len(list(sharded.iter_records("user", batch_size=4))) == 30
+
+
+def test_sharded_create_many_is_all_or_nothing(sharded):
+    """Test that a batch rejected by one shard is rolled back on the others."""
+    custom_id = next(i for i in range(1, 1000) if sharded.ring.node(i) == "shard_a")
+    sqlite_id = next(i for i in range(1, 1000) if sharded.ring.node(i) == "shard_c")
+    batch = [{"id": custom_id, "username": "a"}, {"id": sqlite_id, "username": "c", "no_such_column": 1}]
+    assert sharded.create_many("user", batch) is None
+    assert sharded.get("user", custom_id) is None
+
+
+def test_sharded_queries_see_their_transaction(tmp_path):
+    """Test that a query inside a transaction sees its uncommitted writes on SQLite shards."""
+    names = ["sql_shard_a", "sql_shard_b"]
+    for name in names:
+        DatabaseRegistry.register(name, SqliteDatabase(str(tmp_path / f"{name}.db")))
+    sharded = ShardedDatabase(names)
+    try:
+        with sharded.transaction():
+            for i in range(4):
+                sharded.create("user", {"username": f"user{i}"})
+            assert sorted(r["username"] for r in sharded.find("user", {})) == [f"user{i}" for i in range(4)]
+        assert len(sharded.find("user", {})) == 4
+    finally:
+        sharded.close()
+        for name in names:
+            DatabaseRegistry._databases.pop(name).close()
+
+
+def test_hash_ring_moves_few_keys():
+    """Test that adding a node only moves the keys it takes over."""
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+    moved = [key for key in range(3000) if before.node(key) != after.node(key)]
+    assert all(after.node(key) == "d" for key in moved)
+    assert len(moved) < 1200
+    assert before.node(7) == before.node("7")
+
+
+# --- Replication Tests ---
+
+class _GatedDatabase(CustomDatabase):
+    """In-memory replica that applies new records only once allowed to."""
+
+    def __init__(self, name):
+        super().__init__(name, concurrency="model")
+        self.gate = threading.Event()
+
+    def create(self, model_name, data):
+        self.gate.wait(5)
+        return super().create(model_name, data)
+
+
+@pytest.fixture
+def replicated(tmp_path):
+    """Replicate a SQLite primary to two in-memory replicas."""
+    names = ["primary", "replica_1", "replica_2"]
+    DatabaseRegistry.register("primary", SqliteDatabase(str(tmp_path / "primary.db")))
+    DatabaseRegistry.register("replica_1", CustomDatabase("replica_1", concurrency="model"))
+    DatabaseRegistry.register("replica_2", _GatedDatabase("replica_2"))
+    yield names
+    for name in names:
+        DatabaseRegistry._databases.pop(name)
+
+
+def test_replicas_serve_reads_after_catching_up(replicated):
+    """Test that writes reach every replica and reads are spread over them."""
+    DatabaseRegistry.get("replica_2").gate.set()
+    database = ReplicatedDatabase("primary", ["replica_1", "replica_2"])
+    created = database.create_many("user", [{"username": f"user{i}"} for i in range(4)])
+    database.update("user", created[0]["id"], {"email": "a@x"})
+    database.delete("user", created[1]["id"])
+    assert database.wait_for_replicas(5)
+    for name in ("replica_1", "replica_2"):
+        replica = DatabaseRegistry.get(name)
+        assert replica.get("user", created[0]["id"])["email"] == "a@x"
+        assert replica.get("user", created[1]["id"]) is None
+    for _ in range(4):
+        assert database.get("user", created[2]["id"])["username"] == "user2"
+    stats = database.stats()
+    assert [stats["replicas"][name]["reads"] for name in ("replica_1", "replica_2")] == [2, 2]
+    assert stats["fallbacks"] == 0
+    database.close()
+
+
+def test_reads_fall_back_to_the_primary(replicated):
+    """Test read-your-writes and lag-aware fallback while a replica is behind."""
+    now = [0.0]
+    database = ReplicatedDatabase("primary", ["replica_2"], routing="least_loaded", clock=lambda: now[0])
+    record = database.create("user", {"username": "fresh"})
+    # The writer reads its own write from the primary while the replica is behind
+    assert database.get("user", record["id"])["username"] == "fresh"
+    assert database.stats()["fallbacks"] == 1
+    with database.session():
+        assert database.get("user", record["id"]) is None  # Stale but within max_lag
+        now[0] = 5.0
+        assert database.get("user", record["id"])["username"] == "fresh"
+    assert database.lag("replica_2") == 5.0
+    DatabaseRegistry.get("replica_2").gate.set()
+    assert database.wait_for_replicas(5)
+    assert database.lag("replica_2") == 0.0
+    with pytest.raises(RuntimeError):
+        with database.transaction():
+            database.create("user", {"username": "rolled back"})
+            raise RuntimeError("boom")
+    assert database.stats()["version"] == 1
+    database.close()
+
+
+def test_replication_drops_rolled_back_nested_changes(replicated):
+    """Test that changes of a failed inner transaction never reach replicas."""
+    DatabaseRegistry.get("replica_2").gate.set()
+    database = ReplicatedDatabase("primary", ["replica_1"])
+    with database.transaction():
+        kept = database.create("user", {"username": "kept"})
+        with pytest.raises(RuntimeError):
+            with database.transaction():
+                database.create("user", {"username": "rolled back"})
+                raise RuntimeError("boom")
+    assert database.wait_for_replicas(5)
+    replica = DatabaseRegistry.get("replica_1")
+    assert [record["username"] for record in replica.find("user", {})] == ["kept"]
+    assert [record["id"] for record in DatabaseRegistry.get("primary").find("user", {})] == [kept["id"]]
+    database.close()
+
+
+def test_pages_continue_on_the_database_of_their_cursor(replicated):
+    """Test that a page walk stays on its replica when reads fall back to the primary."""
+    DatabaseRegistry.register("page_primary", CustomDatabase("page_primary"))
+    replica = DatabaseRegistry.get("replica_2")
+    replica.gate.set()
+    database = ReplicatedDatabase("page_primary", ["replica_2"])
+    try:
+        with pytest.raises(RuntimeError):
+            with database.transaction():
+                database.create("user", {"username": "rolled back"})
+                raise RuntimeError("boom")
+        database.create_many("user", [{"username": name} for name in ("a", "b", "c")])
+        assert database.wait_for_replicas(5)
+        with database.session():
+            first, cursor = database.page("user", 1)
+        # The replica falls behind, so this context's reads now go to the primary
+        replica.gate.clear()
+        database.create("user", {"username": "d"})
+        second, _ = database.page("user", 1, cursor)
+        assert [r["username"] for r in first + second] == ["a", "b"]
+        with pytest.raises(ValueError):
+            database.page("user", 1, [5, cursor[1]])
+    finally:
+        replica.gate.set()
+        database.close()
+        DatabaseRegistry._databases.pop("page_primary")
+
+
+# --- Write-Behind Tests ---
+
+def test_write_behind_flushes_batches(tmp_path):
+    """Test that buffered writes are readable at once and stored in batches."""
+    backend = SqliteDatabase(str(tmp_path / "ingest.db"))
+    backend.create("user", {"username": "existing"})
+    database = WriteBehindDatabase(backend, max_batch=3, flush_interval=60)
+    created = [database.create("user", {"username": f"user{i}"}) for i in range(5)]
+    assert [record["id"] for record in created] == [2, 3, 4, 5, 6]
+    database.update("user", created[4]["id"], {"email": "e@x"})
+    assert database.get("user", created[4]["id"])["email"] == "e@x"
+    assert database.delete("user", created[3]["id"])["username"] == "user3"
+    assert database.get("user", created[3]["id"]) is None
+    # The find flushes what the size threshold has left in the buffer
+    assert [record["username"] for record in database.find("user", {}, order_by="id")] == \
+        ["existing", "user0", "user1", "user2", "user4"]
+    assert backend.get("user", 6)["email"] == "e@x"
+    stats = database.stats()
+    assert stats["pending"] == 0
+    assert stats["flushed"] == 7
+    assert stats["errors"] == 0
+    database.close()
+
+
+def test_write_behind_backpressure_and_close(tmp_path):
+    """Test the bounded buffer, atomic groups and flushing on close."""
+    backend = CustomDatabase("write_behind")
+    database = WriteBehindDatabase(backend, max_batch=100, flush_interval=60,
+                                   max_pending=2, put_timeout=0.05)
+    with database._flush_lock:  # Hold the flusher back
+        database.create("product", {"name": "a"})
+        database.create("product", {"name": "b"})
+        with pytest.raises(BackpressureTimeout):
+            database.create("product", {"name": "c"})
+    with pytest.raises(RuntimeError):
+        with database.transaction():
+            database.create("product", {"name": "rolled back"})
+            assert database.get("product", 4)["name"] == "rolled back"
+            raise RuntimeError("boom")
+    assert database.get("product", 4) is None
+    database.create_many("product", [{"name": "d"}, {"name": "e"}])
+    database.close()
+    assert [record["name"] for record in backend.find("product", {}, order_by="id")] == ["a", "b", "d", "e"]
+    assert database.stats()["pending"] == 0
+    with pytest.raises(RuntimeError):
+        database.create("product", {"name": "late"})
+
+
+def test_write_behind_drops_rolled_back_nested_writes():
+    """Test that a failed nested transaction drops only its own writes."""
+    backend = CustomDatabase("write_behind_nested")
+    database = WriteBehindDatabase(backend, flush_interval=60)
+    with database.transaction():
+        kept = database.create("product", {"name": "kept"})
+        with pytest.raises(RuntimeError):
+            with database.transaction():
+                database.create("product", {"name": "rolled back"})
+                database.update("product", kept["id"], {"name": "changed"})
+                raise RuntimeError("boom")
+        assert database.get("product", kept["id"])["name"] == "kept"
+    database.close()
+    assert [record["name"] for record in backend.find("product", {}, order_by="id")] == ["kept"]
+
+def test_write_behind_drops_only_failed_groups(tmp_path):
+    """Test that a failed batch loses only the group that cannot be stored, and reports it."""
+    backend = SqliteDatabase(str(tmp_path / "ingest.db"))
+    failures = []
+    database = WriteBehindDatabase(backend, max_batch=100, flush_interval=60,
+                                   on_error=lambda group, error: failures.append(group))
+    with database._flush_lock:  # Queue everything into one batch
+        database.create("user", {"username": "a"})
+        database.create("user", {"username": "b", "no_such_column": 1})
+        database.create("user", {"username": "c"})
+    database.flush()
+    assert [record["username"] for record in backend.find("user", {}, order_by="id")] == ["a", "c"]
+    assert [write[3] for group in failures for write in group] == [2]
+    stats = database.stats()
+    assert stats["flushed"] == 2
+    assert stats["lost"] == 1
+    assert stats["errors"] == 1
+    database.close()
+
+# --- Registry Tests ---
+
+def test_registry_opens_configured_databases_on_first_use(tmp_path):
+    """Test lazy registration from configuration."""
+    opened = []
+    DatabaseRegistry.subscribe(lambda name, db: opened.append(name))
+    try:
+        DatabaseRegistry.configure({
+            "lazy_sqlite": {"type": "sqlite", "db_name": str(tmp_path / "lazy.db"), "pool_size": 2},
+            "lazy_custom": {"type": "custom", "concurrency": "model"},
+        })
+        assert {"lazy_sqlite", "lazy_custom"} <= set(DatabaseRegistry.list())
+        assert "lazy_sqlite" not in DatabaseRegistry.instances()
+        assert opened == []
+        database = DatabaseRegistry.get("lazy_sqlite")
+        assert isinstance(database, SqliteDatabase) and database.pool.size == 2
+        assert DatabaseRegistry.get("lazy_sqlite") is database
+        assert DatabaseRegistry.get("lazy_custom").name == "lazy_custom"
+        assert opened == ["lazy_sqlite", "lazy_custom"]
+        with pytest.raises(ValueError):
+            DatabaseRegistry.configure({"broken": {"type": "nosql"}})
+    finally:
+        DatabaseRegistry._listeners.pop()
+        for name in ("lazy_sqlite", "lazy_custom"):
+            DatabaseRegistry._databases.pop(name)
@@ -0,0 +1,66 @@
+import pickle
+import pytest
+
+from db.schema import SCHEMAS
+from models.base_model import BaseModel, BaseModelMeta
+from models.user import User
+from models.product import Product
+
+
+# --- Generated Model Tests ---
+
+def test_fields_become_slots():
+    """Test that annotated fields are stored in slots, not in a __dict__."""
+    user = User(id=1, username="alice", email="alice@example.com")
+    assert User.__fields__ == ("id", "username", "email", "created_at")
+    assert not hasattr(user, "__dict__")
+    assert user.created_at is None
+    assert pickle.loads(pickle.dumps(user)).to_dict() == user.to_dict()
+
+
+def test_undeclared_attributes_are_kept():
+    """Test that attributes outside the annotations still round-trip through to_dict()."""
+    user = User(id=1, username="alice", name="Alice")
+    assert user.name == "Alice"
+    assert user.to_dict()["name"] == "Alice"
+    with pytest.raises(AttributeError):
+        user.missing
+
+
+def test_from_row_and_make_match_init():
+    """Test that the fast constructors build the same instance as __init__."""
+    row = {"id": 2, "name": "Laptop", "description": "", "price": 9.5, "quantity": 3}
+    expected = Product(**row).to_dict()
+    assert Product.from_row(row).to_dict() == expected
+    assert Product._make(tuple(row.values())).to_dict() == expected
+
+
+def test_class_values_become_defaults():
+    """Test that a class-level field value is used as the default, and subclasses extend the fields."""
+    class Item(BaseModel):
+        id: int
+        stock: int = 0
+
+    class Book(Item):
+        isbn: str
+
+    book = Book(id=1, isbn="123")
+    assert Book.__fields__ == ("id", "stock", "isbn")
+    assert book.to_dict() == {"id": 1, "stock": 0, "isbn": "123"}
+    assert Book.from_row({"id": 2}).stock == 0
+    for name in ("Item", "Book"):
+        BaseModelMeta.registry.pop(name)
+        SCHEMAS.pop(name.lower())
+
+
+def test_fields_named_like_init_parameters():
+    """Test that fields called "self" or "extra" do not clash with the generated __init__."""
+    class Odd(BaseModel):
+        self: int
+        extra: str
+
+    odd = Odd(self=1, extra="x", other=2)
+    assert odd.to_dict() == {"self": 1, "extra": "x", "other": 2}
+    assert Odd.from_row({"self": 3}).self == 3
+    BaseModelMeta.registry.pop("Odd")
+    SCHEMAS.pop("odd")
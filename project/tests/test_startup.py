@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.suite import PROJECT, STARTUP_BUDGET, startup_time
+
+# Modules that only the code actually using them should import
+HEAVY_MODULES = ("asyncio", "sqlite3", "mmap", "db.database", "db.sqlite_adapter")
+
+
+def _run(code, directory):
+    """Run Python code in a fresh interpreter with the project importable."""
+    environment = dict(os.environ, PYTHONPATH=PROJECT, PYTHONDONTWRITEBYTECODE="1")
+    return subprocess.run([sys.executable, "-c", code], cwd=directory, env=environment,
+                          capture_output=True, text=True, check=True).stdout
+
+
+def test_importing_controllers_has_no_side_effects(tmp_path):
+    """Test that the controllers import without output, files or heavy modules."""
+    output = _run(
+        "import sys\n"
+        "import controllers.user_controller, controllers.product_controller, controllers.database_controller\n"
+        f"print([name for name in {HEAVY_MODULES!r} if name in sys.modules])\n"
+        "from db.database import DatabaseRegistry\n"
+        "print(sorted(DatabaseRegistry.list()), sorted(DatabaseRegistry.instances()))\n",
+        str(tmp_path))
+    assert output.splitlines() == ["[]", "['default', 'sqlite', 'test'] []"]
+    assert os.listdir(tmp_path) == []
+
+
+def test_databases_open_on_first_use(tmp_path):
+    """Test that a configured database is created when a request first uses it."""
+    output = _run(
+        "from controllers.user_controller import *\n"
+        "from routes_decorator import handle_request\n"
+        "print(handle_request('/sql/users/create', data={'username': 'lazy'})['status'])\n",
+        str(tmp_path))
+    assert output.strip() == "success"
+    assert "database.db" in os.listdir(tmp_path)
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_TIMING_TESTS"),
+                    reason="timing depends on machine load; set RUN_TIMING_TESTS=1, "
+                           "or use benchmarks/suite.py --compare")
+def test_startup_within_budget(tmp_path):
+    """Test that importing the controllers stays within the startup budget."""
+    assert startup_time(3, str(tmp_path)) < STARTUP_BUDGET